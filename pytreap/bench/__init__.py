@@ -0,0 +1,24 @@
+""" Benchmark suite for the pytreap package.
+
+Run `python -m pytreap.bench --help` (or pytreap_bench.py) for the available
+benchmarks; `run` sweeps the core operations over data sizes, key
+distributions and priority strategies and writes the results as JSON, which
+`compare` checks against a baseline for regressions.
+"""
+
+import argparse
+from typing import List, Union
+
+from . import adaptive, batch, cache, concurrent, frozen, locality, memory, server, sharded, stream, suite, wal
+
+# every benchmark module registers its own sub-command(s)
+BENCHMARKS = (suite, memory, batch, adaptive, locality, frozen, cache, sharded, stream, server, wal, concurrent)
+
+def main(argv: Union[List[str], None] = None) -> None:
+    parser = argparse.ArgumentParser(prog="pytreap.bench", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(title="benchmarks", dest="benchmark", required=True)
+    for benchmark in BENCHMARKS:
+        benchmark.add_parser(subparsers)
+    args = parser.parse_args(argv)
+    args.main(args)
@@ -0,0 +1,72 @@
+""" Compare an adaptive (access-frequency) Treap against the static
+letter-frequency heuristic of ENPM809X Part #5 on the textbook workload.
+The adaptive treap reaches the heuristic's search depth, but sampling costs
+extra time per hit while active; the paused row shows the converged treap.
+"""
+import collections
+import random
+import string
+import timeit
+
+from ..treap import Treap
+from .workloads import textbook_probes
+
+# handy global variables
+TIMED_COUNT=20
+
+# insertion order and letter frequency priorities from the ENPM809X evaluation
+KEYS = ('Z','Y','X','W','V','Q','U','P','S','R','K','J','G','B',
+        'F','C','M','D','H','I','L','A','N','O','T','E')
+HEURISTIC = dict(zip(string.ascii_uppercase,
+                     (24,7,14,17,26,10,8,18,22,4,5,16,13,19,23,12,2,20,21,25,15,6,11,3,9,1)))
+
+def weighted_depth(treap, frequencies):
+    # average number of nodes visited per search, weighted by access frequency
+    total = 0
+    for node in treap:
+        depth = 1
+        ancestor = node.parent
+        while ancestor is not None:
+            depth += 1
+            ancestor = ancestor.parent
+        total += depth * frequencies[node.key]
+    return total / sum(frequencies.values())
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser("adaptive", help="Adaptive versus heuristic priorities.",
+                                   description=__doc__)
+    parser.add_argument("-p", "--period", type=int, default=16,
+                        help="Adaptive sampling period (searches per recorded hit).")
+    parser.set_defaults(main=main)
+
+def main(args):
+    random.seed()
+    probes = textbook_probes()
+    frequencies = collections.Counter(probes)
+
+    uniform = Treap()
+    heuristic = Treap()
+    adaptive = Treap(adaptive=args.period)
+    for key in KEYS:
+        uniform.insert(key)
+        heuristic.insert(key, HEURISTIC[key])
+        adaptive.insert(key)
+
+    def _time(treap):
+        def _search():
+            search = treap.search
+            for c in probes:
+                search(c)
+        return timeit.timeit(_search, number=TIMED_COUNT) / TIMED_COUNT
+
+    print("Searching {} characters ({} passes each):".format(len(probes), TIMED_COUNT))
+    print("{:<20} {:>10} {:>16}".format("treap", "s/pass", "nodes/search"))
+    for name, treap in (("uniform", uniform), ("heuristic", heuristic), ("adaptive", adaptive)):
+        seconds = _time(treap)
+        # the adaptive treap has settled by now; report its final shape
+        print("{:<20} {:>10.4f} {:>16.2f}".format(name, seconds, weighted_depth(treap, frequencies)))
+
+    # once the access pattern has been learned the sampling can be paused
+    adaptive.adaptive = 0
+    print("{:<20} {:>10.4f} {:>16.2f}".format(
+        "adaptive (paused)", _time(adaptive), weighted_depth(adaptive, frequencies)))
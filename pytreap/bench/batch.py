@@ -0,0 +1,55 @@
+""" Compare batch search (Treap.search_many) against one Treap.search per
+character of the textbook data set.
+"""
+import random
+import string
+import timeit
+
+from .. import treap as treap_module
+from ..treap import Treap
+from .workloads import textbook_probes
+
+# handy global variables
+TIMED_COUNT=20
+
+def report(name, function, count):
+    # time the given function and print the average per pass and per probe
+    seconds = timeit.timeit(function, number=TIMED_COUNT) / TIMED_COUNT
+    print("{:<28} {:8.4f} s/pass {:8.1f} ns/probe".format(name, seconds, 1e9 * seconds / count))
+    return seconds
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser("search-many", help="Batch versus per-key search.",
+                                   description=__doc__)
+    parser.set_defaults(main=main)
+
+def main(args):
+    random.seed()
+    probes = textbook_probes()
+    treap = Treap.from_keys(string.ascii_uppercase)
+
+    def _loop():
+        search = treap.search
+        return [search(c) for c in probes]
+
+    def _batch():
+        return treap.search_many(probes)
+
+    print("Searching {} characters ({} passes each):".format(len(probes), TIMED_COUNT))
+    baseline = report("search (per key loop)", _loop, len(probes))
+
+    # time the pure python path even if numpy is around
+    numpy = treap_module.numpy
+    treap_module.numpy = None
+    try:
+        pure = report("search_many (pure python)", _batch, len(probes))
+    finally:
+        treap_module.numpy = numpy
+    print("  speedup: {:.1f}x".format(baseline / pure))
+
+    if numpy is not None:
+        array = numpy.array(probes)
+        accelerated = report("search_many (numpy)", lambda: treap.search_many(array), len(probes))
+        print("  speedup: {:.1f}x".format(baseline / accelerated))
+    else:
+        print("numpy is not installed; skipping the accelerated path.")
@@ -0,0 +1,91 @@
+""" Compare the throughput and hit ratio of TreapCache (lru, lfu and ttl) against
+functools.lru_cache and an OrderedDict based LRU on a zipf distributed stream
+of lookups, where every miss is followed by a put.
+"""
+import collections
+import functools
+import random
+import time
+
+from ..cache import TreapCache
+from .workloads import ZIPF_EXPONENT
+
+class OrderedDictLRU:
+    # the textbook python LRU cache, as a baseline
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = collections.OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, key, default=None):
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+def make_stream(universe, count, rng):
+    # zipf distributed lookups over universe distinct keys
+    keys = ["{:09d}".format(k) for k in rng.sample(range(10 * universe), universe)]
+    weights = [1.0 / (rank ** ZIPF_EXPONENT) for rank in range(1, universe + 1)]
+    return rng.choices(keys, weights=weights, k=count)
+
+def run_cache(cache, stream):
+    # replay the stream against a get/put cache, returning the elapsed seconds
+    get, put = cache.get, cache.put
+    start = time.perf_counter()
+    for key in stream:
+        if get(key) is None:
+            put(key, key)
+    return time.perf_counter() - start
+
+def run_lru_cache(capacity, stream):
+    # replay the stream through a function memoized by functools.lru_cache
+    @functools.lru_cache(maxsize=capacity)
+    def _lookup(key):
+        return key
+
+    start = time.perf_counter()
+    for key in stream:
+        _lookup(key)
+    seconds = time.perf_counter() - start
+    info = _lookup.cache_info()
+    return seconds, info.hits / (info.hits + info.misses)
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser("cache", help="TreapCache versus python LRU caches.",
+                                   description=__doc__)
+    parser.add_argument("-c", "--capacity", type=int, default=1000,
+                        help="Number of cache entries.")
+    parser.add_argument("-u", "--universe", type=int, default=100000,
+                        help="Number of distinct keys looked up.")
+    parser.add_argument("-n", "--count", type=int, default=200000,
+                        help="Number of lookups.")
+    parser.set_defaults(main=main)
+
+def main(args):
+    stream = make_stream(args.universe, args.count, random.Random(0))
+    print("{} zipf lookups over {} keys, capacity {}:".format(len(stream), args.universe, args.capacity))
+
+    def _report(name, seconds, hit_ratio):
+        print("  {:<24} {:10.0f} ops/s  hit ratio {:.3f}".format(name, len(stream) / seconds, hit_ratio))
+
+    seconds, hit_ratio = run_lru_cache(args.capacity, stream)
+    _report("functools.lru_cache", seconds, hit_ratio)
+    baseline = OrderedDictLRU(args.capacity)
+    seconds = run_cache(baseline, stream)
+    _report("OrderedDict LRU", seconds, baseline.hits / len(stream))
+    for policy in ("lru", "lfu", "ttl"):
+        # entries live for 0.1 ms per slot of capacity (hits do not extend that)
+        cache = TreapCache(args.capacity, policy, ttl=1e-4 * args.capacity)
+        seconds = run_cache(cache, stream)
+        _report("TreapCache ({})".format(policy), seconds, cache.stats()["hit_ratio"])
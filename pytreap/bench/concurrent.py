@@ -0,0 +1,84 @@
+""" Compare ConcurrentTreap (lock-free reads of published versions) against a
+Treap guarded by a single global lock, with threads running a mix of
+searches and inserts/deletes at several read fractions.
+"""
+import random
+import threading
+import time
+
+from ..concurrent import ConcurrentTreap
+from ..treap import Treap
+from .workloads import make_keys
+
+class LockedTreap:
+    # the baseline: every operation, searches included, holds one lock
+    def __init__(self):
+        self._treap = Treap()
+        self._lock = threading.Lock()
+
+    def insert_many(self, keys):
+        with self._lock:
+            self._treap.insert_many(keys)
+
+    def search(self, key):
+        with self._lock:
+            return self._treap.search(key)
+
+    def insert(self, key):
+        with self._lock:
+            self._treap.insert(key)
+
+    def discard(self, key):
+        with self._lock:
+            return self._treap.discard(key)
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser("concurrent", help="Lock-free reads versus a global lock.",
+                                   description=__doc__)
+    parser.add_argument("-n", "--size", type=int, default=100000,
+                        help="Number of keys in the treap.")
+    parser.add_argument("-t", "--threads", type=int, nargs="+", default=[1, 4, 8],
+                        help="Numbers of threads to benchmark.")
+    parser.add_argument("-r", "--read-fractions", type=float, nargs="+", default=[0.9, 0.99],
+                        help="Fractions of operations which are searches.")
+    parser.add_argument("-o", "--operations", type=int, default=20000,
+                        help="Operations per thread.")
+    parser.set_defaults(main=main)
+
+def run(treap, threads, read_fraction, operations, keys):
+    # run the threads to completion and return the operations per second
+    def _work(seed):
+        rng = random.Random(seed)
+        search, insert, discard = treap.search, treap.insert, treap.discard
+        for i in range(operations):
+            if rng.random() < read_fraction:
+                search(rng.choice(keys))
+            else:
+                # private keys, so each writer alternates inserting and removing them
+                key = "w{}-{}".format(seed, i // 2)
+                if i % 2:
+                    discard(key)
+                else:
+                    insert(key)
+
+    workers = [threading.Thread(target=_work, args=(seed,)) for seed in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return threads * operations / (time.perf_counter() - start)
+
+def main(args):
+    keys = make_keys(args.size, random.Random(0))
+    print("{} keys, {} operations per thread:".format(len(keys), args.operations))
+    for read_fraction in args.read_fractions:
+        for threads in args.threads:
+            rates = []
+            for cls in (LockedTreap, ConcurrentTreap):
+                treap = cls()
+                treap.insert_many(keys)
+                rates.append(run(treap, threads, read_fraction, args.operations, keys))
+            print("  reads {:4.0%} threads {:3d}: global lock {:9.0f} ops/s, "
+                  "concurrent {:9.0f} ops/s ({:.2f}x)".format(
+                      read_fraction, threads, rates[0], rates[1], rates[1] / rates[0]))
@@ -0,0 +1,54 @@
+""" Compare searches on a FrozenTreap (sorted keys and bisection) against
+pointer-chasing Treap.search and the memory-mapped MappedTreap, on uniform
+probes over growing treaps and on the textbook data set.
+"""
+import os
+import random
+import string
+import tempfile
+import timeit
+
+from ..treap import Treap
+from .workloads import make_keys, textbook_probes
+
+# handy global variables
+TIMED_COUNT=5
+
+def report(name, function, count):
+    # time the given function and print the average per pass and per probe
+    seconds = timeit.timeit(function, number=TIMED_COUNT) / TIMED_COUNT
+    print("  {:<22} {:8.4f} s/pass {:8.1f} ns/probe".format(name, seconds, 1e9 * seconds / count))
+    return seconds
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser("frozen", help="Frozen versus pointer-based search.",
+                                   description=__doc__)
+    parser.add_argument("-n", "--sizes", type=int, nargs="+", default=[1000, 100000, 1000000],
+                        help="Numbers of keys to benchmark.")
+    parser.set_defaults(main=main)
+
+def main(args):
+    rng = random.Random(0)
+    cases = []
+    for size in args.sizes:
+        keys = make_keys(size, rng)
+        cases.append(("uniform", Treap.from_keys(keys), rng.choices(keys, k=min(size, 100000))))
+    cases.append(("textbook", Treap.from_keys(string.ascii_uppercase), textbook_probes()))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, treap, probes in cases:
+            frozen = treap.freeze()
+            path = os.path.join(directory, "{}.bin".format(len(treap)))
+            treap.save(path)
+
+            def _search(target):
+                search = target.search
+                return [search(key) for key in probes]
+
+            print("{} probes ({} keys, {} probes, {} passes each):".format(
+                name, len(treap), len(probes), TIMED_COUNT))
+            baseline = report("Treap.search", lambda: _search(treap), len(probes))
+            flat = report("FrozenTreap.search", lambda: _search(frozen), len(probes))
+            with Treap.open_mmap(path) as mapped:
+                report("MappedTreap.search", lambda: _search(mapped), len(probes))
+            print("  frozen speedup: {:.1f}x".format(baseline / flat))
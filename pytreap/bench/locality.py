@@ -0,0 +1,77 @@
+""" Compare finger searches through a Treap.cursor against Treap.search from
+the root on probe streams with increasing locality: uniformly random probes,
+locally clustered probes (a random walk over neighbouring keys), sorted
+probes and the character stream of the textbook data set.
+"""
+import random
+import string
+import timeit
+
+from ..treap import Treap
+from .workloads import make_keys, textbook_probes
+
+# handy global variables
+TIMED_COUNT=5
+
+def report(name, function, count):
+    # time the given function and print the average per pass and per probe
+    seconds = timeit.timeit(function, number=TIMED_COUNT) / TIMED_COUNT
+    print("  {:<22} {:8.4f} s/pass {:8.1f} ns/probe".format(name, seconds, 1e9 * seconds / count))
+    return seconds
+
+def make_streams(keys, count, step, rng):
+    # build the probe streams over the given sorted keys
+    walk = []
+    position = rng.randrange(len(keys))
+    for _ in range(count):
+        position = min(max(position + rng.randint(-step, step), 0), len(keys) - 1)
+        walk.append(keys[position])
+    return {
+        "uniform": rng.choices(keys, k=count),
+        "clustered": walk,
+        "sorted": sorted(rng.choices(keys, k=count)),
+    }
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser("cursor", help="Finger search versus search from the root.",
+                                   description=__doc__)
+    parser.add_argument("-n", "--size", type=int, default=100000,
+                        help="Number of keys in the treap.")
+    parser.add_argument("-s", "--step", type=int, default=8,
+                        help="Largest jump (in key positions) of the clustered probes.")
+    parser.set_defaults(main=main)
+
+def main(args):
+    rng = random.Random(0)
+    keys = sorted(make_keys(args.size, rng))
+    treap = Treap.from_sorted(keys)
+    streams = [(name, treap, probes) for name, probes in make_streams(keys, args.size, args.step, rng).items()]
+    streams.append(("textbook", Treap.from_keys(string.ascii_uppercase), textbook_probes()))
+
+    for name, tree, probes in streams:
+        def _root():
+            search = tree.search
+            return [search(key) for key in probes]
+
+        def _finger():
+            search = tree.cursor().search
+            return [search(key) for key in probes]
+
+        print("{} probes ({} keys, {} probes, {} passes each):".format(
+            name, len(tree), len(probes), TIMED_COUNT))
+        baseline = report("search (from the root)", _root, len(probes))
+        finger = report("cursor.search", _finger, len(probes))
+        print("  speedup: {:.1f}x".format(baseline / finger))
+
+    # in-order stepping against the lazy iterator
+    def _iterate():
+        return [node.key for node in treap]
+
+    def _step():
+        cursor = treap.cursor()
+        return [cursor.next() for _ in range(len(treap))]
+
+    print("in-order traversal ({} keys, {} passes each):".format(len(treap), TIMED_COUNT))
+    baseline = report("iteration", _iterate, len(treap))
+    stepping = report("cursor.next", _step, len(treap))
+    print("  ratio: {:.1f}x".format(baseline / stepping))
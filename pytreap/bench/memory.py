@@ -0,0 +1,77 @@
+""" Compare the memory footprint (bytes per key) of the compact Treap layout
+against the original layout (__dict__ backed Nodes plus a list of every node).
+"""
+import gc
+import random
+import tracemalloc
+
+from ..treap import Treap
+
+class LegacyNode:
+    """ Replica of the original Node layout: per-instance __dict__ and
+    class-level defaults for the tree links.
+    """
+    parent = None
+    left = None
+    right = None
+
+    def __init__(self, key, priority=None):
+        self.key = key
+        self.priority = priority
+
+def build_compact(keys):
+    # construct a Treap through the public API
+    treap = Treap()
+    for key in keys:
+        treap.insert(key)
+    return treap
+
+def build_legacy(treap):
+    # mirror an existing Treap with legacy nodes plus the legacy node registry
+    mirror = {}
+    registry = []
+    for node in treap:
+        mirror[node.key] = LegacyNode(node.key, node.priority)
+        registry.append(mirror[node.key])
+    for node in treap:
+        legacy = mirror[node.key]
+        if node.parent is not None:
+            legacy.parent = mirror[node.parent.key]
+        if node.left is not None:
+            legacy.left = mirror[node.left.key]
+        if node.right is not None:
+            legacy.right = mirror[node.right.key]
+    mirror.clear()
+    return registry
+
+def measure(build, *args):
+    """ Return (result, bytes allocated by build(*args)) using tracemalloc.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(*args)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser("memory", help="Bytes per key of the node layouts.",
+                                   description=__doc__)
+    parser.add_argument("-n", "--count", type=int, default=100000,
+                        help="Number of keys to insert.")
+    parser.set_defaults(main=main)
+
+def main(args):
+    # keys are created up front so that their storage isn't attributed to either layout
+    random.seed(0)
+    keys = ["{:012d}".format(k) for k in random.sample(range(10 * args.count), args.count)]
+
+    treap, compact_bytes = measure(build_compact, keys)
+    registry, legacy_bytes = measure(build_legacy, treap)
+
+    print("Keys: {}".format(args.count))
+    print("Legacy layout:  {:8.1f} bytes/key".format(legacy_bytes / args.count))
+    print("Compact layout: {:8.1f} bytes/key".format(compact_bytes / args.count))
+    print("Savings:        {:8.1%}".format(1 - compact_bytes / legacy_bytes))
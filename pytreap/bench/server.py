@@ -0,0 +1,96 @@
+""" Load generator for the asyncio TreapServer: concurrent clients issue a mix
+of single-key searches and inserts (or batched searches) against a server
+running in a separate process, reporting requests/s and latency percentiles.
+"""
+import asyncio
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from ..server import TreapClient, TreapServer
+from ..treap import Treap
+from .suite import percentiles
+from .workloads import make_keys
+
+def serve(path, keys, ready):
+    # server process: build the treap, then serve it until terminated
+    async def _serve():
+        server = await TreapServer(Treap.from_keys(keys)).start(path)
+        ready.set()
+        await server.serve_forever()
+    asyncio.run(_serve())
+
+async def load(path, keys, clients, requests, batch, write_ratio, pool_size, seed=0):
+    """ Run concurrent clients against the server and collect request latencies.
+
+    Args:
+        path: The Unix domain socket of the server.
+        keys: The keys held by the server (probes are drawn from these).
+        clients: The number of concurrent client coroutines.
+        requests: The number of requests per client.
+        batch: The number of keys per search request.
+        write_ratio: The fraction of requests inserting a new key instead.
+        pool_size: The number of connections shared by the clients.
+        seed: Seeds the probe choices.
+
+    Returns:
+        The latency of every request in nanoseconds and the elapsed seconds.
+    """
+    rng = random.Random(seed)
+    latencies = []
+
+    async def _client(client, number):
+        for request in range(requests):
+            start = time.perf_counter_ns()
+            if rng.random() < write_ratio:
+                await client.insert("new-{}-{}-{}".format(seed, number, request))
+            elif batch == 1:
+                await client.search(rng.choice(keys))
+            else:
+                await client.search_many(rng.choices(keys, k=batch))
+            latencies.append(time.perf_counter_ns() - start)
+
+    async with TreapClient(path, pool_size=pool_size) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[_client(client, number) for number in range(clients)])
+        return latencies, time.perf_counter() - start
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser("server", help="Requests/s and latency of the treap server.",
+                                   description=__doc__)
+    parser.add_argument("-n", "--size", type=int, default=100000,
+                        help="Number of keys held by the server.")
+    parser.add_argument("-c", "--clients", type=int, nargs="+", default=[1, 8, 64],
+                        help="Numbers of concurrent clients to benchmark.")
+    parser.add_argument("-r", "--requests", type=int, default=2000,
+                        help="Requests per client.")
+    parser.add_argument("-b", "--batch", type=int, default=1,
+                        help="Keys per search request.")
+    parser.add_argument("-w", "--write-ratio", type=float, default=0.1,
+                        help="Fraction of requests which insert a new key.")
+    parser.add_argument("-p", "--pool-size", type=int, default=4,
+                        help="Connections shared by the clients.")
+    parser.set_defaults(main=main)
+
+def main(args):
+    keys = make_keys(args.size, random.Random(0))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "treap.sock")
+        ready = multiprocessing.Event()
+        server = multiprocessing.Process(target=serve, args=(path, keys, ready), daemon=True)
+        server.start()
+        try:
+            ready.wait()
+            print("{} keys, {} keys per search, {:.0%} inserts, {} connections:".format(
+                args.size, args.batch, args.write_ratio, args.pool_size))
+            for seed, clients in enumerate(args.clients):
+                latencies, seconds = asyncio.run(load(path, keys, clients, args.requests, args.batch,
+                                                      args.write_ratio, args.pool_size, seed))
+                summary = percentiles(latencies)
+                print("  {:>4} clients {:10.0f} requests/s  p50 {:8.1f} us  p99 {:8.1f} us".format(
+                    clients, len(latencies) / seconds, summary["p50"] / 1e3, summary["p99"] / 1e3))
+        finally:
+            server.terminate()
+            server.join()
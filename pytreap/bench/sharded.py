@@ -0,0 +1,52 @@
+""" Measure how bulk loads and batched searches scale with the number of shards
+(worker processes) of a ShardedTreap, against a single in-process Treap.
+"""
+import os
+import random
+import time
+
+from ..sharded import ShardedTreap
+from ..treap import Treap
+from .workloads import make_keys
+
+def _timed(function):
+    # run the function once, returning its result and the elapsed seconds
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser("shards", help="Scaling of a ShardedTreap over processes.",
+                                   description=__doc__)
+    parser.add_argument("-n", "--size", type=int, default=1000000,
+                        help="Number of keys (and probes).")
+    parser.add_argument("-s", "--shards", type=int, nargs="+",
+                        default=sorted({1, 2, 4, 8, os.cpu_count() or 1}),
+                        help="Numbers of shards to benchmark.")
+    parser.add_argument("-c", "--chunk-size", type=int, default=10000,
+                        help="Number of keys per message to a shard.")
+    parser.set_defaults(main=main)
+
+def main(args):
+    rng = random.Random(0)
+    keys = make_keys(args.size, rng)
+    probes = rng.choices(keys, k=args.size)
+    print("{} keys and probes, {} CPUs:".format(args.size, os.cpu_count()))
+
+    treap, build = _timed(lambda: Treap.from_keys(keys))
+    _, search = _timed(lambda: [treap.search(key) for key in probes])
+    print("  {:<12} build {:7.3f} s  search {:7.3f} s".format("single treap", build, search))
+    del treap
+
+    for shards in args.shards:
+        # the build time includes starting the worker processes
+        sharded, sharded_build = _timed(lambda: ShardedTreap.from_keys(keys, shards=shards,
+                                                                      chunk_size=args.chunk_size))
+        with sharded:
+            _, sharded_search = _timed(lambda: sharded.search_many(probes))
+        build_speedup, search_speedup = build / sharded_build, search / sharded_search
+        print("  {:<12} build {:7.3f} s  search {:7.3f} s  speedup {:4.1f}x / {:4.1f}x"
+              "  per core {:4.2f} / {:4.2f}".format(
+                  "{} shards".format(shards), sharded_build, sharded_search, build_speedup,
+                  search_speedup, build_speedup / min(shards, os.cpu_count() or 1),
+                  search_speedup / min(shards, os.cpu_count() or 1)))
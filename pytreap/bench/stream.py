@@ -0,0 +1,45 @@
+""" Compare Treap.search_stream against the ENPM809X pipeline (read the whole
+file, build one string per letter, search each) on the textbook data set
+repeated up to the requested size.
+"""
+import os
+import string
+import tempfile
+import time
+from pkg_resources import resource_filename
+
+from .. import stream
+from ..treap import Treap
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser("stream", help="Streaming versus list-based probe ingestion.",
+                                   description=__doc__)
+    parser.add_argument("-m", "--megabytes", type=int, default=64,
+                        help="Size of the probe file in MB.")
+    parser.add_argument("-c", "--chunk-size", type=int, default=stream.CHUNK_SIZE,
+                        help="Bytes read per chunk.")
+    parser.set_defaults(main=main)
+
+def main(args):
+    treap = Treap.from_keys(string.ascii_uppercase)
+    with open(resource_filename('pytreap.data', 'textbook.txt'), "rb") as data:
+        textbook = data.read()
+
+    # the list-based pipeline, on a single copy of the textbook
+    start = time.perf_counter()
+    probes = [c.upper() for c in textbook.decode("utf-8") if c in string.ascii_letters]
+    found = sum(treap.search(c) for c in probes)
+    seconds = time.perf_counter() - start
+    print("list pipeline:   {:8.1f} MB/s ({} bytes, {} probes, {} found)".format(
+        len(textbook) / 1e6 / seconds, len(textbook), len(probes), found))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "probes.txt")
+        with open(path, "wb") as output:
+            for _ in range(max(1, args.megabytes * 10**6 // len(textbook))):
+                output.write(textbook)
+        with open(path, "rb") as fileobj:
+            result = treap.search_stream(fileobj, stream.UPPERCASE, stream.NON_LETTERS, args.chunk_size)
+    print("search_stream:   {:8.1f} MB/s ({} bytes, {} probes, {} found){}".format(
+        result.throughput, result.bytes, sum(result.hits.values()) + sum(result.misses.values()),
+        sum(result.hits.values()), "" if stream.numpy is not None else " [without numpy]"))
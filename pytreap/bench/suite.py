@@ -0,0 +1,283 @@
+""" Parameterized throughput and latency benchmarks of the core Treap operations.
+
+Every case runs one operation over a generated workload and records the
+throughput along with per-operation latency percentiles. Latencies are taken
+with time.perf_counter_ns around each call, so they include the (constant)
+overhead of the timer itself.
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import random
+import sys
+import time
+from typing import Dict, Iterable, List
+
+from ..treap import Treap
+from . import workloads
+
+OPERATIONS = ("insert", "search", "delete", "iterate", "bulk")
+
+# operations whose cost is quadratic on a degenerate (constant priority) treap
+_PER_KEY_OPERATIONS = ("insert", "search", "delete")
+
+def percentiles(samples: List[int]) -> Dict[str, float]:
+    """ Summarize latency samples (in nanoseconds).
+
+    Args:
+        samples: The latency of every operation.
+
+    Returns:
+        A dictionary of the p50, p90, p99 and maximum latencies.
+    """
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {"p50": ordered[last * 50 // 100],
+            "p90": ordered[last * 90 // 100],
+            "p99": ordered[last * 99 // 100],
+            "max": ordered[last]}
+
+def _timed(operation, arguments):
+    # call operation on every argument, recording each latency
+    timer = time.perf_counter_ns
+    latencies = []
+    record = latencies.append
+    start = timer()
+    for argument in arguments:
+        before = timer()
+        operation(argument)
+        record(timer() - before)
+    return timer() - start, latencies
+
+def _build(workload, priorities):
+    # construct the treap a workload would produce, in linear time
+    return Treap.from_keys(workload.keys, priorities)
+
+def run_case(operation: str,
+             workload: workloads.Workload,
+             priority: str,
+             repeat: int = 1,
+             seed: int = 0) -> dict:
+    """ Benchmark a single operation.
+
+    Args:
+        operation: One of OPERATIONS.
+        workload: The generated operation streams.
+        priority: One of workloads.PRIORITIES.
+        repeat: How often to repeat the measurement; latencies are pooled and the
+            best throughput is reported.
+        seed: Seed of the priority generator.
+
+    Returns:
+        A JSON serializable dictionary describing the case and its results.
+    """
+    priorities = workloads.make_priorities(priority, workload, random.Random(seed))
+    elapsed = []
+    latencies = []
+    count = 0
+    treap = None
+    for _ in range(repeat):
+        if operation == "insert":
+            treap = Treap()
+            if priorities is None:
+                total, samples = _timed(treap.insert, workload.keys)
+            else:
+                pairs = list(zip(workload.keys, priorities))
+                total, samples = _timed(lambda pair: treap.insert(*pair), pairs)
+        elif operation == "search":
+            treap = _build(workload, priorities)
+            total, samples = _timed(treap.search, workload.probes)
+        elif operation == "delete":
+            treap = _build(workload, priorities)
+            shape = treap.stats()
+            total, samples = _timed(treap.delete, workload.deletes)
+        elif operation == "iterate":
+            # a single timed pass over all keys; latencies are per pass
+            treap = _build(workload, priorities)
+            total, samples = _timed(lambda t: sum(1 for _ in t), [treap])
+        elif operation == "bulk":
+            ordered = sorted(range(len(workload.keys)), key=workload.keys.__getitem__)
+            keys = [workload.keys[i] for i in ordered]
+            values = None if priorities is None else [priorities[i] for i in ordered]
+            built = []
+            total, samples = _timed(lambda _: built.append(Treap.from_sorted(keys, values)), [None])
+            treap = built.pop()
+        else:
+            raise ValueError("Unknown operation '{}'.".format(operation))
+        elapsed.append(total)
+        latencies.extend(samples)
+        count = len(workload.keys) if operation in ("iterate", "bulk") else len(samples)
+
+    if operation != "delete":
+        shape = treap.stats()
+    best = min(elapsed) / 1e9
+    return {"operation": operation,
+            "size": len(workload.keys),
+            "distribution": workload.distribution,
+            "priority": priority,
+            "repeat": repeat,
+            "count": count,
+            "seconds": best,
+            "throughput": count / best if best else float("inf"),
+            "latency_ns": percentiles(latencies),
+            "height": shape["height"],
+            "average_depth": shape["average_depth"],
+            "p99_depth": shape["p99_depth"]}
+
+def run_suite(operations: Iterable[str],
+              sizes: Iterable[int],
+              distributions: Iterable[str],
+              priorities: Iterable[str],
+              seed: int = 0,
+              repeat: int = 1,
+              max_degenerate: int = 10000,
+              progress=None) -> dict:
+    """ Benchmark every combination of the given parameters.
+
+    Args:
+        operations: The operations to measure.
+        sizes: The numbers of keys.
+        distributions: The key distributions.
+        priorities: The priority strategies.
+        seed: Seed of the workload generator, so runs can be compared.
+        repeat: How often to repeat every measurement.
+        max_degenerate: Largest size for which per-key operations are run with the
+            constant priority strategy (which is quadratic); larger cases are skipped.
+        progress: Optional callable receiving each result as it completes.
+
+    Returns:
+        A JSON serializable dictionary of run metadata and per-case results.
+    """
+    results = []
+    for size in sizes:
+        for distribution in distributions:
+            workload = workloads.make_workload(distribution, size, random.Random(seed))
+            for priority in priorities:
+                for operation in operations:
+                    if priority == "constant" and operation in _PER_KEY_OPERATIONS \
+                            and size > max_degenerate:
+                        continue
+                    result = run_case(operation, workload, priority, repeat, seed)
+                    results.append(result)
+                    if progress is not None:
+                        progress(result)
+    return {"meta": {"timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                     "python": sys.version.split()[0],
+                     "implementation": platform.python_implementation(),
+                     "platform": platform.platform(),
+                     "seed": seed,
+                     "repeat": repeat},
+            "results": results}
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.1) -> List[dict]:
+    """ Compare two suite results case by case.
+
+    Args:
+        baseline: The reference results.
+        current: The new results.
+        tolerance: Relative throughput loss or p99 latency gain tolerated before a
+            case is flagged as a regression.
+
+    Returns:
+        One dictionary per case present in both runs, with the relative changes and
+        a 'regression' flag.
+    """
+    def _key(result):
+        return (result["operation"], result["size"], result["distribution"], result["priority"])
+
+    reference = {_key(result): result for result in baseline["results"]}
+    changes = []
+    for result in current["results"]:
+        before = reference.get(_key(result))
+        if before is None:
+            continue
+        throughput = result["throughput"] / before["throughput"] - 1
+        p99_before = before["latency_ns"].get("p99")
+        p99 = result["latency_ns"].get("p99")
+        latency = p99 / p99_before - 1 if p99_before else 0.0
+        changes.append({"case": _key(result),
+                        "throughput": throughput,
+                        "p99": latency,
+                        "regression": throughput < -tolerance or latency > tolerance})
+    return changes
+
+def _parse_list(text, choices=None):
+    # parse a comma separated command line list, validating against choices
+    values = [value.strip() for value in text.split(",") if value.strip()]
+    if choices is not None:
+        for value in values:
+            if value not in choices:
+                raise argparse.ArgumentTypeError("'{}' is not one of {}.".format(value, ", ".join(choices)))
+    return values
+
+def _parse_sizes(text):
+    # sizes may be given in scientific notation, e.g. 1e3,1e4
+    try:
+        return [int(float(value)) for value in _parse_list(text)]
+    except ValueError:
+        raise argparse.ArgumentTypeError("Sizes must be numbers, e.g. 1e3,1e4.")
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser("run", help="Run the parameterized operation benchmarks.",
+                                   description=__doc__)
+    parser.add_argument("--operations", type=lambda text: _parse_list(text, OPERATIONS),
+                        default=list(OPERATIONS),
+                        help="Comma separated operations ({}).".format(", ".join(OPERATIONS)))
+    parser.add_argument("--sizes", type=_parse_sizes, default=[1000, 10000, 100000],
+                        help="Comma separated numbers of keys, e.g. 1e3,1e4,1e5,1e6,1e7.")
+    parser.add_argument("--distributions", default=list(workloads.DISTRIBUTIONS),
+                        type=lambda text: _parse_list(text, workloads.DISTRIBUTIONS),
+                        help="Comma separated key distributions ({}).".format(
+                            ", ".join(workloads.DISTRIBUTIONS)))
+    parser.add_argument("--priorities", default=list(workloads.PRIORITIES),
+                        type=lambda text: _parse_list(text, workloads.PRIORITIES),
+                        help="Comma separated priority strategies ({}).".format(
+                            ", ".join(workloads.PRIORITIES)))
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Repetitions of every measurement.")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed of the workload generator.")
+    parser.add_argument("--max-degenerate", type=int, default=10000,
+                        help="Largest size run per key with constant (degenerate) priorities.")
+    parser.add_argument("-o", "--output",
+                        help="Write the JSON results here instead of to stdout.")
+    parser.set_defaults(main=main)
+
+    parser = subparsers.add_parser("compare", help="Compare two JSON result files.",
+                                   description=compare.__doc__.split("\n")[0].strip())
+    parser.add_argument("baseline", help="The reference results.")
+    parser.add_argument("current", help="The new results.")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Relative change tolerated before flagging a regression.")
+    parser.set_defaults(main=main_compare)
+
+def main(args):
+    # progress goes to stderr so that stdout can carry the JSON results
+    def _progress(result):
+        print("{operation:<8} {size:>9} {distribution:<12} {priority:<10} "
+              "{throughput:>12.0f} ops/s  p99 {p99:>9} ns  height {height}".format(
+                  p99=result["latency_ns"].get("p99", "-"), **result), file=sys.stderr)
+
+    results = run_suite(args.operations, args.sizes, args.distributions, args.priorities,
+                        seed=args.seed, repeat=args.repeat, max_degenerate=args.max_degenerate,
+                        progress=_progress)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+def main_compare(args):
+    with open(args.baseline) as baseline, open(args.current) as current:
+        changes = compare(json.load(baseline), json.load(current), args.tolerance)
+    for change in changes:
+        print("{:<8} {:>9} {:<12} {:<10} throughput {:+7.1%}  p99 {:+7.1%}{}".format(
+            *change["case"], change["throughput"], change["p99"],
+            "  REGRESSION" if change["regression"] else ""))
+    if any(change["regression"] for change in changes):
+        sys.exit(1)
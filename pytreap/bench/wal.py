@@ -0,0 +1,59 @@
+""" Measure the cost of durability: insert throughput with the write-ahead log
+under each fsync policy (against a treap without a log), then the time to
+recover the treap from its snapshot and log.
+"""
+import random
+import tempfile
+import time
+
+from .. import wal
+from ..treap import Treap
+from .workloads import make_keys
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser("wal", help="Write-ahead log throughput and recovery.",
+                                   description=__doc__)
+    parser.add_argument("-n", "--size", type=int, default=100000,
+                        help="Number of keys inserted per policy.")
+    parser.add_argument("--always-size", type=int, default=2000,
+                        help="Number of keys inserted with fsync 'always' (one sync each).")
+    parser.add_argument("-g", "--group-size", type=int, default=256,
+                        help="Records committed together.")
+    parser.set_defaults(main=main)
+
+def insert_all(treap, keys):
+    # insert every key one by one, returning the keys per second
+    insert = treap.insert
+    start = time.perf_counter()
+    for key in keys:
+        insert(key)
+    if treap.wal is not None:
+        treap.wal.flush()
+    return len(keys) / (time.perf_counter() - start)
+
+def main(args):
+    keys = make_keys(args.size, random.Random(0))
+    print("Inserting {} keys (fsync 'always': {}):".format(len(keys), args.always_size))
+    baseline = insert_all(Treap(), keys)
+    print("  {:<10} {:10.0f} keys/s".format("no log", baseline))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for fsync in wal.FSYNC_POLICIES:
+            policy_keys = keys[:args.always_size] if fsync == "always" else keys
+            treap = Treap()
+            treap.durable("{}/{}".format(directory, fsync), fsync=fsync, group_size=args.group_size)
+            rate = insert_all(treap, policy_keys)
+            treap.durable(None)
+            print("  {:<10} {:10.0f} keys/s ({:.0%} of no log)".format(fsync, rate, rate / baseline))
+
+        # recovery from the log alone, then from a snapshot alone
+        print("Recovering {} keys:".format(len(keys)))
+        path = "{}/batch".format(directory)
+        start = time.perf_counter()
+        treap = Treap.recover(path)
+        print("  {:<10} {:10.3f} s".format("log", time.perf_counter() - start))
+        treap.durable(path)
+        treap.durable(None)
+        start = time.perf_counter()
+        Treap.recover(path)
+        print("  {:<10} {:10.3f} s".format("snapshot", time.perf_counter() - start))
@@ -0,0 +1,125 @@
+""" Key, probe and priority generators for the benchmark suite.
+
+A workload fixes the order in which keys are inserted, searched for and
+deleted; a priority strategy then fixes the priorities the keys are given.
+"""
+
+import os
+import random
+import string
+from typing import List, NamedTuple, Union
+from pkg_resources import resource_filename
+
+from ..priority import FrequencyPriority, HashPriority
+
+DISTRIBUTIONS = ("uniform", "zipf", "sorted", "adversarial")
+PRIORITIES = ("random", "legacy", "hash", "weighted", "frequency", "constant")
+
+# exponent of the zipf distribution
+ZIPF_EXPONENT = 1.1
+# random low bits breaking ties between equally frequent keys
+TIE_BREAK_BITS = 10
+
+class Workload(NamedTuple):
+    """ The operation streams of one benchmark case.
+    """
+    distribution: str
+    keys: List[str]
+    probes: List[str]
+    deletes: List[str]
+
+def make_keys(size: int, rng: random.Random) -> List[str]:
+    """ Generate unique, fixed-width numeric string keys in random order.
+
+    Args:
+        size: The number of keys.
+        rng: The random number generator to draw from.
+    """
+    width = len(str(10 * size))
+    return ["{:0{}d}".format(k, width) for k in rng.sample(range(10 * size), size)]
+
+def make_workload(distribution: str, size: int, rng: random.Random) -> Workload:
+    """ Generate the insert, search and delete streams for a key distribution.
+
+    Distributions:
+     - uniform: random insertion order, probes drawn uniformly from the keys
+     - zipf: random insertion order, probes drawn from a zipf distribution over the keys
+     - sorted: keys inserted, searched and deleted in ascending order
+     - adversarial: keys inserted alternately from both ends of the key range and
+       probes for missing keys that fall between neighbours, so every search
+       descends all the way to a leaf
+
+    Args:
+        distribution: One of DISTRIBUTIONS.
+        size: The number of keys (and probes).
+        rng: The random number generator to draw from.
+    """
+    keys = make_keys(size, rng)
+    if distribution == "uniform":
+        probes = rng.choices(keys, k=size)
+        deletes = rng.sample(keys, size)
+    elif distribution == "zipf":
+        ranked = rng.sample(keys, size)
+        weights = [1.0 / (rank ** ZIPF_EXPONENT) for rank in range(1, size + 1)]
+        probes = rng.choices(ranked, weights=weights, k=size)
+        deletes = rng.sample(keys, size)
+    elif distribution == "sorted":
+        keys.sort()
+        probes = list(keys)
+        deletes = list(keys)
+    elif distribution == "adversarial":
+        ordered = sorted(keys)
+        keys = [ordered[i // 2] if i % 2 == 0 else ordered[-1 - i // 2] for i in range(size)]
+        # appending a digit sorts a probe between its key and the key's successor
+        probes = [key + "5" for key in rng.choices(ordered, k=size)]
+        deletes = list(keys)
+    else:
+        raise ValueError("Unknown key distribution '{}'.".format(distribution))
+    return Workload(distribution, keys, probes, deletes)
+
+def make_priorities(strategy: str, workload: Workload, rng: random.Random) -> Union[List[int], None]:
+    """ Generate the priorities of the workload's keys (in insertion order).
+
+    Strategies:
+     - random: the treap's default batched 64-bit random priorities (returns None)
+     - legacy: random priorities between 0 and 1000, as originally drawn by insert
+     - hash: deterministic priorities hashed from the keys (HashPriority)
+     - weighted: random priorities weighted by the number of probes (FrequencyPriority)
+     - frequency: each key's priority is the number of probes for it (with random
+       tie-breaking, as equally frequent keys would otherwise form a plain BST)
+     - constant: every key gets the same priority, degrading the treap to a plain BST
+
+    Args:
+        strategy: One of PRIORITIES.
+        workload: The workload whose keys need priorities.
+        rng: The random number generator to draw from.
+    """
+    if strategy == "random":
+        return None
+    elif strategy == "legacy":
+        return [rng.randint(0, 1000) for _ in workload.keys]
+    elif strategy == "hash":
+        return list(map(HashPriority(), workload.keys))
+    elif strategy == "weighted":
+        weights = dict.fromkeys(workload.keys, 1)
+        for probe in workload.probes:
+            if probe in weights:
+                weights[probe] += 1
+        return list(map(FrequencyPriority(weights, seed=rng.getrandbits(32)), workload.keys))
+    elif strategy == "constant":
+        return [1] * len(workload.keys)
+    elif strategy == "frequency":
+        counts = dict.fromkeys(workload.keys, 0)
+        for probe in workload.probes:
+            if probe in counts:
+                counts[probe] += 1
+        return [(counts[key] << TIE_BREAK_BITS) | rng.getrandbits(TIE_BREAK_BITS)
+                for key in workload.keys]
+    raise ValueError("Unknown priority strategy '{}'.".format(strategy))
+
+def textbook_probes() -> List[str]:
+    """ Parse the textbook data set into uppercase letters, as in the ENPM809X evaluation.
+    """
+    test_file = os.path.abspath(resource_filename('pytreap.data', 'textbook.txt'))
+    with open(test_file) as data:
+        return [c.upper() for c in data.read() if c in string.ascii_letters]
@@ -0,0 +1,174 @@
+""" Bounded-capacity cache built on a Treap
+
+Every cached key is a node of a Treap whose priority encodes the eviction
+order of the policy:
+
+    lfu  access count, ties broken by recency (least recently used first)
+    lru  recency of the last access
+    ttl  expiry time
+
+Stamps are stored inverted (CEILING - stamp), so the node to evict next
+always has the highest priority: it is the root, found in O(1) and popped in
+O(log n) expected time. Since stamps follow the order of accesses rather
+than being random, the tree isn't ordered by the cached keys themselves
+(sequential keys would line up into a list) but by (random tag, key) pairs;
+that keeps its expected depth O(log n) whatever the keys and access order.
+A dictionary maps keys to their values and nodes, so hits never search the
+tree; they only rotate the accessed node down to its new place.
+"""
+
+import random
+import time
+from typing import Any, Callable, Dict, Union
+
+from .treap import Treap
+
+POLICIES = ("lfu", "lru", "ttl")
+# upper bound of all stamps; lfu stamps pack the access count above a 64-bit tick
+CEILING = 1 << 128
+_TICK_BITS = 64
+# random tags ordering the tree
+_TAG_BITS = 64
+
+class TreapCache:
+    """ This class maps keys to values, evicting entries by priority (see
+    POLICIES) once capacity is reached. Keys must be hashable and mutually
+    comparable.
+    """
+
+    def __init__(self,
+                 capacity: int,
+                 policy: str = "lru",
+                 ttl: Union[float, None] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """ Construct an empty cache.
+
+        Args:
+            capacity: The maximum number of entries.
+            policy: One of POLICIES.
+            ttl: The default lifetime of entries in seconds; required by the ttl policy.
+            clock: Returns the current time in seconds (used by the ttl policy).
+        """
+        if capacity <= 0:
+            raise AssertionError("Capacity must be greater than zero.")
+        if policy not in POLICIES:
+            raise AssertionError("Unknown cache policy {}.".format(policy))
+        if policy == "ttl" and ttl is None:
+            raise AssertionError("The ttl policy needs a default ttl.")
+        self.capacity = capacity
+        self.policy = policy
+        self.ttl = ttl
+        self._clock = clock
+        self._treap = Treap()
+        self._random = random.Random()
+        # key -> [value, node, access count]
+        self._entries: Dict[Any, list] = {}
+        self._tick = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """ Look up a key, counting a hit or a miss.
+
+        Args:
+            key: The key to look up.
+            default: Returned if the key isn't cached (or has expired).
+
+        Returns:
+            The cached value, or default.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        if self.policy == "ttl":
+            if self._expired(entry[1]):
+                self._drop(key, entry)
+                self.expirations += 1
+                self.misses += 1
+                return default
+        else:
+            self._touch(entry)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: Any, value: Any, ttl: Union[float, None] = None) -> None:
+        """ Cache a value, evicting the entry with the lowest priority if full.
+
+        Replacing the value of a cached key counts as an access to it.
+
+        Args:
+            key: The key to cache the value under.
+            value: The value.
+            ttl: The lifetime in seconds, overriding the default (ttl policy only).
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[0] = value
+            if self.policy == "ttl":
+                self._treap._reprioritize(entry[1], self._expiry(ttl))
+            else:
+                self._touch(entry)
+            return
+
+        if len(self._entries) >= self.capacity:
+            # the root may simply have outlived its ttl, which isn't an eviction
+            if self.policy == "ttl" and self._expired(self._treap.root):
+                self.expirations += 1
+            else:
+                self.evictions += 1
+            (_, victim), _ = self._treap.pop_max()
+            del self._entries[victim]
+
+        if self.policy == "ttl":
+            priority = self._expiry(ttl)
+        else:
+            self._tick += 1
+            priority = CEILING - self._stamp(1)
+        tagged = (self._random.getrandbits(_TAG_BITS), key)
+        self._entries[key] = [value, self._treap.insert(tagged, priority), 1]
+
+    def stats(self) -> dict:
+        """ Return the counters and the hit ratio as a dictionary.
+        """
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "expirations": self.expirations, "size": len(self),
+                "hit_ratio": self.hits / lookups if lookups else 0.0}
+
+    def _touch(self, entry):
+        # Internal method to record an access under the lfu or lru policy; the stamp
+        #  only grows, so the node sinks away from the root
+        self._tick += 1
+        entry[2] += 1
+        self._treap._reprioritize(entry[1], CEILING - self._stamp(entry[2]))
+
+    def _stamp(self, count):
+        # Internal method to compute the eviction stamp of an access
+        if self.policy == "lfu":
+            return (count << _TICK_BITS) | self._tick
+        return self._tick
+
+    def _expiry(self, ttl):
+        # Internal method to compute the inverted expiry stamp of an entry
+        seconds = self._clock() + (self.ttl if ttl is None else ttl)
+        return CEILING - int(seconds * 1e9)
+
+    def _expired(self, node):
+        # Internal method to check whether an entry has outlived its ttl
+        return CEILING - node.priority <= int(self._clock() * 1e9)
+
+    def _drop(self, key, entry):
+        # Internal method to remove an entry from both the tree and the dictionary
+        self._treap._remove(entry[1])
+        del self._entries[key]
+
+    def __contains__(self, key: Any) -> bool:
+        # membership doesn't count as an access (nor check expiry)
+        return key in self._entries
+
+    def __len__(self) -> int:
+        # return the number of cached entries
+        return len(self._entries)
@@ -0,0 +1,143 @@
+""" Thread-safe Treap Class Implementation
+
+A Treap rotates nodes in place, so a thread searching while another one
+inserts can follow half-updated links. A ConcurrentTreap instead publishes
+immutable versions: its current state is a PersistentTreap, which writers
+never modify once it has been published. A writer takes the (only) lock,
+applies its update to an O(1) snapshot of the current version, copying just
+the O(log n) nodes on the paths it touches, and publishes the result with a
+single attribute assignment.
+
+Readers load the published version, again a single attribute read, and work
+on it without any lock: they never block each other nor wait for writers,
+and every read sees one consistent version (a batch of probes or an
+iteration included). Writers are serialized, which a reader-writer lock
+would do as well, but here a long read never holds up a writer.
+"""
+
+import threading
+from typing import Callable, Iterable, List, Union
+
+from .persistent import PersistentTreap
+
+class ConcurrentTreap:
+    """ This class maintains a prioritized set of keys which any number of threads
+    may search and update at once; searches are lock-free.
+    """
+
+    def __init__(self, strategy: Union[Callable[[str], int], None] = None) -> None:
+        """ Construct an empty treap.
+
+        Args:
+            strategy: Generates the priorities of keys inserted without one (see
+                pytreap.priority); defaults to batched 64-bit random priorities.
+        """
+        # the published version, replaced (never modified) by writers
+        self._version = PersistentTreap(strategy)
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> PersistentTreap:
+        """ Return a copy of the current version in O(1) time, without locking.
+
+        Returns:
+            A PersistentTreap unaffected by later updates; updating it doesn't affect
+            this treap either.
+        """
+        return self._version.snapshot()
+
+    def search(self, key: str) -> bool:
+        """ Search for the given key in the current version, without locking.
+
+        Args:
+            key: The string key to search for.
+
+        Returns:
+            Boolean indicating success or failure.
+        """
+        return self._version.search(key)
+
+    def search_many(self, keys: Iterable[str]) -> List[bool]:
+        """ Search for many keys in one consistent version, without locking.
+
+        Args:
+            keys: The string keys to search for.
+
+        Returns:
+            Booleans indicating success or failure for each probe, in order.
+        """
+        search = self._version.search
+        return [search(key) for key in keys]
+
+    def insert(self, key: str, priority: Union[int, None] = None) -> None:
+        """ Insert a new key (and optionally a priority) and publish the new version.
+
+        Args:
+            key: The string key of the new node.
+            priority: An optional integer value; if None this is randomly generated.
+        """
+        with self._lock:
+            version = self._version.snapshot()
+            version.insert(key, priority)
+            self._version = version
+
+    def insert_many(self,
+                    keys: Iterable[str],
+                    priorities: Union[Iterable[int], None] = None) -> None:
+        """ Insert a batch of keys (and optionally priorities) as a single update.
+
+        Readers see either none or all of the batch; if a key is already present
+        (or repeated) nothing is published.
+
+        Args:
+            keys: The unique string keys of the new nodes, in any order.
+            priorities: Optional integer values matching the keys one-to-one; if None
+                these are randomly generated.
+        """
+        keys = list(keys)
+        priorities = [None] * len(keys) if priorities is None else list(priorities)
+        if len(keys) != len(priorities):
+            raise AssertionError("Got {} keys but {} priorities.".format(len(keys), len(priorities)))
+        with self._lock:
+            version = self._version.snapshot()
+            for key, priority in zip(keys, priorities):
+                version.insert(key, priority)
+            self._version = version
+
+    def delete(self, key: str) -> None:
+        """ Remove the given key and publish the new version.
+
+        Args:
+            key: The string key to remove.
+
+        Raises:
+            KeyError: If the key isn't in the treap.
+        """
+        if not self.discard(key):
+            raise KeyError("Key {} not found.".format(key))
+
+    def discard(self, key: str) -> bool:
+        """ Remove the given key if present and publish the new version.
+
+        Args:
+            key: The string key to remove.
+
+        Returns:
+            Boolean indicating whether the key was found (and removed).
+        """
+        with self._lock:
+            version = self._version.snapshot()
+            if not version.discard(key):
+                return False
+            self._version = version
+            return True
+
+    def __contains__(self, key: str) -> bool:
+        return self.search(key)
+
+    def __len__(self) -> int:
+        # size of the current version
+        return len(self._version)
+
+    def __iter__(self):
+        # in-order traversal of the version current when iteration starts
+        return iter(self._version)
@@ -0,0 +1,126 @@
+""" Cursor Class Implementation
+
+A cursor keeps a finger on the last node it reached in a Treap. Searches
+start from the finger instead of the root: they climb (via parent pointers)
+only until the current subtree must contain the key and then descend as
+usual, so a key d positions away from the finger is found in O(log d)
+expected time. Local query streams, such as sorted or clustered probes, pay
+little more than the short climb; for unrelated probes the climb back up
+makes a cursor slower than Treap.search.
+"""
+
+from typing import Union
+
+class Cursor:
+    """ This class performs finger searches over a Treap and steps through its
+    keys in order. A new cursor (or one stepped past either end) is unpositioned.
+    """
+
+    def __init__(self, treap) -> None:
+        """ Construct an unpositioned cursor; see Treap.cursor.
+
+        Args:
+            treap: The Treap to search.
+        """
+        self._treap = treap
+        # the finger, or None if unpositioned
+        self._node = None
+        # generation of the treap when the finger was last known to be in it
+        self._generation = treap._generation
+
+    @property
+    def key(self) -> Union[str, None]:
+        """ The key the cursor is positioned at, or None if unpositioned.
+        """
+        node = self._finger()
+        return None if node is None else node.key
+
+    def reset(self) -> None:
+        """ Unposition the cursor; the next search starts from the root.
+        """
+        self._node = None
+
+    def search(self, key: str) -> bool:
+        """ Search for a key, starting from the last node reached.
+
+        Afterwards the cursor is positioned at the key if it was found, otherwise
+        at the last node visited (the key's predecessor or successor). Searches
+        through a cursor are neither sampled by adaptive treaps nor counted by
+        instrumented ones.
+
+        Args:
+            key: The string key to search for.
+
+        Returns:
+            Boolean indicating success or failure.
+        """
+        node = self._node
+        if node is None or self._generation != self._treap._generation:
+            node = self._finger() or self._treap.root
+            if node is None:
+                return False
+
+        # climb until the subtree under node spans the key: an ancestor reached from
+        #  the left bounds the subtree from above (and one reached from the right,
+        #  from below), while the keys of the subtree itself lie beyond the finger
+        if node.key < key:
+            parent = node.parent
+            while parent is not None and (parent.right is node or not key < parent.key):
+                node = parent
+                if not node.key < key:
+                    break
+                parent = node.parent
+        elif key < node.key:
+            parent = node.parent
+            while parent is not None and (parent.left is node or not parent.key < key):
+                node = parent
+                if not key < node.key:
+                    break
+                parent = node.parent
+
+        # then descend as usual
+        while node.key != key:
+            child = node.left if key < node.key else node.right
+            if child is None:
+                self._node = node
+                return False
+            node = child
+        self._node = node
+        return True
+
+    def next(self) -> Union[str, None]:
+        """ Step to the next key in order (the smallest one, if unpositioned).
+
+        Returns:
+            The new key, or None if there is none (the cursor is then unpositioned).
+        """
+        node = self._finger()
+        node = self._treap._min_node() if node is None else self._treap._successor(node)
+        self._node = node
+        return None if node is None else node.key
+
+    def prev(self) -> Union[str, None]:
+        """ Step to the previous key in order (the largest one, if unpositioned).
+
+        Returns:
+            The new key, or None if there is none (the cursor is then unpositioned).
+        """
+        node = self._finger()
+        node = self._treap._max_node() if node is None else self._treap._predecessor(node)
+        self._node = node
+        return None if node is None else node.key
+
+    def _finger(self):
+        # Internal method to return the finger, checking it's still part of the treap
+        #  if nodes may have left the treap since (deleted, split off, ...)
+        node = self._node
+        treap = self._treap
+        if self._generation != treap._generation:
+            self._generation = treap._generation
+            if node is not None:
+                top = node
+                while top.parent is not None:
+                    top = top.parent
+                if top is not treap.root:
+                    node = self._node = None
+        return node
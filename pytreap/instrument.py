@@ -0,0 +1,121 @@
+""" Instrumentation of Treap operations.
+
+Counters are opt-in (see Treap.instrument): a plain treap runs the original
+code paths and pays nothing for them. Shape statistics (Treap.stats) are
+computed on demand with an iterative level-order walk.
+"""
+
+from typing import Dict, List, Union
+
+class Counters:
+    """ Running totals of the work done by an instrumented treap's operations.
+
+    Path lengths count the nodes visited by an operation; the root is at depth 1.
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """ Zero all counters.
+        """
+        self.inserts = 0
+        # rotations by any operation, and those performed by inserts
+        self.rotations = 0
+        self.insert_rotations = 0
+        self.insert_path_total = 0
+        self.insert_path_max = 0
+        self.searches = 0
+        self.hits = 0
+        self.search_path_total = 0
+        self.search_path_max = 0
+        # number of searches per path length
+        self.search_path_histogram = {}
+
+    def record_insert(self, path: int, rotations: int) -> None:
+        # account for an insert which descended path nodes and then rotated
+        self.inserts += 1
+        self.insert_rotations += rotations
+        self.insert_path_total += path
+        if path > self.insert_path_max:
+            self.insert_path_max = path
+
+    def record_search(self, path: int, found: bool) -> None:
+        # account for a search which visited path nodes
+        self.searches += 1
+        self.hits += found
+        self.search_path_total += path
+        if path > self.search_path_max:
+            self.search_path_max = path
+        self.search_path_histogram[path] = self.search_path_histogram.get(path, 0) + 1
+
+    @property
+    def rotations_per_insert(self) -> float:
+        return self.insert_rotations / self.inserts if self.inserts else 0.0
+
+    @property
+    def mean_insert_path(self) -> float:
+        return self.insert_path_total / self.inserts if self.inserts else 0.0
+
+    @property
+    def mean_search_path(self) -> float:
+        return self.search_path_total / self.searches if self.searches else 0.0
+
+    def as_dict(self) -> Dict[str, Union[int, float, Dict[int, int]]]:
+        """ Export the counters (and derived averages) as a flat dictionary.
+        """
+        return {"inserts": self.inserts,
+                "rotations": self.rotations,
+                "insert_rotations": self.insert_rotations,
+                "rotations_per_insert": self.rotations_per_insert,
+                "mean_insert_path": self.mean_insert_path,
+                "max_insert_path": self.insert_path_max,
+                "searches": self.searches,
+                "hits": self.hits,
+                "mean_search_path": self.mean_search_path,
+                "max_search_path": self.search_path_max,
+                "search_path_histogram": dict(self.search_path_histogram)}
+
+def percentile(histogram: List[int], fraction: float) -> int:
+    """ Find the smallest depth at or below which the given fraction of nodes lie.
+
+    Args:
+        histogram: Node counts indexed by depth (index 0 is unused).
+        fraction: A value between 0 and 1, e.g. 0.99.
+    """
+    total = sum(histogram)
+    seen = 0
+    for depth, count in enumerate(histogram):
+        seen += count
+        if count and seen >= fraction * total:
+            return depth
+    return 0
+
+def tree_stats(root) -> Dict[str, Union[int, float, List[int]]]:
+    """ Compute shape statistics of the tree below the given node, iteratively.
+
+    Args:
+        root: The root node (or None).
+
+    Returns:
+        A dictionary with the node count, height, average and p99 node depth and
+        the depth histogram (node counts indexed by depth; the root is at depth 1).
+    """
+    histogram = [0]
+    level = [root] if root is not None else []
+    while level:
+        histogram.append(len(level))
+        below = []
+        for node in level:
+            if node.left is not None:
+                below.append(node.left)
+            if node.right is not None:
+                below.append(node.right)
+        level = below
+
+    count = sum(histogram)
+    return {"count": count,
+            "height": len(histogram) - 1,
+            "average_depth": sum(d * c for d, c in enumerate(histogram)) / count if count else 0.0,
+            "p99_depth": percentile(histogram, 0.99),
+            "depth_histogram": histogram}
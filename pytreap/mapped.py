@@ -0,0 +1,194 @@
+""" Memory-mapped, read-only Treap Class Implementation
+
+Treaps are saved in a compact binary layout:
+
+    header   magic, format version, node count, root index and the length of
+             the prefix shared by all keys
+    records  one fixed-width record per node, in key order:
+             priority, key digest, left child index, right child index,
+             key offset, key length
+    keys     UTF-8 encoded keys, back to back
+
+A MappedTreap searches and iterates directly over an mmap of such a file, so
+many processes can share one page-cached index without deserializing it.
+Since UTF-8 preserves code point order, encoded keys are compared as bytes.
+The digest holds the 8 bytes following the shared prefix (zero padded) as a
+big-endian integer, which orders like the key itself wherever two digests
+differ: a search reads it along with the links and only slices key bytes
+out of the map once the digests tie.
+"""
+
+import mmap
+import os
+import struct
+
+MAGIC = b"PYTREAP\x00"
+VERSION = 2
+_HEADER = struct.Struct("<8sIQqI")
+_RECORD = struct.Struct("<QQiiQI")
+_LINKS = struct.Struct("<QiiQI")
+_PRIORITY_SIZE = _RECORD.size - _LINKS.size
+_DIGEST_SIZE = 8
+_NONE = -1
+
+def _digest(key: bytes, shared: int) -> int:
+    # the bytes of an encoded key past the shared prefix, as an integer ordered like the key
+    return int.from_bytes(key[shared:shared + _DIGEST_SIZE].ljust(_DIGEST_SIZE, b"\x00"), "big")
+
+def dump(treap, path: str) -> None:
+    """ Write the given Treap to a file in the binary layout described above.
+
+    The file is written under a temporary name and renamed into place once
+    complete, so a failure (such as a priority beyond 64 bits) leaves any
+    existing file untouched.
+
+    Args:
+        treap: The Treap to save; its keys must be strings.
+        path: The file to (over)write.
+    """
+    # number the nodes in key order so children can be referenced by index
+    index = {}
+    keys = []
+    for position, node in enumerate(treap):
+        index[id(node)] = position
+        keys.append(node.key.encode("utf-8"))
+    # keys are sorted, so the first and last share what all of them share
+    shared = len(os.path.commonprefix([keys[0], keys[-1]])) if keys else 0
+
+    temporary = path + ".part"
+    try:
+        with open(temporary, "wb") as output:
+            root = _NONE if treap.root is None else index[id(treap.root)]
+            output.write(_HEADER.pack(MAGIC, VERSION, len(keys), root, shared))
+            offset = 0
+            for node, key in zip(treap, keys):
+                output.write(_RECORD.pack(
+                    node.priority,
+                    _digest(key, shared),
+                    _NONE if node.left is None else index[id(node.left)],
+                    _NONE if node.right is None else index[id(node.right)],
+                    offset,
+                    len(key)))
+                offset += len(key)
+            output.writelines(keys)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+class MappedTreap:
+    """ This class provides read-only search and iteration over a Treap saved with
+    Treap.save, directly on top of a shared memory map of the file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError("{} is not a pytreap file.".format(path))
+
+        # validate the header before trusting any offsets
+        if len(self._map) < _HEADER.size:
+            self.close()
+            raise ValueError("{} is not a pytreap file.".format(path))
+        magic, version, count, root, shared = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError("{} is not a pytreap file.".format(path))
+        if version != VERSION:
+            self.close()
+            raise ValueError("Unsupported pytreap file version {}.".format(version))
+        self._count = count
+        self._root = root
+        self._keys = _HEADER.size + count * _RECORD.size
+        if len(self._map) < self._keys + (shared if count else 0):
+            self.close()
+            raise ValueError("{} is truncated.".format(path))
+        # the prefix all keys share, copied once; the first key starts with it
+        self._shared = self._map[self._keys:self._keys + shared] if count else b""
+
+    def search(self, key: str) -> bool:
+        """ Search for the given key in the treap and return True if found.
+
+        Args:
+            key: The string key to search for.
+
+        Returns:
+            Boolean indicating success or failure.
+        """
+        probe = key.encode("utf-8")
+        if not probe.startswith(self._shared):
+            return False
+        digest = _digest(probe, len(self._shared))
+        data, unpack, keys = self._map, _LINKS.unpack_from, self._keys
+        base, width = _HEADER.size + _PRIORITY_SIZE, _RECORD.size
+        current = self._root
+        while current != _NONE:
+            # the priority isn't needed to search, so skip decoding it
+            candidate, left, right, offset, length = unpack(data, base + current * width)
+            if digest < candidate:
+                current = left
+            elif candidate < digest:
+                current = right
+            else:
+                # equal digests: only now copy the key out of the map
+                start = keys + offset
+                candidate = data[start:start + length]
+                if candidate == probe:
+                    return True
+                current = left if probe < candidate else right
+        return False
+
+    def items(self):
+        """ Lazily iterate over (key, priority) pairs in key order.
+
+        Yields:
+            (key, priority) tuples, read sequentially from the mapped records.
+        """
+        data, unpack, keys = self._map, _RECORD.unpack_from, self._keys
+        for position in range(self._count):
+            priority, _, _, _, offset, length = unpack(data, _HEADER.size + position * _RECORD.size)
+            start = keys + offset
+            yield data[start:start + length].decode("utf-8"), priority
+
+    def thaw(self, **kwargs):
+        """ Load the mapped treap into a new (mutable) Treap in linear time.
+
+        Args:
+            kwargs: Passed on to the Treap constructor.
+
+        Returns:
+            A Treap with the same keys and priorities.
+        """
+        from .treap import Treap
+        pairs = list(self.items())
+        return Treap.from_sorted([k for k, _ in pairs], [p for _, p in pairs], **kwargs)
+
+    def close(self) -> None:
+        """ Release the memory map and the underlying file.
+        """
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self) -> "MappedTreap":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __contains__(self, key: str) -> bool:
+        return self.search(key)
+
+    def __len__(self) -> int:
+        # return the number of keys in the mapped treap
+        return self._count
+
+    def __iter__(self):
+        # keys in order; there are no Node objects to hand out
+        for key, _ in self.items():
+            yield key
@@ -1,18 +1,23 @@
 """ Node Class used as the basic data structure of the Treap class.
 
+Nodes declare __slots__ so that no per-instance __dict__ is allocated; at
+tens of millions of keys the dictionary would otherwise dominate memory use.
+
 @TODO:
  - Handle random assignment of priority
 """
 
-from typing import Union
+from typing import NamedTuple, Union
 
 class Node:
+    __slots__ = ("key", "priority", "parent", "left", "right")
+
     # member variables
     key: str
     priority: Union[int, None]
-    parent: Union["Node", None] = None
-    left: Union["Node", None] = None
-    right: Union["Node", None] = None
+    parent: Union["Node", None]
+    left: Union["Node", None]
+    right: Union["Node", None]
 
     def __init__(self,
                  key: str,
@@ -20,8 +25,37 @@ class Node:
 
         self.key = key
         self.priority = priority
+        self.parent = None
+        self.left = None
+        self.right = None
 
     def __str__(self):
         # representation is key (priority)
         return "{} ({})".format(self.key, self.priority)
 
+class SizedNode(Node):
+    """ Node which additionally tracks the number of nodes in its subtree.
+    """
+    __slots__ = ("size",)
+
+    # member variables
+    size: int
+
+    def __init__(self,
+                 key: str,
+                 priority: Union[int, None] = None) -> None:
+
+        super().__init__(key, priority)
+        self.size = 1
+
+class PersistentNode(NamedTuple):
+    """ Immutable node of a PersistentTreap; subtrees are shared between versions.
+    """
+    key: str
+    priority: int
+    left: Union["PersistentNode", None]
+    right: Union["PersistentNode", None]
+
+    def __str__(self):
+        # representation is key (priority)
+        return "{} ({})".format(self.key, self.priority)
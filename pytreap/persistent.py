@@ -0,0 +1,182 @@
+""" Persistent Treap Class Implementation
+
+This class defines a persistent (path-copying) Treap: nodes are never
+modified once created, so every update copies only the O(log n) nodes on the
+path it touches and all older versions remain valid and share the rest.
+"""
+
+from typing import Callable, Union
+
+from .node import PersistentNode
+from .priority import DEFAULT_STRATEGY
+
+class PersistentTreap:
+    """ This class maintains a prioritized set of immutable Nodes. Taking a
+    snapshot is O(1) and snapshots are unaffected by later updates.
+    """
+
+    def __init__(self, strategy: Union[Callable[[str], int], None] = None) -> None:
+        """ Construct an empty treap.
+
+        Args:
+            strategy: Generates the priorities of keys inserted without one (see
+                pytreap.priority); defaults to batched 64-bit random priorities.
+        """
+        # default instantiation creates an empty treap
+        self.root = None
+        self._size = 0
+        self._strategy = strategy if strategy is not None else DEFAULT_STRATEGY
+
+    def snapshot(self) -> "PersistentTreap":
+        """ Return a point-in-time copy of this treap in O(1) time.
+
+        Returns:
+            A PersistentTreap sharing all nodes with this one.
+        """
+        snapshot = type(self)(self._strategy)
+        snapshot.root = self.root
+        snapshot._size = self._size
+        return snapshot
+
+    def insert(self, key: str, priority: Union[int, None] = None) -> None:
+        """ Insert a new key (and optionally a priority), copying the path to it.
+
+        Args:
+            key: The string key of the new node.
+            priority: An optional integer value; if None this is randomly generated.
+        """
+        # record the path down to the empty leaf position
+        path = []
+        current = self.root
+        while current is not None:
+            if key < current.key:
+                path.append((current, True))
+                current = current.left
+            elif current.key < key:
+                path.append((current, False))
+                current = current.right
+            else:
+                raise AssertionError("Key {} already in use.".format(key))
+
+        # rebuild the path bottom-up, rotating the new node up while it outranks its parent
+        child = PersistentNode(key, self._priority(key, priority), None, None)
+        for node, went_left in reversed(path):
+            if went_left:
+                if node.priority < child.priority:
+                    child = PersistentNode(child.key, child.priority, child.left,
+                        PersistentNode(node.key, node.priority, child.right, node.right))
+                else:
+                    child = PersistentNode(node.key, node.priority, child, node.right)
+            else:
+                if node.priority < child.priority:
+                    child = PersistentNode(child.key, child.priority,
+                        PersistentNode(node.key, node.priority, node.left, child.left), child.right)
+                else:
+                    child = PersistentNode(node.key, node.priority, node.left, child)
+        self.root = child
+        self._size += 1
+
+    def delete(self, key: str) -> None:
+        """ Remove the given key, copying the path to it.
+
+        Args:
+            key: The string key to remove.
+
+        Raises:
+            KeyError: If the key isn't in the treap.
+        """
+        if not self.discard(key):
+            raise KeyError("Key {} not found.".format(key))
+
+    def discard(self, key: str) -> bool:
+        """ Remove the given key if present, copying the path to it.
+
+        Args:
+            key: The string key to remove.
+
+        Returns:
+            Boolean indicating whether the key was found (and removed).
+        """
+        path = []
+        current = self.root
+        while current is not None and current.key != key:
+            went_left = key < current.key
+            path.append((current, went_left))
+            current = current.left if went_left else current.right
+        if current is None:
+            return False
+
+        # the removed node's subtrees take its place, then the path is copied
+        child = self._merge(current.left, current.right)
+        for node, went_left in reversed(path):
+            if went_left:
+                child = PersistentNode(node.key, node.priority, child, node.right)
+            else:
+                child = PersistentNode(node.key, node.priority, node.left, child)
+        self.root = child
+        self._size -= 1
+        return True
+
+    def search(self, key: str) -> bool:
+        """ Search for the given key in the treap and return True if found.
+
+        Args:
+            key: The string key to search for.
+
+        Returns:
+            Boolean indicating success or failure.
+        """
+        current = self.root
+        while current is not None:
+            if current.key == key:
+                return True
+            elif key < current.key:
+                current = current.left
+            else:
+                current = current.right
+        return False
+
+    @staticmethod
+    def _merge(lower, upper):
+        # Internal method to join two subtrees where every key in lower is less than
+        #  every key in upper. Only the nodes on the zipped spines are copied.
+        spine = []
+        while lower is not None and upper is not None:
+            if lower.priority >= upper.priority:
+                spine.append((lower, True))
+                lower = lower.right
+            else:
+                spine.append((upper, False))
+                upper = upper.left
+        child = lower if lower is not None else upper
+        for node, from_lower in reversed(spine):
+            if from_lower:
+                child = PersistentNode(node.key, node.priority, node.left, child)
+            else:
+                child = PersistentNode(node.key, node.priority, child, node.right)
+        return child
+
+    def _priority(self, key: str, priority: Union[int, None]) -> int:
+        # Internal method to validate a user supplied priority or generate our own
+        if priority is not None and priority < 0:
+            raise AssertionError("Priority must be greater than zero.")
+        elif priority is None:
+            priority = self._strategy(key)
+        return priority
+
+    def __len__(self) -> int:
+        # return the current size of the treap
+        return self._size
+
+    def __iter__(self):
+        # in-order traversal with an explicit stack (nodes have no parent links)
+        stack = []
+        current = self.root
+        while stack or current is not None:
+            if current is not None:
+                stack.append(current)
+                current = current.left
+            else:
+                current = stack.pop()
+                yield current
+                current = current.right
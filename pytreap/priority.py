@@ -0,0 +1,111 @@
+""" Priority strategies for Treap and PersistentTreap.
+
+A strategy is called with the key of every node inserted without an explicit
+priority and returns that node's priority. Any callable taking a key and
+returning a non-negative integer can be used; these classes cover the common
+cases. All built-in strategies produce priorities below 2**64, so collisions
+(which weaken the expected O(log n) depth guarantee) are vanishingly rare.
+"""
+
+import abc
+import hashlib
+import random
+from array import array
+from typing import Hashable, Mapping, Union
+
+# all built-in strategies produce priorities in [0, 2**PRIORITY_BITS)
+PRIORITY_BITS = 64
+
+class PriorityStrategy(abc.ABC):
+    """ Base class of the built-in priority strategies.
+    """
+
+    @abc.abstractmethod
+    def __call__(self, key: Hashable) -> int:
+        """ Return the priority of a node with the given key.
+        """
+
+class RandomPriority(PriorityStrategy):
+    """ Uniformly random 64-bit priorities, generated in batches.
+
+    Drawing a whole batch of random bits at once and handing them out from an
+    array is several times faster than one call into the random module per key.
+    """
+
+    def __init__(self, batch: int = 1024, seed: Union[int, None] = None) -> None:
+        """ Construct a random priority generator.
+
+        Args:
+            batch: The number of priorities generated at a time.
+            seed: Optional seed, for reproducible priorities.
+        """
+        if batch < 1:
+            raise AssertionError("Batch size must be greater than zero.")
+        self._random = random.Random(seed)
+        self._batch = batch
+        self._pool = array("Q")
+
+    def __call__(self, key: Hashable) -> int:
+        # the pool may be shared by threads (DEFAULT_STRATEGY is), so rather than
+        #  checking for an empty pool and then popping, pop and refill on failure
+        while True:
+            try:
+                return self._pool.pop()
+            except IndexError:
+                bits = self._random.getrandbits(PRIORITY_BITS * self._batch)
+                self._pool.frombytes(bits.to_bytes(PRIORITY_BITS // 8 * self._batch, "little"))
+
+class HashPriority(PriorityStrategy):
+    """ Deterministic priorities derived from a hash of the key.
+
+    The same keys always produce the same tree shape, regardless of insertion
+    order or process (unlike the salted builtin hash of strings).
+    """
+
+    def __init__(self, salt: bytes = b"") -> None:
+        """ Construct a hashing priority generator.
+
+        Args:
+            salt: Optional salt; different salts produce independent shapes.
+        """
+        self._salt = salt
+
+    def __call__(self, key: Hashable) -> int:
+        data = key if isinstance(key, bytes) else str(key).encode("utf-8")
+        digest = hashlib.blake2b(data, digest_size=PRIORITY_BITS // 8, key=self._salt).digest()
+        return int.from_bytes(digest, "little")
+
+class FrequencyPriority(PriorityStrategy):
+    """ Random priorities weighted by (expected) access frequency.
+
+    A key of weight w gets the priority U ** (1 / w) for a uniform U, i.e. the
+    maximum of w uniform draws (a weighted randomized search tree). Frequently
+    accessed keys thus tend to sit near the root - an access to a key of weight w
+    out of a total weight W takes expected O(log(W / w)) steps - while the tree
+    stays randomized, so its height remains O(log n) in expectation.
+    """
+
+    def __init__(self,
+                 weights: Mapping[Hashable, float],
+                 default: float = 1.0,
+                 seed: Union[int, None] = None) -> None:
+        """ Construct a weighted priority generator.
+
+        Args:
+            weights: The weight (e.g. access frequency) of each key.
+            default: The weight of keys missing from weights.
+            seed: Optional seed, for reproducible priorities.
+        """
+        if default <= 0 or any(weight <= 0 for weight in weights.values()):
+            raise AssertionError("Weights must be greater than zero.")
+        self._weights = weights
+        self._default = default
+        self._random = random.Random(seed)
+
+    def __call__(self, key: Hashable) -> int:
+        weight = self._weights.get(key, self._default)
+        scaled = int(self._random.random() ** (1.0 / weight) * (1 << PRIORITY_BITS))
+        return min(scaled, (1 << PRIORITY_BITS) - 1)
+
+# strategy used by treaps constructed without one
+DEFAULT_STRATEGY = RandomPriority()
@@ -0,0 +1,462 @@
+""" Asyncio Treap server and client
+
+A TreapServer hosts one Treap behind a Unix domain (or localhost TCP)
+socket, so that many processes can share it instead of each building their
+own. Messages are length-prefixed binary frames:
+
+    frame     length (uint32) and payload
+    request   operation, flags (uint8 each), request id (uint32), body
+    response  status (uint8), request id (uint32), body
+
+Request bodies carry a batch of keys: the key count (uint32), the UTF-8
+byte length of every key (uint32 each) and the keys back to back; inserts
+may add one priority per key (uint64 each). Search and delete respond with
+one byte per key, insert and length with a count (uint64). All integers
+are little-endian.
+
+Clients may pipeline any number of requests on a connection; responses come
+back in request order. Reads run as soon as every earlier request of their
+connection is answered, while all writes go through a single writer task,
+which applies them in arrival order.
+"""
+
+import argparse
+import asyncio
+import struct
+import sys
+from array import array
+from typing import Iterable, List, Sequence, Tuple, Union
+
+from .priority import PRIORITY_BITS
+from .treap import Treap
+
+# operations
+SEARCH = 1
+INSERT = 2
+DELETE = 3
+LENGTH = 4
+
+# insert flags: the duplicate policy (an index into POLICIES) and whether priorities follow
+POLICIES = ("raise", "skip", "replace")
+_POLICY_MASK = 3
+_PRIORITIES = 4
+
+# response statuses; errors are re-raised by the client as the matching exception type
+OK = 0
+ERRORS = (KeyError, AssertionError, RuntimeError)
+
+_FRAME = struct.Struct("<I")
+_REQUEST = struct.Struct("<BBI")
+_RESPONSE = struct.Struct("<BI")
+_COUNT = struct.Struct("<I")
+_TOTAL = struct.Struct("<Q")
+
+def _pack_array(typecode: str, values: Iterable[int]) -> bytes:
+    # pack unsigned integers little-endian
+    items = array(typecode, values)
+    if sys.byteorder == "big":
+        items.byteswap()
+    return items.tobytes()
+
+def _unpack_array(typecode: str, data: bytes, offset: int, count: int) -> Tuple[array, int]:
+    # unpack little-endian unsigned integers, returning them and the offset past them
+    items = array(typecode)
+    end = offset + count * items.itemsize
+    if end > len(data):
+        raise AssertionError("Truncated request body.")
+    items.frombytes(data[offset:end])
+    if sys.byteorder == "big":
+        items.byteswap()
+    return items, end
+
+def encode_keys(keys: Sequence[str]) -> bytes:
+    """ Encode a batch of keys as a request body.
+    """
+    encoded = [key.encode("utf-8") for key in keys]
+    return _COUNT.pack(len(encoded)) + _pack_array("I", map(len, encoded)) + b"".join(encoded)
+
+def decode_keys(data: bytes, offset: int = 0) -> Tuple[List[str], int]:
+    """ Decode a batch of keys, returning them and the offset past them.
+    """
+    count, = _COUNT.unpack_from(data, offset)
+    lengths, offset = _unpack_array("I", data, offset + _COUNT.size, count)
+    if offset + sum(lengths) > len(data):
+        raise AssertionError("Truncated request body.")
+    keys = []
+    for length in lengths:
+        keys.append(data[offset:offset + length].decode("utf-8"))
+        offset += length
+    return keys, offset
+
+def _frame(header: struct.Struct, *fields) -> bytes:
+    # build a frame from a header and its trailing body (the last field)
+    body = fields[-1]
+    return _FRAME.pack(header.size + len(body)) + header.pack(*fields[:-1]) + body
+
+class TreapServer:
+    """ This class serves a Treap to TreapClients over a socket.
+    """
+
+    def __init__(self, treap: Union[Treap, None] = None) -> None:
+        """ Construct a server; call start to begin serving.
+
+        Args:
+            treap: The Treap to serve; defaults to a new, empty one.
+        """
+        self.treap = treap if treap is not None else Treap()
+        self._server = None
+        self._writes = None
+        self._writer = None
+        # writer -> task serving the connection
+        self._connections = {}
+
+    async def start(self,
+                    path: Union[str, None] = None,
+                    host: str = "127.0.0.1",
+                    port: int = 0) -> "TreapServer":
+        """ Start listening on a Unix domain socket, or on a TCP port if no path is given.
+
+        Args:
+            path: The path of the Unix domain socket.
+            host: The TCP host, localhost by default.
+            port: The TCP port; zero picks a free one (see address).
+
+        Returns:
+            The server itself.
+        """
+        self._writes = asyncio.Queue()
+        self._writer = asyncio.ensure_future(self._apply_writes())
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._serve, path=path)
+        else:
+            self._server = await asyncio.start_server(self._serve, host, port)
+        return self
+
+    @property
+    def address(self):
+        """ The socket address the server listens on (a path, or a host and port).
+        """
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self) -> None:
+        """ Serve until cancelled.
+        """
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """ Stop listening and drop all connections; does nothing if not started.
+        """
+        server, self._server = self._server, None
+        if server is None:
+            return
+        server.close()
+        for writer in list(self._connections):
+            writer.close()
+        await server.wait_closed()
+        self._writer.cancel()
+        # writes which never got applied are answered with an error
+        while not self._writes.empty():
+            done = self._writes.get_nowait()[-1]
+            if not done.done():
+                done.set_result((len(ERRORS), b"Server closed."))
+        # the closed connections read EOF; wait for them to finish answering
+        await asyncio.gather(self._writer, *self._connections.values(), return_exceptions=True)
+
+    async def __aenter__(self) -> "TreapServer":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def _serve(self, reader, writer):
+        # Internal method to read the requests of a connection. Writes are queued for
+        #  the writer task; every request gets a place in the connection's queue of
+        #  responses, so they're answered in order.
+        self._connections[writer] = asyncio.current_task()
+        responses = asyncio.Queue()
+        responder = asyncio.ensure_future(self._respond(responses, writer))
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                size, = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+                payload = await reader.readexactly(size)
+                try:
+                    operation, flags, request = _REQUEST.unpack_from(payload)
+                except struct.error:
+                    # without a header there's no request id to answer; hang up
+                    break
+                if operation in (INSERT, DELETE):
+                    done = loop.create_future()
+                    self._writes.put_nowait((operation, flags, payload, done))
+                    responses.put_nowait((request, done))
+                else:
+                    responses.put_nowait((request, (operation, flags, payload)))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            responses.put_nowait(None)
+            await responder
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _respond(self, responses, writer):
+        # Internal method to answer the requests of a connection in order; reads run
+        #  here, once all earlier writes of the connection have been applied
+        while True:
+            item = await responses.get()
+            if item is None:
+                return
+            request, work = item
+            if isinstance(work, asyncio.Future):
+                status, body = await work
+            else:
+                status, body = self._execute(*work)
+            writer.write(_frame(_RESPONSE, status, request, body))
+            if responses.empty():
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    pass
+
+    async def _apply_writes(self):
+        # Internal method run by the single writer task: apply the queued writes of
+        #  all connections in arrival order, a whole backlog per wake-up
+        while True:
+            batch = [await self._writes.get()]
+            while not self._writes.empty():
+                batch.append(self._writes.get_nowait())
+            for operation, flags, payload, done in batch:
+                if not done.cancelled():
+                    done.set_result(self._execute(operation, flags, payload))
+
+    def _execute(self, operation, flags, payload):
+        # Internal method to run a request against the treap, returning the status
+        #  and the response body
+        treap = self.treap
+        try:
+            if operation not in (SEARCH, INSERT, DELETE, LENGTH):
+                raise AssertionError("Unknown operation {}.".format(operation))
+            if operation == LENGTH:
+                return OK, _TOTAL.pack(len(treap))
+            keys, offset = decode_keys(payload, _REQUEST.size)
+            if operation == SEARCH:
+                search = treap.search
+                return OK, bytes([search(key) for key in keys])
+            elif operation == DELETE:
+                discard = treap.discard
+                return OK, bytes([discard(key) for key in keys])
+            priorities = None
+            if flags & _PRIORITIES:
+                priorities = _unpack_array("Q", payload, offset, len(keys))[0].tolist()
+            policy = POLICIES[flags & _POLICY_MASK]
+            if len(keys) == 1 and policy == "raise":
+                treap.insert(keys[0], None if priorities is None else priorities[0])
+                added = 1
+            else:
+                added = treap.insert_many(keys, priorities, policy)
+            return OK, _TOTAL.pack(added)
+        except Exception as error:
+            status = next((i for i, kind in enumerate(ERRORS, 1) if isinstance(error, kind)), len(ERRORS))
+            return status, str(error.args[0] if error.args else error).encode("utf-8")
+
+class _Connection:
+    # one pipelined client connection; responses are matched to requests by id
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._waiting = {}
+        self._next = 0
+        self._receiver = asyncio.ensure_future(self._receive())
+
+    async def request(self, operation, flags, body):
+        if self._receiver.done():
+            raise ConnectionError("Lost the connection to the treap server.")
+        self._next = request = (self._next + 1) & 0xFFFFFFFF
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request] = future
+        self._writer.write(_frame(_REQUEST, operation, flags, request, body))
+        await self._writer.drain()
+        return await future
+
+    async def close(self):
+        self._writer.close()
+        self._receiver.cancel()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def _receive(self):
+        # hand every response to the request waiting for it
+        try:
+            while True:
+                size, = _FRAME.unpack(await self._reader.readexactly(_FRAME.size))
+                payload = await self._reader.readexactly(size)
+                status, request = _RESPONSE.unpack_from(payload)
+                future = self._waiting.pop(request, None)
+                if future is not None and not future.done():
+                    future.set_result((status, payload[_RESPONSE.size:]))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Lost the connection to the treap server."))
+            self._waiting.clear()
+
+class TreapClient:
+    """ This class talks to a TreapServer over a pool of pipelined connections,
+    used in turn; any number of coroutines may share one client.
+    """
+
+    def __init__(self,
+                 path: Union[str, None] = None,
+                 host: str = "127.0.0.1",
+                 port: Union[int, None] = None,
+                 pool_size: int = 4) -> None:
+        """ Construct a client; call connect (or use it as an async context manager).
+
+        Args:
+            path: The Unix domain socket of the server.
+            host: The TCP host of the server, if no path is given.
+            port: The TCP port of the server, if no path is given.
+            pool_size: The number of connections to open.
+        """
+        if pool_size <= 0:
+            raise AssertionError("Pool size must be greater than zero.")
+        self._path = path
+        self._host = host
+        self._port = port
+        self._pool_size = pool_size
+        self._pool = []
+        self._turn = 0
+
+    async def connect(self) -> "TreapClient":
+        """ Open the pool of connections.
+
+        Returns:
+            The client itself.
+        """
+        for _ in range(self._pool_size):
+            if self._path is not None:
+                reader, writer = await asyncio.open_unix_connection(self._path)
+            else:
+                reader, writer = await asyncio.open_connection(self._host, self._port)
+            self._pool.append(_Connection(reader, writer))
+        return self
+
+    async def close(self) -> None:
+        """ Close all connections.
+        """
+        pool, self._pool = self._pool, []
+        for connection in pool:
+            await connection.close()
+
+    async def __aenter__(self) -> "TreapClient":
+        return await self.connect()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def search(self, key: str) -> bool:
+        """ Search for the given key in the served treap.
+        """
+        return (await self.search_many([key]))[0]
+
+    async def search_many(self, keys: Sequence[str]) -> List[bool]:
+        """ Search for a batch of keys in one request.
+
+        Returns:
+            Booleans indicating success or failure for each key, in order.
+        """
+        body = await self._call(SEARCH, 0, encode_keys(keys))
+        return [bool(found) for found in body]
+
+    async def insert(self, key: str, priority: Union[int, None] = None) -> None:
+        """ Insert a new key (and optionally a 64-bit priority).
+
+        Raises:
+            AssertionError: If the key is already in use (or the priority is invalid).
+        """
+        await self.insert_many([key], None if priority is None else [priority])
+
+    async def insert_many(self,
+                          keys: Sequence[str],
+                          priorities: Union[Sequence[int], None] = None,
+                          on_duplicate: str = "raise") -> int:
+        """ Insert a batch of keys in one request; see Treap.insert_many.
+
+        Returns:
+            The number of keys added.
+        """
+        if on_duplicate not in POLICIES:
+            raise AssertionError("Unknown duplicate policy {}.".format(on_duplicate))
+        if priorities is not None:
+            if len(priorities) != len(keys):
+                raise AssertionError("Got {} keys but {} priorities.".format(len(keys), len(priorities)))
+            if not all(0 <= priority < 1 << PRIORITY_BITS for priority in priorities):
+                raise AssertionError("Priorities must fit in {} bits.".format(PRIORITY_BITS))
+        flags = POLICIES.index(on_duplicate)
+        body = encode_keys(keys)
+        if priorities is not None:
+            flags |= _PRIORITIES
+            body += _pack_array("Q", priorities)
+        return _TOTAL.unpack(await self._call(INSERT, flags, body))[0]
+
+    async def delete(self, key: str) -> None:
+        """ Remove the given key.
+
+        Raises:
+            KeyError: If the key isn't in the treap.
+        """
+        if not await self.discard(key):
+            raise KeyError("Key {} not found.".format(key))
+
+    async def discard(self, key: str) -> bool:
+        """ Remove the given key if present.
+
+        Returns:
+            Boolean indicating whether the key was found (and removed).
+        """
+        return bool((await self._call(DELETE, 0, encode_keys([key])))[0])
+
+    async def length(self) -> int:
+        """ Return the number of keys in the served treap.
+        """
+        return _TOTAL.unpack(await self._call(LENGTH, 0, b""))[0]
+
+    async def _call(self, operation, flags, body):
+        # Internal method to send a request over the next connection of the pool
+        if not self._pool:
+            raise ConnectionError("Client is not connected.")
+        connection = self._pool[self._turn]
+        self._turn = (self._turn + 1) % len(self._pool)
+        status, body = await connection.request(operation, flags, body)
+        if status != OK:
+            raise ERRORS[min(status, len(ERRORS)) - 1](body.decode("utf-8"))
+        return body
+
+def main(argv: Union[List[str], None] = None) -> None:
+    parser = argparse.ArgumentParser(prog="pytreap.server", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-u", "--unix", help="Serve on this Unix domain socket.")
+    parser.add_argument("-p", "--port", type=int, default=0, help="Serve on this localhost TCP port.")
+    parser.add_argument("-l", "--load", help="Serve the treap saved (by Treap.save) in this file.")
+    args = parser.parse_args(argv)
+
+    treap = None
+    if args.load:
+        with Treap.open_mmap(args.load) as mapped:
+            treap = mapped.thaw()
+
+    async def _serve():
+        server = await TreapServer(treap).start(args.unix, port=args.port)
+        print("Serving {} keys on {}.".format(len(server.treap), server.address))
+        await server.serve_forever()
+
+    try:
+        asyncio.run(_serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+""" Key-range sharded Treap Class Implementation
+
+A ShardedTreap partitions the key space at a sorted list of boundary keys;
+shard i holds the keys k with boundaries[i - 1] <= k < boundaries[i]. Every
+shard is a Treap living in its own worker process (a single-worker
+ProcessPoolExecutor, so the shard's state stays put between calls), which
+sidesteps the GIL: shards are built, searched and updated in parallel.
+
+Batches are routed to the shards by bisecting the boundaries and shipped in
+chunks, so the front process pickles the next chunk while workers are busy
+with the previous ones. Single-key operations are available as well but
+pay for a round trip to a worker each.
+"""
+
+import os
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Sequence, Union
+
+from .treap import Treap
+
+# default number of keys per message to a shard
+CHUNK_SIZE = 10000
+
+# the treap of the shard served by this (worker) process, and its constructor options
+_shard = None
+_options = {}
+
+def _init_shard(options: dict) -> None:
+    # executor initializer: give the worker process an empty treap
+    global _shard, _options
+    _options = options
+    _shard = Treap(**options)
+
+def _build(keys: List[str], priorities: Union[List[int], None]) -> int:
+    # replace the shard by a treap built from sorted keys, in the same modes
+    global _shard
+    _shard = Treap.from_sorted(keys, priorities, **_options)
+    return len(_shard)
+
+def _call(name: str, *args):
+    # run a Treap method on the shard
+    return getattr(_shard, name)(*args)
+
+def _insert(key: str, priority: Union[int, None]) -> None:
+    # insert into the shard (without shipping the new node, and the tree, back)
+    _shard.insert(key, priority)
+
+def _search_chunk(keys: List[str]) -> List[bool]:
+    # search for each key of a chunk, as a plain list even if numpy is around
+    found = _shard.search_many(keys)
+    return found if isinstance(found, list) else found.tolist()
+
+def _keys() -> List[str]:
+    # all keys of the shard, in order
+    return [node.key for node in _shard]
+
+class ShardedTreap:
+    """ This class spreads a set of keys over several Treaps, one per worker
+    process, by key range.
+    """
+
+    def __init__(self,
+                 boundaries: Sequence[str] = (),
+                 chunk_size: int = CHUNK_SIZE,
+                 **kwargs) -> None:
+        """ Construct an empty sharded treap and start its worker processes.
+
+        Args:
+            boundaries: Strictly increasing keys at which the key space is cut; there
+                is one shard more than there are boundaries.
+            chunk_size: The number of keys sent to a shard per message.
+            kwargs: Passed on to the Treap constructor of every shard.
+        """
+        boundaries = list(boundaries)
+        if any(not a < b for a, b in zip(boundaries, boundaries[1:])):
+            raise AssertionError("Shard boundaries must be strictly increasing.")
+        if chunk_size <= 0:
+            raise AssertionError("Chunk size must be greater than zero.")
+        self.boundaries = boundaries
+        self.chunk_size = chunk_size
+        self._executors = [ProcessPoolExecutor(max_workers=1, initializer=_init_shard, initargs=(kwargs,))
+                           for _ in range(len(boundaries) + 1)]
+
+    @classmethod
+    def from_keys(cls,
+                  keys: Iterable[str],
+                  priorities: Union[Iterable[int], None] = None,
+                  shards: Union[int, None] = None,
+                  **kwargs) -> "ShardedTreap":
+        """ Construct a sharded treap from unique keys, building the shards in parallel.
+
+        The keys are sorted and cut into equally sized ranges; every shard then
+        builds its treap with Treap.from_sorted in linear time.
+
+        Args:
+            keys: The unique string keys of the new nodes.
+            priorities: Optional integer values matching the keys one-to-one; if None
+                these are randomly generated.
+            shards: The number of shards; defaults to the number of CPUs.
+            kwargs: Passed on to the ShardedTreap constructor.
+
+        Returns:
+            The new ShardedTreap.
+        """
+        if priorities is None:
+            keys, priorities = sorted(keys), None
+        else:
+            pairs = sorted(zip(keys, priorities), key=lambda pair: pair[0])
+            keys, priorities = [k for k, _ in pairs], [p for _, p in pairs]
+        shards = max(1, min(shards or os.cpu_count() or 1, len(keys)))
+
+        # cut into equal ranges; from_sorted rejects duplicates within a range, so
+        #  only those straddling a cut need checking here
+        cuts = [len(keys) * i // shards for i in range(shards + 1)]
+        for cut in cuts[1:-1]:
+            if keys[cut - 1] == keys[cut]:
+                raise AssertionError("Keys must be unique; {} is repeated.".format(keys[cut]))
+        sharded = cls([keys[cut] for cut in cuts[1:-1]], **kwargs)
+        futures = [executor.submit(_build, keys[lo:hi], None if priorities is None else priorities[lo:hi])
+                   for executor, lo, hi in zip(sharded._executors, cuts, cuts[1:])]
+        try:
+            for future in futures:
+                future.result()
+        except BaseException:
+            sharded.close()
+            raise
+        return sharded
+
+    def search(self, key: str) -> bool:
+        """ Search for the given key in its shard.
+
+        Args:
+            key: The string key to search for.
+
+        Returns:
+            Boolean indicating success or failure.
+        """
+        return self._shard_of(key).submit(_call, "search", key).result()
+
+    def insert(self, key: str, priority: Union[int, None] = None) -> None:
+        """ Insert a new key (and optionally a priority) into its shard.
+
+        Args:
+            key: The string key of the new node.
+            priority: An optional integer value; if None this is randomly generated.
+        """
+        self._shard_of(key).submit(_insert, key, priority).result()
+
+    def delete(self, key: str) -> None:
+        """ Remove the given key from its shard.
+
+        Args:
+            key: The string key to remove.
+
+        Raises:
+            KeyError: If the key isn't in the treap.
+        """
+        self._shard_of(key).submit(_call, "delete", key).result()
+
+    def discard(self, key: str) -> bool:
+        """ Remove the given key from its shard, if present.
+
+        Args:
+            key: The string key to remove.
+
+        Returns:
+            Boolean indicating whether the key was found (and removed).
+        """
+        return self._shard_of(key).submit(_call, "discard", key).result()
+
+    def search_many(self, keys: Iterable[str]) -> List[bool]:
+        """ Search for many keys at once, fanning the probes out to all shards.
+
+        Args:
+            keys: The string keys to search for.
+
+        Returns:
+            Booleans indicating success or failure for each probe, in order.
+        """
+        probes = keys if isinstance(keys, list) else list(keys)
+        routes = self._route(probes)
+        futures = [[executor.submit(_search_chunk, [probes[i] for i in chunk]) for chunk in chunks]
+                   for executor, chunks in zip(self._executors, routes)]
+
+        found = [False] * len(probes)
+        for chunks, results in zip(routes, futures):
+            for chunk, result in zip(chunks, results):
+                for index, hit in zip(chunk, result.result()):
+                    found[index] = hit
+        return found
+
+    def insert_many(self,
+                    keys: Iterable[str],
+                    priorities: Union[Iterable[int], None] = None,
+                    on_duplicate: str = "raise") -> int:
+        """ Insert a batch of keys (and optionally priorities), every shard merging
+        its part with Treap.insert_many.
+
+        Keys already present (or repeated in the batch) are handled according to
+        on_duplicate as in Treap.insert_many; with 'raise' all shards are checked
+        before any of them is modified.
+
+        Args:
+            keys: The string keys of the new nodes, in any order.
+            priorities: Optional integer values matching the keys one-to-one; if None
+                these are randomly generated.
+            on_duplicate: One of 'raise', 'skip' or 'replace'.
+
+        Returns:
+            The number of keys added.
+        """
+        keys = list(keys)
+        priorities = None if priorities is None else list(priorities)
+        if priorities is not None and len(keys) != len(priorities):
+            raise AssertionError("Got {} keys but {} priorities.".format(len(keys), len(priorities)))
+        if on_duplicate == "raise":
+            if len(set(keys)) != len(keys):
+                raise AssertionError("Duplicate keys in batch.")
+            for key, found in zip(keys, self.search_many(keys)):
+                if found:
+                    raise AssertionError("Key {} already in use.".format(key))
+
+        # a shard gets all of its keys at once, so batch duplicates meet in insert_many
+        futures = []
+        for executor, chunks in zip(self._executors, self._route(keys, chunk_size=len(keys) or 1)):
+            for chunk in chunks:
+                futures.append(executor.submit(
+                    _call, "insert_many", [keys[i] for i in chunk],
+                    None if priorities is None else [priorities[i] for i in chunk], on_duplicate))
+        return sum(future.result() for future in futures)
+
+    def close(self) -> None:
+        """ Shut down the worker processes; their shards are lost.
+        """
+        for executor in self._executors:
+            executor.shutdown()
+
+    def _shard_of(self, key: str) -> ProcessPoolExecutor:
+        # Internal method to find the executor of the shard holding key
+        return self._executors[bisect_right(self.boundaries, key)]
+
+    def _route(self, keys: List[str], chunk_size: Union[int, None] = None) -> List[List[List[int]]]:
+        # Internal method to group the positions of keys by shard, in chunks
+        size = chunk_size or self.chunk_size
+        routes = [[[]] for _ in self._executors]
+        boundaries = self.boundaries
+        for index, key in enumerate(keys):
+            chunks = routes[bisect_right(boundaries, key)]
+            if len(chunks[-1]) == size:
+                chunks.append([])
+            chunks[-1].append(index)
+        return [[chunk for chunk in chunks if chunk] for chunks in routes]
+
+    def __enter__(self) -> "ShardedTreap":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __contains__(self, key: str) -> bool:
+        return self.search(key)
+
+    def __len__(self) -> int:
+        # total number of keys over all shards
+        return sum(future.result() for future in
+                   [executor.submit(_call, "__len__") for executor in self._executors])
+
+    def __iter__(self):
+        # keys in order: the shards are fetched one after the other
+        for executor in self._executors:
+            yield from executor.submit(_keys).result()
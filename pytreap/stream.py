@@ -0,0 +1,96 @@
+""" Streaming ingestion of probe files (see Treap.search_stream).
+
+A probe file is read as fixed-size binary chunks, straight out of an mmap
+where the file allows it, and every chunk is filtered and normalized with a
+single bytes.translate call. Each remaining byte is one probe; probes are
+tallied per byte value, so memory stays bounded by the chunk size no matter
+how large the file is, and the treap only needs one search per distinct key.
+"""
+
+import collections
+import mmap
+import string
+from typing import Dict, Iterator, List, NamedTuple, Union
+
+try:
+    import numpy
+except ImportError:
+    # numpy is only an optional accelerator for counting bytes
+    numpy = None
+
+# default number of bytes read per chunk
+CHUNK_SIZE = 1 << 20
+# tallying with bytes.count (one pass per value) beats a Counter for this many values
+_COUNT_LIMIT = 64
+
+# the normalization of the ENPM809X evaluation: letters only, folded to uppercase
+UPPERCASE = bytes.maketrans(string.ascii_lowercase.encode(), string.ascii_uppercase.encode())
+NON_LETTERS = bytes(value for value in range(256) if chr(value) not in string.ascii_letters)
+
+class StreamResult(NamedTuple):
+    """ The outcome of searching a stream of probes.
+    """
+    # number of probes found (or not found), per key
+    hits: Dict[str, int]
+    misses: Dict[str, int]
+    # bytes read (before filtering) and the elapsed wall time
+    bytes: int
+    seconds: float
+
+    @property
+    def throughput(self) -> float:
+        """ Megabytes (10**6 bytes) read per second.
+        """
+        return self.bytes / 1e6 / self.seconds if self.seconds else 0.0
+
+def read_chunks(fileobj, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """ Read a binary file object in chunks, memory mapping it if possible.
+
+    Args:
+        fileobj: A file object opened in binary mode (or any object with read).
+        chunk_size: The number of bytes per chunk.
+
+    Yields:
+        The chunks, as bytes.
+    """
+    try:
+        mapped = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError):
+        # not a regular (or non-empty) file: pipes, sockets, in-memory buffers, ...
+        mapped = None
+    if mapped is not None:
+        with mapped:
+            for offset in range(fileobj.tell(), len(mapped), chunk_size):
+                yield mapped[offset:offset + chunk_size]
+        return
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+def alphabet(normalize: Union[bytes, None], delete: bytes) -> List[int]:
+    """ Find the byte values which can remain after bytes.translate(normalize, delete).
+    """
+    deleted = set(delete)
+    table = normalize if normalize is not None else bytes(range(256))
+    return sorted({table[value] for value in range(256) if value not in deleted})
+
+def tally(chunk: bytes, values: List[int], counts: List[int]) -> None:
+    """ Add the number of occurrences of every byte value in chunk to counts.
+
+    Args:
+        chunk: The (normalized) bytes.
+        values: The byte values which may occur (see alphabet).
+        counts: 256 running totals, indexed by byte value.
+    """
+    if numpy is not None:
+        for value, count in enumerate(numpy.bincount(numpy.frombuffer(chunk, numpy.uint8),
+                                                     minlength=256).tolist()):
+            counts[value] += count
+    elif len(values) <= _COUNT_LIMIT:
+        for value in values:
+            counts[value] += chunk.count(value)
+    else:
+        for value, count in collections.Counter(chunk).items():
+            counts[value] += count
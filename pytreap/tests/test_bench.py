@@ -0,0 +1,40 @@
+""" Unit Tests for the pytreap.bench suite.
+"""
+
+import unittest
+import random
+
+from pytreap.bench import suite, workloads
+
+class TestBench(unittest.TestCase):
+
+    def test_workloads(self):
+        # every distribution produces consistent operation streams
+        for distribution in workloads.DISTRIBUTIONS:
+            workload = workloads.make_workload(distribution, 200, random.Random(0))
+            self.assertEqual(len(set(workload.keys)), 200)
+            self.assertEqual(sorted(workload.deletes), sorted(workload.keys))
+            self.assertEqual(len(workload.probes), 200)
+            for strategy in workloads.PRIORITIES:
+                priorities = workloads.make_priorities(strategy, workload, random.Random(0))
+                self.assertTrue(priorities is None or len(priorities) == 200)
+
+        # runs are reproducible for a given seed
+        first = workloads.make_workload("zipf", 100, random.Random(1))
+        second = workloads.make_workload("zipf", 100, random.Random(1))
+        self.assertEqual(first, second)
+
+    def test_suite(self):
+        # a small sweep reports every case and compares cleanly against itself
+        results = suite.run_suite(suite.OPERATIONS, [50], ["uniform", "sorted"],
+                                  workloads.PRIORITIES, max_degenerate=10)
+        # the three per-key operations are skipped for large degenerate cases
+        self.assertEqual(len(results["results"]), 2 * (len(workloads.PRIORITIES) * len(suite.OPERATIONS) - 3))
+        for result in results["results"]:
+            self.assertEqual(result["size"], 50)
+            self.assertGreater(result["throughput"], 0)
+            self.assertLessEqual(result["latency_ns"]["p50"], result["latency_ns"]["p99"])
+
+        changes = suite.compare(results, results)
+        self.assertEqual(len(changes), len(results["results"]))
+        self.assertFalse(any(change["regression"] for change in changes))
@@ -0,0 +1,94 @@
+""" Unit Tests for the pytreap.TreapCache class.
+"""
+
+import collections
+import math
+import unittest
+import random
+
+from pytreap.cache import POLICIES, TreapCache
+from pytreap.instrument import tree_stats
+
+class TestTreapCache(unittest.TestCase):
+
+    def test_lru(self):
+        # the cache must agree with an OrderedDict based LRU reference
+        cache = TreapCache(10, "lru")
+        reference = collections.OrderedDict()
+        for _ in range(2000):
+            key = "{:02d}".format(random.randrange(25))
+            if key in reference:
+                reference.move_to_end(key)
+                self.assertEqual(cache.get(key), reference[key])
+            else:
+                self.assertIsNone(cache.get(key))
+                if len(reference) == 10:
+                    reference.popitem(last=False)
+                reference[key] = key.upper()
+                cache.put(key, key.upper())
+            self.assertEqual(sorted(reference), sorted(node.key[1] for node in cache._treap))
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"] + stats["misses"], 2000)
+        self.assertEqual(stats["evictions"], stats["misses"] - 10)
+        self.assertEqual(len(cache), 10)
+
+    def test_lfu(self):
+        # the least frequently used entry goes first, the least recent of a tie
+        cache = TreapCache(3, "lfu")
+        for key in "abc":
+            cache.put(key, key)
+        for key in "aabcc":
+            cache.get(key)
+        cache.put("d", "d")
+        self.assertNotIn("b", cache)
+        cache.put("e", "e")
+        self.assertNotIn("d", cache)
+        cache.put("a", "A")
+        self.assertEqual(cache.get("a"), "A")
+        self.assertEqual(cache.evictions, 2)
+        self.assertEqual(sorted(node.key[1] for node in cache._treap), ["a", "c", "e"])
+
+    def test_ttl(self):
+        # entries expire after their ttl and the earliest expiry is evicted first
+        now = [0.0]
+        cache = TreapCache(2, "ttl", ttl=10, clock=lambda: now[0])
+        cache.put("a", 1)
+        cache.put("b", 2, ttl=5)
+        cache.put("c", 3)
+        self.assertNotIn("b", cache)
+        now[0] = 9.5
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 4, ttl=20)
+        now[0] = 10.5
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), 4)
+        self.assertEqual((cache.hits, cache.misses, cache.evictions, cache.expirations), (2, 1, 1, 1))
+        self.assertEqual(len(cache), 1)
+
+        # making room by dropping an expired entry counts as an expiration
+        cache.put("d", 5)
+        now[0] = 100
+        cache.put("e", 6)
+        self.assertEqual((cache.evictions, cache.expirations), (1, 2))
+        self.assertNotIn("d", cache)
+
+    def test_sequential_keys(self):
+        # increasing keys and stamps must not line the tree up into a list
+        for policy in POLICIES:
+            cache = TreapCache(2000, policy, ttl=60)
+            for key in range(10000):
+                cache.put(key, key)
+            for key in range(8000, 10000):
+                self.assertEqual(cache.get(key), key)
+            self.assertEqual(len(cache), 2000)
+            self.assertLess(tree_stats(cache._treap.root)["height"], 4 * math.log2(2000))
+
+    def test_bad_construction(self):
+        # evaluate construction with improper values
+        with self.assertRaises(AssertionError, msg="Allowed an empty cache"):
+            TreapCache(0)
+        with self.assertRaises(AssertionError, msg="Allowed an unknown policy"):
+            TreapCache(1, "fifo")
+        with self.assertRaises(AssertionError, msg="Allowed the ttl policy without a ttl"):
+            TreapCache(1, "ttl")
@@ -0,0 +1,114 @@
+""" Unit Tests for the pytreap.ConcurrentTreap class.
+"""
+
+import threading
+import unittest
+import random
+
+from pytreap.concurrent import ConcurrentTreap
+from pytreap.persistent import PersistentTreap
+
+class TestConcurrentTreap(unittest.TestCase):
+
+    def test_operations(self):
+        # single-threaded behaviour matches a python set
+        treap = ConcurrentTreap()
+        reference = set()
+        for _ in range(500):
+            key = "{:02d}".format(random.randrange(60))
+            if key in reference:
+                treap.delete(key)
+                reference.remove(key)
+            else:
+                treap.insert(key)
+                reference.add(key)
+            self.assertEqual(len(treap), len(reference))
+        self.assertEqual([node.key for node in treap], sorted(reference))
+        self.assertEqual(treap.search_many(["00", "30", "59"]), [k in reference for k in ["00", "30", "59"]])
+        with self.assertRaises(KeyError):
+            treap.delete("zz")
+        self.assertFalse(treap.discard("zz"))
+
+        # a failed batch publishes nothing
+        before = treap.snapshot()
+        with self.assertRaises(AssertionError):
+            treap.insert_many(["x", "y", "x"])
+        self.assertEqual([node.key for node in treap], [node.key for node in before])
+        treap.insert_many(["x", "y"], [5, 6])
+        self.assertIn("x", treap)
+        self.assertNotIn("x", before)
+
+        # a snapshot is a copy, so updating it leaves the treap alone
+        before.insert("z")
+        self.assertNotIn("z", treap)
+        self.assertEqual(len(treap), len(before) + 1)
+
+    def test_stress(self):
+        # readers check every version they see while writers churn their own key ranges
+        treap = ConcurrentTreap()
+        stable = ["s{:03d}".format(i) for i in range(200)]
+        treap.insert_many(stable)
+        stop = threading.Event()
+        failures = []
+        finals = {}
+
+        def _write(name):
+            rng = random.Random(name)
+            present = set()
+            try:
+                for _ in range(1500):
+                    key = "{}{:03d}".format(name, rng.randrange(100))
+                    if key in present:
+                        treap.delete(key)
+                        present.remove(key)
+                    else:
+                        treap.insert(key)
+                        present.add(key)
+            except Exception as error:
+                failures.append(error)
+            finals[name] = present
+
+        def _read():
+            try:
+                while not stop.is_set():
+                    version = treap.snapshot()
+                    self.is_ordered(version)
+                    self.assertEqual(len(list(version)), len(version))
+                    self.assertTrue(all(treap.search_many(stable)))
+            except Exception as error:
+                # an exception would otherwise only end this thread, unnoticed
+                failures.append(error)
+
+        readers = [threading.Thread(target=_read) for _ in range(4)]
+        writers = [threading.Thread(target=_write, args=(name,)) for name in "abc"]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+        self.assertEqual(failures, [])
+        expected = set(stable).union(*finals.values())
+        self.assertEqual([node.key for node in treap], sorted(expected))
+        self.is_ordered(treap.snapshot())
+
+    def is_ordered(self, treap: PersistentTreap) -> None:
+        """ Utility to check that every node in the given version satisfies the following:
+
+        Rules:
+         - if v is a child of u, then v.priority <= u.priority
+         - if v is a left child of u, then v.key < u.key
+         - if v is a right child of u, then v.key > u.key
+        """
+        for node in treap:
+            if node.left:
+                self.assertLessEqual(node.left.priority, node.priority)
+                self.assertGreater(node.key, node.left.key)
+            if node.right:
+                self.assertLessEqual(node.right.priority, node.priority)
+                self.assertLess(node.key, node.right.key)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+""" Unit Tests for the pytreap.FrozenTreap class.
+"""
+
+import unittest
+import random
+import string
+
+from pytreap.treap import Treap
+
+class TestFrozenTreap(unittest.TestCase):
+
+    def test_round_trip(self):
+        # a frozen treap must answer exactly like the original
+        treap = Treap.from_keys(random.sample(string.ascii_letters, 40) + ["é", "日本"])
+        frozen = treap.freeze()
+        self.assertEqual(len(frozen), len(treap))
+        self.assertEqual(list(frozen), [n.key for n in treap])
+        self.assertEqual(list(frozen.items()), list(treap.items()))
+        for lo, hi in (("a", "n"), ("N", None), (None, "b"), ("z", "a")):
+            self.assertEqual(list(frozen.items(lo, hi)), list(treap.items(lo, hi)))
+        for key in list(string.ascii_letters) + ["é", "日本", "日", "Napolean", ""]:
+            self.assertEqual(frozen.search(key), treap.search(key))
+            self.assertEqual(key in frozen, treap.search(key))
+
+        # thawing restores a mutable treap with the same shape
+        thawed = frozen.thaw(augmented=True)
+        self.assertEqual(thawed.root.key, treap.root.key)
+        self.assertEqual(list(thawed.items()), list(treap.items()))
+        self.assertEqual(thawed.rank(treap.root.key), list(frozen).index(treap.root.key))
+        thawed.insert("Napolean")
+        self.assertFalse(frozen.search("Napolean"))
+
+    def test_tied_priorities(self):
+        # with tied priorities the keys survive but the shape may not
+        treap = Treap()
+        for key in "bac":
+            treap.insert(key, 5)
+        thawed = treap.freeze().thaw()
+        self.assertEqual(treap.root.key, "b")
+        self.assertEqual(thawed.root.key, "a")
+        self.assertEqual(list(thawed.items()), list(treap.items()))
+
+    def test_empty(self):
+        # an empty treap can be frozen and thawed
+        frozen = Treap().freeze()
+        self.assertEqual(len(frozen), 0)
+        self.assertEqual(list(frozen), [])
+        self.assertFalse(frozen.search("a"))
+        self.assertIsNone(frozen.thaw().root)
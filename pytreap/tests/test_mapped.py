@@ -0,0 +1,85 @@
+""" Unit Tests for the pytreap.MappedTreap class.
+"""
+
+import os
+import unittest
+import random
+import string
+import struct
+import tempfile
+
+from pytreap.treap import Treap
+
+class TestMappedTreap(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "treap.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        # a saved treap must answer exactly like the original
+        keys = random.sample(string.ascii_letters, 40) + ["é", "ß", "ü", "日本", "Napolean"]
+        treap = Treap()
+        for key in keys:
+            treap.insert(key)
+        treap.save(self.path)
+
+        with Treap.open_mmap(self.path) as mapped:
+            self.assertEqual(len(mapped), len(treap))
+            self.assertEqual(list(mapped), [n.key for n in treap])
+            self.assertEqual(list(mapped.items()), list(treap.items()))
+            for key in list(string.ascii_letters) + ["é", "日本", "日", "Napoleon", ""]:
+                self.assertEqual(mapped.search(key), treap.search(key))
+                self.assertEqual(key in mapped, treap.search(key))
+
+            # thawing restores a mutable treap with the same shape
+            thawed = mapped.thaw()
+            self.assertEqual(thawed.root.key, treap.root.key)
+            self.assertEqual(list(thawed.items()), list(treap.items()))
+            thawed = mapped.thaw(augmented=True, adaptive=4)
+            self.assertEqual(thawed.rank(treap.root.key), list(mapped).index(treap.root.key))
+            self.assertEqual(thawed.adaptive, 4)
+
+    def test_shared_prefix(self):
+        # keys sharing long prefixes, and keys whose digests tie, are told apart
+        keys = ["user/profile/{:03d}".format(k) for k in range(200)]
+        keys += ["user/profile/", "user/profile/00", "user/profile/00\x00", "user/profile/000000000000"]
+        treap = Treap.from_keys(keys)
+        treap.save(self.path)
+        with Treap.open_mmap(self.path) as mapped:
+            self.assertEqual(list(mapped), [n.key for n in treap])
+            for key in keys + ["user/profile/0", "user/profile/00000000", "user/prof", "other", ""]:
+                self.assertEqual(mapped.search(key), key in keys, key)
+
+    def test_failed_save(self):
+        # a treap that can't be saved leaves the previous file in place
+        Treap.from_keys("abc").save(self.path)
+        treap = Treap()
+        treap.insert("x", 1 << 64)
+        with self.assertRaises(struct.error):
+            treap.save(self.path)
+        self.assertEqual(os.listdir(self.directory.name), ["treap.bin"])
+        with Treap.open_mmap(self.path) as mapped:
+            self.assertEqual(list(mapped), list("abc"))
+
+    def test_empty(self):
+        # an empty treap can be saved and mapped
+        Treap().save(self.path)
+        with Treap.open_mmap(self.path) as mapped:
+            self.assertEqual(len(mapped), 0)
+            self.assertEqual(list(mapped), [])
+            self.assertFalse(mapped.search("a"))
+
+    def test_bad_file(self):
+        # files that weren't written by save are rejected
+        with open(self.path, "wb") as output:
+            output.write(b"definitely not a treap")
+        with self.assertRaises(ValueError, msg="Mapped a file with a bad header"):
+            Treap.open_mmap(self.path)
+
+        open(self.path, "wb").close()
+        with self.assertRaises(ValueError, msg="Mapped an empty file"):
+            Treap.open_mmap(self.path)
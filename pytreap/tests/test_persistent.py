@@ -0,0 +1,85 @@
+""" Unit Tests for the pytreap.PersistentTreap class.
+"""
+
+import unittest
+import random
+import string
+
+from pytreap.persistent import PersistentTreap
+
+class TestPersistentTreap(unittest.TestCase):
+
+    def test_construction(self):
+        # basic sanity check of construction of a new PersistentTreap
+        treap = PersistentTreap()
+        self.assertEqual(len(treap), 0)
+        self.assertEqual(list(treap), [])
+        self.assertFalse(treap.search("a"))
+
+    def test_insert_delete(self):
+        # compare random inserts and deletes against a python set
+        treap = PersistentTreap()
+        keys = set()
+        for _ in range(500):
+            key = random.choice(string.ascii_letters)
+            if key in keys:
+                with self.assertRaises(AssertionError, msg="Allowed duplicate key insertion"):
+                    treap.insert(key)
+                if random.random() > 0.5:
+                    treap.delete(key)
+                    keys.remove(key)
+            else:
+                treap.insert(key, random.randint(0, 100) if random.random() > 0.5 else None)
+                keys.add(key)
+            self.assertEqual(len(treap), len(keys))
+        self.is_ordered(treap)
+        self.assertEqual([n.key for n in treap], sorted(keys))
+
+        with self.assertRaises(KeyError, msg="Allowed deletion of a missing key"):
+            treap.delete("Napolean")
+        self.assertFalse(treap.discard("Napolean"))
+        with self.assertRaises(AssertionError, msg="Allowed insertion of a negative priority"):
+            treap.insert("Napolean", -1)
+
+    def test_snapshot(self):
+        # snapshots must not observe later updates
+        treap = PersistentTreap()
+        for key in string.ascii_lowercase:
+            treap.insert(key)
+        snapshot = treap.snapshot()
+        before = [(n.key, n.priority) for n in snapshot]
+
+        for key in string.ascii_uppercase:
+            treap.insert(key)
+        for key in "aeiou":
+            treap.delete(key)
+
+        self.assertEqual([(n.key, n.priority) for n in snapshot], before)
+        self.assertEqual(len(snapshot), len(string.ascii_lowercase))
+        self.assertTrue(snapshot.search("a"))
+        self.assertFalse(treap.search("a"))
+        self.is_ordered(snapshot)
+        self.is_ordered(treap)
+
+        # a single update only copies the path it touches
+        snapshot = treap.snapshot()
+        previous = set(map(id, snapshot))
+        treap.insert("0")
+        copied = [n for n in treap if id(n) not in previous]
+        self.assertLess(len(copied), len(treap) // 2)
+
+    def is_ordered(self, treap: PersistentTreap) -> None:
+        """ Utility to check that every node in the given PersistentTreap satisfies the following:
+
+        Rules:
+         - if v is a child of u, then v.priority <= u.priority
+         - if v is a left child of u, then v.key < u.key
+         - if v is a right child of u, then v.key > u.key
+        """
+        for node in treap:
+            if node.left:
+                self.assertLessEqual(node.left.priority, node.priority)
+                self.assertGreater(node.key, node.left.key)
+            if node.right:
+                self.assertLessEqual(node.right.priority, node.priority)
+                self.assertLess(node.key, node.right.key)
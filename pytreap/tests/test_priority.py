@@ -0,0 +1,118 @@
+""" Unit Tests for the pytreap.priority strategies.
+"""
+
+import math
+import sys
+import threading
+import unittest
+import random
+
+from pytreap.persistent import PersistentTreap
+from pytreap.priority import FrequencyPriority, HashPriority, PriorityStrategy, RandomPriority, PRIORITY_BITS
+from pytreap.treap import Treap
+
+# number of keys used to check the height of treaps at scale
+SCALE = 1 << 14
+# allowed height, as a multiple of log2(n); random treaps average about 3 log2(n)
+HEIGHT_FACTOR = 4
+
+class TestPriority(unittest.TestCase):
+
+    def setUp(self):
+        # sorted insertion would produce a list shaped tree without good priorities
+        self.keys = ["{:06d}".format(k) for k in range(SCALE)]
+
+    def test_random(self):
+        # batched random priorities are 64-bit, collision-free and reproducible
+        strategy = RandomPriority(batch=100, seed=1)
+        priorities = [strategy(key) for key in self.keys]
+        self.assertEqual(len(set(priorities)), len(priorities))
+        self.assertTrue(all(0 <= p < (1 << PRIORITY_BITS) for p in priorities))
+        self.assertGreater(max(priorities), 1 << (PRIORITY_BITS - 1))
+
+        again = RandomPriority(batch=100, seed=1)
+        self.assertEqual([again(key) for key in self.keys], priorities)
+
+        self.check_height(RandomPriority())
+
+        # the base class only names the protocol
+        with self.assertRaises(TypeError):
+            PriorityStrategy()
+
+    def test_random_threads(self):
+        # a strategy shared by threads hands out every priority exactly once
+        strategy = RandomPriority(batch=1, seed=1)
+        results = [[] for _ in range(4)]
+
+        def _draw(result):
+            for _ in range(20000):
+                result.append(strategy(None))
+
+        # switch threads as often as possible to provoke races on the pool
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=_draw, args=(result,)) for result in results]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        priorities = [p for result in results for p in result]
+        self.assertEqual(len(priorities), 80000)
+        self.assertEqual(len(set(priorities)), 80000)
+
+    def test_hash(self):
+        # hashed priorities produce the same shape whatever the insertion order
+        strategy = HashPriority()
+        self.assertEqual(strategy("a"), HashPriority()("a"))
+        self.assertNotEqual(strategy("a"), HashPriority(salt=b"pepper")("a"))
+
+        shuffled = list(self.keys[:500])
+        random.shuffle(shuffled)
+        first = Treap(strategy=strategy)
+        for key in self.keys[:500]:
+            first.insert(key)
+        second = Treap(strategy=strategy)
+        for key in shuffled:
+            second.insert(key)
+        self.assertEqual([(n.key, n.priority, n.parent and n.parent.key) for n in first],
+                         [(n.key, n.priority, n.parent and n.parent.key) for n in second])
+
+        self.check_height(strategy)
+
+    def test_frequency(self):
+        # heavy keys sit near the root while the tree stays balanced
+        weights = {key: random.randint(1, 10) for key in self.keys}
+        hot = self.keys[SCALE // 3]
+        weights[hot] = 10 * SCALE
+        strategy = FrequencyPriority(weights, seed=2)
+        treap = self.check_height(strategy)
+
+        depth = 0
+        node = treap._find(hot)
+        while node is not None:
+            depth += 1
+            node = node.parent
+        self.assertLessEqual(depth, 4)
+
+        with self.assertRaises(AssertionError, msg="Allowed a zero weight"):
+            FrequencyPriority({"a": 0})
+
+    def test_persistent(self):
+        # persistent treaps accept strategies as well
+        treap = PersistentTreap(strategy=HashPriority())
+        for key in self.keys[:100]:
+            treap.insert(key)
+        self.assertEqual(treap.root.priority, max(HashPriority()(key) for key in self.keys[:100]))
+
+    def check_height(self, strategy) -> Treap:
+        """ Utility to insert all keys in sorted order and check the height stays within
+        HEIGHT_FACTOR * log2(n).
+        """
+        treap = Treap(strategy=strategy)
+        for key in self.keys:
+            treap.insert(key)
+        self.assertLessEqual(treap.stats()["height"], HEIGHT_FACTOR * math.log2(SCALE))
+        return treap
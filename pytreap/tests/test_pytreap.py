@@ -1,11 +1,18 @@
 """ Unit Tests for the pytreap.Treap class.
 """
 
+import collections
+import io
+import os
 import unittest
+from unittest import mock
 from typing import Tuple
 import random
 import string
+import tempfile
 
+from pytreap import stream
+from pytreap import treap as treap_module
 from pytreap.treap import Treap
 
 class TestTreap(unittest.TestCase):
@@ -57,6 +64,267 @@ class TestTreap(unittest.TestCase):
         # all the checks are embedded in this method
         treap, keys = self.get_random_treap()
 
+    def test_iteration(self):
+        # iteration visits every node exactly once, in key order
+        treap, keys = self.get_random_treap()
+        self.assertEqual([node.key for node in treap], sorted(keys))
+
+        # nodes are compact (no per-instance dictionary)
+        self.assertFalse(hasattr(treap.root, "__dict__"))
+
+    def test_from_sorted(self):
+        # bulk construction must produce the same tree as repeated insertion
+        keys = sorted(random.sample(string.ascii_letters, 40))
+        priorities = random.sample(range(1000), len(keys))
+
+        inserted = Treap()
+        for key, priority in zip(keys, priorities):
+            inserted.insert(key, priority)
+        bulk = Treap.from_sorted(keys, priorities)
+
+        self.assertEqual(len(bulk), len(keys))
+        self.is_ordered(bulk)
+        self.assertEqual([(n.key, n.priority) for n in bulk], [(n.key, n.priority) for n in inserted])
+        self.assertEqual(bulk.root.key, inserted.root.key)
+        for key in keys:
+            self.assertTrue(bulk.search(key))
+
+        # random priorities and unsorted input
+        shuffled = list(keys)
+        random.shuffle(shuffled)
+        bulk = Treap.from_keys(shuffled)
+        self.assertEqual(len(bulk), len(keys))
+        self.is_ordered(bulk)
+
+        # empty input
+        self.assertEqual(len(Treap.from_sorted([])), 0)
+
+    def test_bad_from_sorted(self):
+        # evaluate bulk construction with improper inputs
+        with self.assertRaises(AssertionError, msg="Allowed unsorted keys"):
+            Treap.from_sorted(["b", "a"])
+        with self.assertRaises(AssertionError, msg="Allowed duplicate keys"):
+            Treap.from_sorted(["a", "a"])
+        with self.assertRaises(AssertionError, msg="Allowed duplicate keys"):
+            Treap.from_keys(["b", "a", "b"])
+        with self.assertRaises(AssertionError, msg="Allowed a negative priority"):
+            Treap.from_sorted(["a", "b"], [1, -1])
+        with self.assertRaises(AssertionError, msg="Allowed missing priorities"):
+            Treap.from_sorted(["a", "b"], [1])
+        with self.assertRaises(AssertionError, msg="Allowed extra priorities"):
+            Treap.from_keys(["a", "b"], [1, 2, 3])
+
+    def test_insert_many(self):
+        # batch insertion must agree with python sets under every duplicate policy
+        for on_duplicate in ("skip", "replace"):
+            for augmented in (False, True):
+                treap = Treap.from_keys(random.sample(string.ascii_letters, 20), augmented=augmented)
+                before = {node.key: node.priority for node in treap}
+                batch = [random.choice(string.ascii_letters) for _ in range(60)]
+                priorities = random.sample(range(1000), len(batch))
+
+                added = treap.insert_many(batch, priorities, on_duplicate=on_duplicate)
+                self.is_ordered(treap)
+                self.assertEqual(added, len(set(batch) - set(before)))
+                self.assertEqual([n.key for n in treap], sorted(set(batch) | set(before)))
+                self.assertEqual(len(treap), len(set(batch) | set(before)))
+
+                # skipping keeps existing and first priorities, replacing takes the last
+                if on_duplicate == "skip":
+                    expected = dict(reversed(list(zip(batch, priorities))))
+                    expected.update(before)
+                else:
+                    expected = {**before, **dict(zip(batch, priorities))}
+                self.assertEqual({n.key: n.priority for n in treap}, expected)
+
+        # duplicates raise by default, leaving the treap untouched
+        treap = Treap.from_keys("abc", augmented=True)
+        for batch in ("xyx", "xyc"):
+            with self.assertRaises(AssertionError, msg="Allowed duplicate keys"):
+                treap.insert_many(batch)
+            self.assertEqual([n.key for n in treap], list("abc"))
+            self.assertEqual(len(treap), 3)
+        with self.assertRaises(AssertionError, msg="Allowed a negative priority"):
+            treap.insert_many("xy", [1, -1])
+        with self.assertRaises(AssertionError, msg="Allowed an unknown policy"):
+            treap.insert_many("xy", on_duplicate="merge")
+        self.assertEqual(treap.insert_many("zyx"), 3)
+        self.is_ordered(treap)
+
+        # single inserts of duplicates fail before touching subtree sizes
+        with self.assertRaises(AssertionError, msg="Allowed a duplicate key"):
+            treap.insert("y")
+        self.is_ordered(treap)
+        self.assertEqual(treap.root.size, 6)
+
+    def test_split_merge(self):
+        # splitting and re-merging must preserve every key and the treap properties
+        treap, keys = self.get_random_treap()
+        pivot = random.choice(string.ascii_letters)
+
+        upper = treap.split(pivot)
+        self.is_ordered(treap)
+        self.is_ordered(upper)
+        self.assertEqual([n.key for n in treap], sorted(k for k in keys if k < pivot))
+        self.assertEqual([n.key for n in upper], sorted(k for k in keys if k >= pivot))
+        self.assertEqual(len(treap) + len(upper), len(keys))
+
+        # merging works in either order
+        upper.merge(treap)
+        self.assertEqual(len(treap), 0)
+        self.assertEqual(len(upper), len(keys))
+        self.is_ordered(upper)
+        self.assertEqual([n.key for n in upper], sorted(keys))
+
+        # overlapping treaps cannot be merged
+        with self.assertRaises(AssertionError, msg="Allowed merge of overlapping treaps"):
+            upper.merge(Treap.from_keys(keys))
+
+    def test_set_operations(self):
+        # compare union, intersection and difference against python sets
+        for operation in ("union", "intersection", "difference"):
+            first, first_keys = self.get_random_treap()
+            second, second_keys = self.get_random_treap()
+            getattr(first, operation)(second)
+            expected = getattr(first_keys, operation)(second_keys)
+
+            self.is_ordered(first)
+            self.assertEqual(len(first), len(expected))
+            self.assertEqual([n.key for n in first], sorted(expected))
+            self.assertEqual(len(second), 0)
+            for key in string.ascii_letters:
+                self.assertEqual(first.search(key), key in expected)
+
+    def test_order_statistics(self):
+        # rank, select and count_range must agree with brute force after random inserts
+        treap = Treap(augmented=True)
+        keys = random.sample(range(10000), random.randint(100, 200))
+        for key in keys:
+            treap.insert(key, random.randint(0, 50) if random.random() > 0.5 else None)
+        self.is_ordered(treap)
+
+        ordered = sorted(keys)
+        self.assertEqual(len(treap), len(keys))
+        for index, key in enumerate(ordered):
+            self.assertEqual(treap.select(index), key)
+            self.assertEqual(treap.rank(key), index)
+        self.assertEqual(treap.select(-1), ordered[-1])
+        for _ in range(100):
+            lo, hi = random.randint(-10, 10010), random.randint(-10, 10010)
+            self.assertEqual(treap.rank(lo), sum(1 for k in keys if k < lo))
+            self.assertEqual(treap.count_range(lo, hi), sum(1 for k in keys if lo <= k < hi))
+
+        with self.assertRaises(IndexError, msg="Allowed selection past the end"):
+            treap.select(len(keys))
+
+        # structural operations keep the sizes up to date
+        upper = treap.split(5000)
+        self.is_ordered(treap)
+        self.is_ordered(upper)
+        self.assertEqual(treap.count_range(0, 5000), len(treap))
+        other = Treap.from_keys(random.sample(range(10000), 100), augmented=True)
+        self.is_ordered(other)
+        treap.union(other)
+        self.is_ordered(treap)
+        treap.difference(upper)
+        self.is_ordered(treap)
+
+        # plain treaps don't support order statistics
+        with self.assertRaises(AssertionError, msg="Allowed rank on a plain treap"):
+            Treap().rank("a")
+        with self.assertRaises(AssertionError, msg="Allowed union of mixed treaps"):
+            Treap().union(Treap(augmented=True))
+
+    def test_delete(self):
+        # delete keys in random order, checking the treap properties along the way
+        for augmented in (False, True):
+            treap = Treap(augmented=augmented)
+            keys = list(string.ascii_letters)
+            for key in keys:
+                treap.insert(key, random.randint(0, 20))
+            random.shuffle(keys)
+
+            remaining = set(keys)
+            for key in keys:
+                treap.delete(key)
+                remaining.remove(key)
+                self.assertFalse(treap.search(key))
+                self.assertEqual(len(treap), len(remaining))
+                self.assertEqual([n.key for n in treap], sorted(remaining))
+                self.is_ordered(treap)
+            self.assertIsNone(treap.root)
+
+    def test_bad_delete(self):
+        # deleting missing keys raises, discarding them doesn't
+        treap, keys = self.get_random_treap()
+        missing = "Napolean"
+        with self.assertRaises(KeyError, msg="Allowed deletion of a missing key"):
+            treap.delete(missing)
+        self.assertFalse(treap.discard(missing))
+        self.assertEqual(len(treap), len(keys))
+
+        present = next(iter(keys))
+        self.assertTrue(treap.discard(present))
+        self.assertFalse(treap.discard(present))
+        self.assertEqual(len(treap), len(keys) - 1)
+        self.is_ordered(treap)
+
+    def test_range_iteration(self):
+        # range and reverse iteration must agree with sorting the keys
+        treap, keys = self.get_random_treap()
+        ordered = sorted(keys)
+        self.assertEqual([n.key for n in reversed(treap)], ordered[::-1])
+
+        priorities = {n.key: n.priority for n in treap}
+        for _ in range(50):
+            lo, hi = random.choice(string.ascii_letters), random.choice(string.ascii_letters)
+            self.assertEqual(list(treap.items(lo, hi)), [(k, priorities[k]) for k in ordered if lo <= k < hi])
+            self.assertEqual(list(treap.items(lo=lo)), [(k, priorities[k]) for k in ordered if lo <= k])
+            self.assertEqual(list(treap.items(hi=hi)), [(k, priorities[k]) for k in ordered if k < hi])
+            self.assertEqual(list(treap.keys_from(lo)), [k for k in ordered if lo <= k])
+        self.assertEqual(list(Treap().items()), [])
+        self.assertEqual(list(reversed(Treap())), [])
+
+        # iteration is lazy
+        iterator = treap.keys_from("")
+        self.assertEqual(next(iterator), ordered[0])
+
+    def test_degenerate_iteration(self):
+        # equal priorities in sorted order produce a list shaped tree; iteration must
+        #  neither recurse nor keep a stack proportional to its height
+        #  (from_sorted builds the same shape as insert(key, 1), just faster)
+        keys = ["{:05d}".format(k) for k in range(5000)]
+        treap = Treap.from_sorted(keys, [1] * len(keys))
+        self.assertIsNone(treap.root.left)
+        self.assertEqual(treap.root.right.key, keys[1])
+        self.assertEqual([n.key for n in treap], keys)
+        self.assertEqual([n.key for n in reversed(treap)], keys[::-1])
+        self.assertEqual(list(treap.keys_from("04990")), keys[4990:])
+        self.assertEqual(len(list(treap.items("01000", "02000"))), 1000)
+
+    def test_degenerate_set_operations(self):
+        # set operations on list shaped trees must not recurse once per level
+        keys = ["{:05d}".format(k) for k in range(6000)]
+        treap = Treap()
+        for key in keys[:3000]:
+            treap.insert(key, 1)
+        treap.insert_many(keys[3000:], [1] * 3000)
+        self.assertEqual([n.key for n in treap], keys)
+        self.is_ordered(treap)
+
+        evens, odds = keys[::2], keys[1::2]
+        treap = Treap.from_sorted(evens, [5] * len(evens))
+        treap.union(Treap.from_sorted(odds, [5] * len(odds)))
+        self.assertEqual([n.key for n in treap], keys)
+        self.is_ordered(treap)
+        treap.intersection(Treap.from_sorted(keys[:4000], [5] * 4000))
+        self.assertEqual([n.key for n in treap], keys[:4000])
+        self.is_ordered(treap)
+        treap.difference(Treap.from_sorted(evens, [5] * len(evens)))
+        self.assertEqual([n.key for n in treap], odds[:2000])
+        self.assertEqual(len(treap), 2000)
+        self.is_ordered(treap)
+
     def test_search(self):
         # test search with a known data set
 
@@ -89,6 +357,256 @@ class TestTreap(unittest.TestCase):
         for key in keys:
             self.assertTrue(treap.search(key))
 
+    def test_adaptive_search(self):
+        # frequently searched keys must drift to the top without breaking the treap
+        for augmented in (False, True):
+            treap = Treap(augmented=augmented, adaptive=3)
+            for key in string.ascii_uppercase:
+                treap.insert(key, random.randint(0, 1000))
+
+            hot = random.sample(string.ascii_uppercase, 3)
+            for _ in range(50):
+                for key in string.ascii_uppercase:
+                    self.assertTrue(treap.search(key))
+                for key in hot:
+                    for _ in range(10):
+                        self.assertTrue(treap.search(key))
+                self.is_ordered(treap)
+            self.assertEqual(len(treap), len(string.ascii_uppercase))
+
+            # the hot keys now sit at the top: none has a cold ancestor
+            self.assertIn(treap.root.key, hot)
+            for node in treap:
+                if node.key in hot:
+                    ancestor = node.parent
+                    while ancestor is not None:
+                        self.assertIn(ancestor.key, hot)
+                        ancestor = ancestor.parent
+
+            # hit counts of deleted keys are dropped
+            treap.delete(hot[0])
+            self.assertNotIn(hot[0], treap._hits)
+
+            # pausing adaptation freezes the shape
+            treap.adaptive = 0
+            shape = [(n.key, n.priority, n.parent and n.parent.key) for n in treap]
+            for key in string.ascii_uppercase:
+                treap.search(key)
+            self.assertEqual(shape, [(n.key, n.priority, n.parent and n.parent.key) for n in treap])
+
+        with self.assertRaises(AssertionError, msg="Allowed a negative adaptive period"):
+            Treap(adaptive=-1)
+
+    def test_instrumentation(self):
+        # counters must match the work done, and disappear when disabled
+        treap = Treap()
+        self.assertIsNone(treap.counters)
+        counters = treap.instrument()
+        self.assertIs(treap.counters, counters)
+
+        # ascending keys with ascending priorities rotate every new node to the root
+        for index, key in enumerate(string.ascii_uppercase):
+            treap.insert(key, index)
+        self.is_ordered(treap)
+        self.assertEqual(counters.inserts, 26)
+        self.assertEqual(counters.rotations, 25)
+        self.assertEqual(counters.insert_rotations, 25)
+        self.assertEqual(counters.insert_path_max, 2)
+
+        # the treap is now a list leaning left from 'Z'
+        self.assertTrue(treap.search("Z"))
+        self.assertTrue(treap.search("A"))
+        self.assertFalse(treap.search("a"))
+        self.assertEqual(counters.searches, 3)
+        self.assertEqual(counters.hits, 2)
+        self.assertEqual(counters.search_path_max, 26)
+        self.assertEqual(counters.search_path_histogram, {1: 2, 26: 1})
+        self.assertAlmostEqual(counters.mean_search_path, 28 / 3)
+        self.assertEqual(counters.as_dict()["rotations_per_insert"], 25 / 26)
+
+        # disabling restores the plain operations
+        self.assertIsNone(treap.instrument(False))
+        self.assertNotIn("search", vars(treap))
+        self.assertNotIn("_left_rotate", vars(treap))
+        treap.search("A")
+        self.assertEqual(counters.searches, 3)
+
+    def test_stats(self):
+        # shape statistics of known trees
+        stats = Treap().stats()
+        self.assertEqual((stats["count"], stats["height"], stats["average_depth"]), (0, 0, 0.0))
+
+        treap = Treap.from_sorted("ABCDEFG", [1, 2, 1, 3, 1, 2, 1])
+        stats = treap.stats()
+        self.assertEqual(stats["count"], 7)
+        self.assertEqual(stats["height"], 3)
+        self.assertEqual(stats["depth_histogram"], [0, 1, 2, 4])
+        self.assertAlmostEqual(stats["average_depth"], 17 / 7)
+        self.assertEqual(stats["p99_depth"], 3)
+
+        # degenerate trees don't recurse
+        treap = Treap.from_sorted(["{:05d}".format(k) for k in range(5000)], [1] * 5000)
+        self.assertEqual(treap.stats()["height"], 5000)
+
+    def test_priority_queue(self):
+        # the heap side of the treap must behave like a max-priority queue
+        for augmented in (False, True):
+            keys = random.sample(string.ascii_letters, 30)
+            priorities = random.sample(range(1000), len(keys))
+            treap = Treap.from_keys(keys, priorities, augmented=augmented)
+            expected = sorted(zip(keys, priorities), key=lambda pair: -pair[1])
+
+            self.assertEqual(treap.peek_max(), expected[0])
+            self.assertEqual(treap.nlargest(5), expected[:5])
+            self.assertEqual(treap.nlargest(100), expected)
+
+            # raising and lowering priorities reorders the queue
+            treap.update_priority(expected[-1][0], 1000)
+            treap.update_priority(expected[0][0], 0)
+            self.is_ordered(treap)
+            self.assertEqual(treap.peek_max(), (expected[-1][0], 1000))
+            self.assertEqual(treap.nlargest(len(keys))[-1], (expected[0][0], 0))
+
+            popped = [treap.pop_max() for _ in keys]
+            self.assertEqual(popped, [(expected[-1][0], 1000)] + expected[1:-1] + [(expected[0][0], 0)])
+            self.assertEqual(len(treap), 0)
+
+        # an empty queue has nothing to give
+        treap = Treap()
+        self.assertEqual(treap.nlargest(3), [])
+        with self.assertRaises(IndexError, msg="Peeked into an empty treap"):
+            treap.peek_max()
+        with self.assertRaises(IndexError, msg="Popped from an empty treap"):
+            treap.pop_max()
+        with self.assertRaises(KeyError, msg="Updated a missing key"):
+            treap.update_priority("a", 1)
+        treap.insert("a", 1)
+        with self.assertRaises(AssertionError, msg="Allowed a negative priority"):
+            treap.update_priority("a", -1)
+
+    def test_cursor(self):
+        # finger searches must agree with plain searches from any starting point
+        treap, keys = self.get_random_treap()
+        cursor = treap.cursor()
+        self.assertIsNone(cursor.key)
+        for key in [random.choice(string.ascii_letters) for _ in range(500)] + ["Napolean", ""]:
+            self.assertEqual(cursor.search(key), key in keys)
+            if key in keys:
+                self.assertEqual(cursor.key, key)
+        for key in sorted(string.ascii_letters):
+            self.assertEqual(cursor.search(key), key in keys)
+
+        # stepping walks the keys in either direction, unpositioned past the ends
+        cursor.reset()
+        self.assertEqual([cursor.next() for _ in keys], sorted(keys))
+        self.assertIsNone(cursor.next())
+        self.assertEqual([cursor.prev() for _ in keys], sorted(keys, reverse=True))
+        self.assertIsNone(cursor.prev())
+        self.assertIsNone(Treap().cursor().next())
+        self.assertFalse(Treap().cursor().search("a"))
+
+        # a finger that leaves the treap falls back to the root
+        key = random.choice(sorted(keys))
+        self.assertTrue(cursor.search(key))
+        treap.delete(key)
+        keys.discard(key)
+        self.assertIsNone(cursor.key)
+        self.assertFalse(cursor.search(key))
+        pivot = max(keys)
+        self.assertTrue(cursor.search(pivot))
+        treap.split(pivot)
+        self.assertIsNone(cursor.key)
+        for key in keys:
+            self.assertEqual(cursor.search(key), key < pivot)
+
+        # nodes dropped by intersection and difference don't keep a finger alive,
+        #  whether they're dropped on their own or with a whole subtree
+        for _ in range(200):
+            keys = random.sample(range(100), 40)
+            treap = Treap.from_keys(["{:02d}".format(k) for k in keys])
+            other = Treap.from_keys(["{:02d}".format(k) for k in random.sample(keys, 20)])
+            cursors = {node.key: treap.cursor() for node in treap}
+            for key, cursor in cursors.items():
+                cursor.search(key)
+            if random.random() < 0.5:
+                treap.intersection(other)
+            else:
+                treap.difference(other)
+            for key, cursor in cursors.items():
+                # a kept key may have been replaced by the other treap's node
+                if treap.search(key) and cursor.key is not None:
+                    self.assertEqual(cursor.key, key)
+                    self.assertEqual(cursor.next(), next(treap.keys_from(key + "~"), None))
+                else:
+                    self.assertIsNone(cursor.key)
+
+    def test_search_many(self):
+        # batch search must agree with individual searches, with and without numpy
+        treap, keys = self.get_random_treap()
+        probes = [random.choice(string.ascii_letters) for _ in range(500)] + ["Napolean", ""]
+        expected = [treap.search(key) for key in probes]
+
+        self.assertEqual(list(treap.search_many(probes)), expected)
+        self.assertEqual(list(treap.search_many(iter(probes))), expected)
+        self.assertEqual(list(Treap().search_many(probes)), [False] * len(probes))
+        with mock.patch.object(treap_module, "numpy", None):
+            self.assertEqual(treap.search_many(probes), expected)
+            self.assertEqual(treap.search_many(probes[:3]), expected[:3])
+            self.assertEqual(Treap().search_many(probes), [False] * len(probes))
+
+        # a few probes on a large treap are searched without flattening it
+        large = Treap.from_keys([str(k) for k in range(10000)])
+        with mock.patch.object(Treap, "__iter__", side_effect=AssertionError("flattened")):
+            self.assertEqual(list(large.search_many(["1", "x", "9999"])), [True, False, True])
+            with mock.patch.object(treap_module, "numpy", None):
+                self.assertEqual(large.search_many(["1", "x", "9999"]), [True, False, True])
+
+    @unittest.skipIf(treap_module.numpy is None, "numpy is not installed")
+    def test_search_many_numpy(self):
+        # the numpy and pure python paths agree, keys with trailing NULs included
+        keys = ["a\x00", "b", "c\x00\x00"] + [str(k) for k in range(100)]
+        treap = Treap.from_keys(keys)
+        probes = ["a", "a\x00", "b\x00", "c\x00", "c\x00\x00", "5"] * 50
+        expected = [key in keys for key in probes]
+        # a large batch flattens the tree, a small one searches key by key
+        self.assertEqual(treap.search_many(probes).tolist(), expected)
+        self.assertEqual(treap.search_many(probes[:6]).tolist(), expected[:6])
+        self.assertEqual(treap.search_many(treap_module.numpy.array(probes, dtype=object)).tolist(), expected)
+        with mock.patch.object(treap_module, "numpy", None):
+            self.assertEqual(treap.search_many(probes), expected)
+            self.assertEqual(treap.search_many(probes[:6]), expected[:6])
+
+    def test_search_stream(self):
+        # streamed probes must be counted exactly like a per-character search
+        treap = Treap.from_keys(random.sample(string.ascii_uppercase, 13))
+        text = "".join(random.choice(string.ascii_letters + " .,\né") for _ in range(5000))
+        letters = collections.Counter(c.upper() for c in text if c in string.ascii_letters)
+        data = text.encode("latin-1")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "probes.txt")
+            with open(path, "wb") as output:
+                output.write(data)
+            for accelerated in (True, False):
+                with mock.patch.object(stream, "numpy", stream.numpy if accelerated else None):
+                    for source in (lambda: open(path, "rb"), lambda: io.BytesIO(data)):
+                        with source() as fileobj:
+                            result = treap.search_stream(fileobj, stream.UPPERCASE, stream.NON_LETTERS,
+                                                         chunk_size=999)
+                        self.assertEqual(result.hits, {k: n for k, n in letters.items() if treap.search(k)})
+                        self.assertEqual(result.misses, {k: n for k, n in letters.items() if not treap.search(k)})
+                        self.assertEqual(result.bytes, len(data))
+                        self.assertGreaterEqual(result.throughput, 0)
+
+                    # without normalization every byte is a probe
+                    result = treap.search_stream(io.BytesIO(data))
+                    self.assertEqual({**result.hits, **result.misses}, collections.Counter(text))
+
+            # empty files can't be mapped but are fine to stream
+            open(path, "wb").close()
+            with open(path, "rb") as fileobj:
+                self.assertEqual(treap.search_stream(fileobj).bytes, 0)
+
     def is_ordered(self, treap: Treap) -> None:
         """ Utility to check that every node in the given Treap satisfies the following:
         
@@ -107,8 +625,19 @@ class TestTreap(unittest.TestCase):
             # check all left and right. All are optional, technically
             if node.left:
                 self.assertGreater(node.key, node.left.key)
+                self.assertIs(node.left.parent, node)
             if node.right:
                 self.assertLess(node.key, node.right.key)
+                self.assertIs(node.right.parent, node)
+
+            # check subtree sizes of augmented treaps
+            if treap._augmented:
+                self.assertEqual(node.size, 1 + (node.left.size if node.left else 0)
+                                              + (node.right.size if node.right else 0))
+
+        # the root has no parent
+        if treap.root is not None:
+            self.assertIsNone(treap.root.parent)
 
     def get_random_treap(self) -> Tuple[Treap, set]:
         """ Utility method to randomly generate a Treap"
@@ -0,0 +1,108 @@
+""" Unit Tests for the pytreap.server module.
+"""
+
+import asyncio
+import os
+import unittest
+import random
+import string
+import struct
+import tempfile
+
+from pytreap.server import ERRORS, SEARCH, TreapClient, TreapServer
+from pytreap.treap import Treap
+
+class TestTreapServer(unittest.TestCase):
+
+    def test_unix_socket(self):
+        # a served treap must answer like the treap itself, requests pipelined
+        keys = set(random.sample(string.ascii_letters, 30))
+        probes = [random.choice(string.ascii_letters) for _ in range(200)] + ["日本", ""]
+
+        async def _run(path):
+            async with TreapServer(Treap.from_keys(keys)) as server:
+                await server.start(path)
+                async with TreapClient(path, pool_size=3) as client:
+                    # many coroutines share the pool of connections
+                    results = await asyncio.gather(*[client.search(key) for key in probes])
+                    self.assertEqual(results, [key in keys for key in probes])
+                    self.assertEqual(await client.search_many(probes), [key in keys for key in probes])
+
+                    # writes are applied in order, and visible to later reads
+                    await client.insert("日本", 5)
+                    self.assertTrue(await client.search("日本"))
+                    with self.assertRaises(AssertionError, msg="Allowed a duplicate key"):
+                        await client.insert("日本")
+                    for priority in (-1, 1 << 64):
+                        with self.assertRaises(AssertionError, msg="Sent an invalid priority"):
+                            await client.insert("z", priority)
+                    added = await client.insert_many(list(string.ascii_letters), on_duplicate="skip")
+                    self.assertEqual(added, len(string.ascii_letters) - len(keys))
+                    await client.delete("a")
+                    self.assertFalse(await client.discard("a"))
+                    with self.assertRaises(KeyError, msg="Deleted a missing key"):
+                        await client.delete("a")
+                    self.assertEqual(await client.length(), len(string.ascii_letters))
+                self.assertTrue(server.treap.search("日本"))
+                self.assertFalse(server.treap.search("a"))
+
+        with tempfile.TemporaryDirectory() as directory:
+            asyncio.run(_run(os.path.join(directory, "treap.sock")))
+
+    def test_tcp(self):
+        # the same protocol runs over localhost TCP
+        async def _run():
+            async with TreapServer() as server:
+                await server.start(port=0)
+                host, port = server.address[:2]
+                async with TreapClient(host=host, port=port, pool_size=1) as client:
+                    writes = [client.insert(key, priority) for priority, key in enumerate("abc")]
+                    await asyncio.gather(*writes)
+                    self.assertEqual(await client.search_many("abcd"), [True, True, True, False])
+                self.assertEqual(server.treap.peek_max(), ("c", 2))
+
+        asyncio.run(_run())
+
+    def test_close(self):
+        # closing waits for the connections still open, and is harmless before start
+        async def _run():
+            await TreapServer().close()
+            server = await TreapServer().start(port=0)
+            host, port = server.address[:2]
+            client = await TreapClient(host=host, port=port, pool_size=2).connect()
+            await client.insert("a")
+            await server.close()
+            self.assertEqual(server._connections, {})
+            with self.assertRaises(ConnectionError):
+                await client.search("a")
+            await client.close()
+            await server.close()
+
+        asyncio.run(_run())
+
+    def test_malformed_frames(self):
+        # bad requests are answered with an error, frames without a header hang up
+        async def _exchange(reader, writer, payload):
+            writer.write(struct.pack("<I", len(payload)) + payload)
+            size, = struct.unpack("<I", await reader.readexactly(4))
+            return await reader.readexactly(size)
+
+        async def _run():
+            async with TreapServer(Treap.from_keys("abc")) as server:
+                await server.start(port=0)
+                host, port = server.address[:2]
+                reader, writer = await asyncio.open_connection(host, port)
+                unknown = await _exchange(reader, writer, struct.pack("<BBI", 99, 0, 7))
+                self.assertEqual(unknown[:5], struct.pack("<BI", ERRORS.index(AssertionError) + 1, 7))
+                truncated = await _exchange(reader, writer, struct.pack("<BBII", SEARCH, 0, 8, 5))
+                self.assertEqual(truncated[:5], struct.pack("<BI", ERRORS.index(AssertionError) + 1, 8))
+
+                writer.write(struct.pack("<I", 2) + b"\x01\x00")
+                self.assertEqual(await reader.read(), b"")
+                writer.close()
+
+                # the server carries on serving everyone else
+                async with TreapClient(host=host, port=port, pool_size=1) as client:
+                    self.assertEqual(await client.search_many("ad"), [True, False])
+
+        asyncio.run(_run())
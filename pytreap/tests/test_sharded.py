@@ -0,0 +1,52 @@
+""" Unit Tests for the pytreap.ShardedTreap class.
+"""
+
+import unittest
+import random
+import string
+
+from pytreap import sharded as sharded_module
+from pytreap.sharded import ShardedTreap
+
+class TestShardedTreap(unittest.TestCase):
+
+    def test_sharded(self):
+        # a sharded treap must answer exactly like a set of its keys
+        keys = set(random.sample(string.ascii_letters, 30))
+        with ShardedTreap.from_keys(keys, shards=3, chunk_size=4) as sharded:
+            self.assertEqual(len(sharded.boundaries), 2)
+            self.assertEqual(len(sharded), len(keys))
+            self.assertEqual(list(sharded), sorted(keys))
+            probes = [random.choice(string.ascii_letters) for _ in range(100)] + ["Napolean", ""]
+            self.assertEqual(sharded.search_many(probes), [key in keys for key in probes])
+
+            # batches are routed to every shard; single keys to their own
+            batch = [key for key in string.ascii_letters if key not in keys]
+            self.assertEqual(sharded.insert_many(batch + ["a", "Z"], on_duplicate="skip"), len(batch))
+            with self.assertRaises(AssertionError, msg="Allowed duplicate keys"):
+                sharded.insert_many(["Napolean", "a"])
+            self.assertFalse(sharded.search("Napolean"))
+            sharded.insert("Napolean", 7)
+            with self.assertRaises(AssertionError, msg="Allowed a duplicate key"):
+                sharded.insert("Napolean")
+            self.assertTrue("Napolean" in sharded)
+            sharded.delete("a")
+            self.assertFalse(sharded.discard("a"))
+            with self.assertRaises(KeyError, msg="Deleted a missing key"):
+                sharded.delete("a")
+            self.assertEqual(list(sharded), sorted(set(string.ascii_letters) - {"a"} | {"Napolean"}))
+
+    def test_options(self):
+        # shards built from keys keep the constructor options of their treaps
+        with ShardedTreap.from_keys(string.ascii_letters, shards=2, augmented=True, adaptive=4) as sharded:
+            for executor in sharded._executors:
+                self.assertEqual(executor.submit(sharded_module._call, "__getattribute__", "adaptive").result(), 4)
+                self.assertEqual(executor.submit(sharded_module._call, "rank", sharded.boundaries[0]).result(),
+                                 0 if executor is sharded._executors[1] else 26)
+
+    def test_bad_construction(self):
+        # evaluate construction with improper values
+        with self.assertRaises(AssertionError, msg="Allowed unsorted boundaries"):
+            ShardedTreap(["b", "a"])
+        with self.assertRaises(AssertionError, msg="Allowed duplicate keys"):
+            ShardedTreap.from_keys(["a", "b", "b", "c"], shards=2)
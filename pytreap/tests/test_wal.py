@@ -0,0 +1,179 @@
+""" Unit Tests for the pytreap write-ahead log (Treap.durable and Treap.recover).
+"""
+
+import os
+import random
+import tempfile
+import time
+import unittest
+
+from pytreap import wal
+from pytreap.treap import Treap
+
+class TestWriteAheadLog(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.directory = self._directory.name
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def _mutate(self, treap, count):
+        # apply a random mix of the logged operations
+        for _ in range(count):
+            key = "{:03d}".format(random.randrange(300))
+            choice = random.random()
+            if choice < 0.5:
+                if not treap.search(key):
+                    treap.insert(key)
+            elif choice < 0.7:
+                treap.discard(key)
+            elif choice < 0.8:
+                if treap.search(key):
+                    treap.update_priority(key, random.getrandbits(64))
+            elif choice < 0.9:
+                treap.insert_many([key, key + "a", key + "b"], on_duplicate="replace")
+            elif len(treap):
+                treap.pop_max()
+
+    def _assert_equal(self, treap, other):
+        self.assertEqual([(n.key, n.priority) for n in treap], [(n.key, n.priority) for n in other])
+
+    def test_recover(self):
+        # every fsync policy replays to the same treap, keys and priorities alike
+        for fsync in wal.FSYNC_POLICIES:
+            directory = os.path.join(self.directory, fsync)
+            treap = Treap.from_keys(["{:03d}".format(i) for i in range(0, 300, 7)])
+            log = treap.durable(directory, fsync=fsync, group_size=16)
+            self.assertIs(treap.wal, log)
+            self._mutate(treap, 500)
+            self.assertGreater(log.records, 0)
+            treap.durable(None)
+            self.assertIsNone(treap.wal)
+
+            recovered = Treap.recover(directory)
+            self._assert_equal(treap, recovered)
+            self.assertEqual(len(recovered), len(treap))
+            self.assertIsNone(recovered.wal)
+
+        with self.assertRaises(AssertionError):
+            Treap().durable(self.directory, fsync="sometimes")
+
+    def test_degenerate(self):
+        # a list shaped snapshot replays its tail like any other
+        treap = Treap()
+        treap.durable(self.directory)
+        keys = ["{:05d}".format(k) for k in range(3000)]
+        for key in keys:
+            treap.insert(key, 1)
+        treap.compact()
+        treap.insert("99999", 1)
+        treap.wal.flush()
+        recovered = Treap.recover(self.directory)
+        self.assertEqual([n.key for n in recovered], keys + ["99999"])
+        treap.durable(None)
+
+    def test_existing_state(self):
+        # a directory holding another treap's state is never overwritten
+        treap = Treap.from_keys("ABC")
+        treap.durable(self.directory)
+        treap.insert("D")
+        treap.durable(None)
+        snapshot = os.path.join(self.directory, wal.SNAPSHOT)
+        with open(snapshot, "rb") as data:
+            saved = data.read()
+        with self.assertRaises(AssertionError):
+            Treap.from_keys("XYZ").durable(self.directory)
+        with open(snapshot, "rb") as data:
+            self.assertEqual(data.read(), saved)
+        self.assertEqual([n.key for n in Treap.recover(self.directory)], list("ABCD"))
+
+        # the treap which logged there, or one recovered from there, may resume
+        treap.durable(self.directory)
+        treap.durable(None)
+        recovered = Treap.recover(self.directory)
+        recovered.durable(self.directory)
+        recovered.insert("E")
+        recovered.durable(None)
+        self.assertEqual([n.key for n in Treap.recover(self.directory)], list("ABCDE"))
+
+    def test_torn_tail(self):
+        # a partially written record is ignored on recovery and dropped on reopening
+        treap = Treap()
+        treap.durable(self.directory)
+        for key in "ABCDE":
+            treap.insert(key)
+        treap.durable(None)
+        path = os.path.join(self.directory, wal.LOG)
+        self.assertEqual(os.path.getsize(path), 5 * (wal._RECORD.size + 1))
+        with open(path, "ab") as log:
+            log.write(wal._encode(wal.PUT, "F", 1)[:-2])
+        self._assert_equal(treap, Treap.recover(self.directory))
+
+        recovered = Treap.recover(self.directory)
+        recovered.durable(self.directory)
+        recovered.insert("G")
+        recovered.durable(None)
+        self.assertEqual(os.path.getsize(path), wal._RECORD.size + 1)
+        self.assertEqual([n.key for n in Treap.recover(self.directory)], list("ABCDEG"))
+
+        # a corrupt record ends the replay just the same
+        with open(path, "r+b") as log:
+            log.seek(wal._RECORD.size)
+            log.write(b"H")
+        self.assertEqual([n.key for n in Treap.recover(self.directory)], list("ABCDE"))
+        self.assertEqual(wal.read_log(path), ([], 0))
+
+    def test_compaction(self):
+        # the log is folded into the snapshot every compact_every records
+        treap = Treap()
+        log = treap.durable(self.directory, compact_every=50)
+        self._mutate(treap, 400)
+        self.assertLess(log.records, 50)
+        # records still waiting for their group aren't on disk yet
+        log.flush()
+        self._assert_equal(treap, Treap.recover(self.directory))
+
+        # unlogged operations are made durable by compacting
+        treap.union(Treap.from_keys(["x", "y"]))
+        treap.compact()
+        self.assertEqual(log.records, 0)
+        self.assertEqual(os.path.getsize(os.path.join(self.directory, wal.LOG)), 0)
+        self._assert_equal(treap, Treap.recover(self.directory))
+        treap.durable(None)
+        with self.assertRaises(AssertionError):
+            treap.compact()
+
+    def test_interval(self):
+        # a group is committed once it has waited the interval, with no further appends
+        treap = Treap()
+        log = treap.durable(self.directory, group_size=256, interval=0.05)
+        path = os.path.join(self.directory, wal.LOG)
+        treap.insert("A", 1)
+        time.sleep(0.5)
+        self.assertEqual(wal.read_log(path)[0], [(wal.PUT, "A", 1)])
+        self.assertEqual(log.records, 1)
+        treap.durable(None)
+
+    def test_invalid_priority(self):
+        # a priority the log can't hold changes neither the treap nor the log
+        treap = Treap.from_keys("ABC")
+        log = treap.durable(self.directory, fsync="always")
+        treap.insert("D", 5)
+        before = [(n.key, n.priority) for n in treap]
+        path = os.path.join(self.directory, wal.LOG)
+        size = os.path.getsize(path)
+        with self.assertRaises(AssertionError):
+            treap.insert("E", 1 << 64)
+        with self.assertRaises(AssertionError):
+            treap.update_priority("D", 1 << 64)
+        with self.assertRaises(AssertionError):
+            treap.insert_many(["F", "G"], [1, 1 << 64])
+        self.assertEqual([(n.key, n.priority) for n in treap], before)
+        self.assertEqual((log.records, os.path.getsize(path)), (1, size))
+        treap.durable(None)
+        self.assertEqual([(n.key, n.priority) for n in Treap.recover(self.directory)], before)
+
+if __name__ == '__main__':
+    unittest.main()
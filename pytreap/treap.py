@@ -4,46 +4,547 @@ This class defines an Object Oriented Treap: a combination of a
 Binary Search Tree and a Heap.
 """
 
-import random
-from typing import Union
+import contextlib
+import gc
+import heapq
+import itertools
+import math
+import os
+import time
+from typing import Callable, Iterable, List, Tuple, Union
 
-from .node import Node
+try:
+    import numpy
+except ImportError:
+    # numpy is only an optional accelerator for batch operations
+    numpy = None
+
+from .cursor import Cursor
+from .frozen import FrozenTreap
+from .instrument import Counters, tree_stats
+from .mapped import MappedTreap, dump
+from .node import Node, SizedNode
+from .priority import DEFAULT_STRATEGY
+from .stream import CHUNK_SIZE, StreamResult, alphabet, read_chunks, tally
+from .wal import WriteAheadLog, holds_state, load
+
+@contextlib.contextmanager
+def _paused_gc():
+    # Parent pointers make every node part of a reference cycle, so while a large
+    #  tree is being built the cyclic garbage collector keeps traversing it without
+    #  ever finding garbage; pause it (restoring the previous state afterwards).
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
 
 class Treap:
     """ This class maintains a prioritized set of Nodes for efficient insertion
     and search operations.
     """
 
-    def __init__(self) -> None:
+    def __init__(self,
+                 augmented: bool = False,
+                 adaptive: int = 0,
+                 strategy: Union[Callable[[str], int], None] = None) -> None:
+        """ Construct an empty treap.
+
+        Args:
+            augmented: If True every node tracks its subtree size, enabling the
+                O(log n) order statistics rank, select and count_range.
+            adaptive: If positive, every adaptive-th successful search is sampled: the
+                hit is counted against its key and the node is rotated above any
+                less frequently hit ancestors, so that hot keys drift towards the root.
+                Sampling adds a little to every hit (10-20% on the textbook workload);
+                set adaptive to 0 once the access pattern has been learned.
+            strategy: Generates the priorities of keys inserted without one (see
+                pytreap.priority); defaults to batched 64-bit random priorities.
+        """
         # default instantiation creates an empty treap
         self.root = None
-        self._nodes = []
+        self._strategy = strategy if strategy is not None else DEFAULT_STRATEGY
+        # number of nodes, or None if unknown (it's then counted lazily)
+        self._size = 0
+        # bumped whenever nodes may have left the tree, so cursors revalidate
+        self._generation = 0
+        self._augmented = augmented
+        self._node_type = SizedNode if augmented else Node
+        # operation counters, only kept while instrumented
+        self.counters = None
+        # write-ahead log, only kept while durable, and the directory whose state this
+        #  treap holds (recovered from or last logged to)
+        self.wal = None
+        self._directory = None
+        # sampled hit counts per key, only kept in adaptive mode
+        self._hits = None
+        self._adaptive = 0
+        self.adaptive = adaptive
+
+    @property
+    def adaptive(self) -> int:
+        """ The adaptive sampling period; zero if adaptation is disabled.
+        """
+        return self._adaptive
+
+    @adaptive.setter
+    def adaptive(self, period: int) -> None:
+        if period < 0:
+            raise AssertionError("Adaptive period must be greater than zero.")
+        self._adaptive = period
+        self._countdown = period
+        # hit counts survive pausing and resuming adaptation
+        if period and self._hits is None:
+            self._hits = {}
+        self._install()
+
+    def instrument(self, enabled: bool = True) -> Union[Counters, None]:
+        """ Enable (or disable) operation counters.
+
+        While enabled, inserts count their rotations and path lengths and searches
+        count the nodes they visit. When disabled the original code paths run
+        unchanged, so instrumentation costs nothing.
+
+        Args:
+            enabled: Whether counters should be kept.
+
+        Returns:
+            The (fresh) Counters object, also available as the counters attribute,
+            or None if disabled.
+        """
+        self.counters = Counters() if enabled else None
+        self._install()
+        return self.counters
+
+    def stats(self) -> dict:
+        """ Compute the shape of the treap (iteratively, in O(n) time).
+
+        Returns:
+            A dictionary with the node count, height, average and p99 node depth and
+            the depth histogram (node counts indexed by depth; the root is at depth 1).
+        """
+        return tree_stats(self.root)
+
+    def _install(self):
+        # Internal method to select the implementation of the operations for the
+        #  current modes. Alternatives are bound on the instance so that the plain
+        #  methods stay free of any mode checks.
+        for name in ("search", "insert", "_left_rotate", "_right_rotate",
+                     "_insert", "_insert_sorted", "_remove", "_reprioritize"):
+            self.__dict__.pop(name, None)
+        if self.counters is not None:
+            self.search = self._instrumented_search
+            self.insert = self._instrumented_insert
+            self._left_rotate = self._counted(Treap._left_rotate)
+            self._right_rotate = self._counted(Treap._right_rotate)
+        elif self._adaptive:
+            self.search = self._adaptive_search(self._adaptive)
+        if self.wal is not None:
+            # every mutation of the key set or of a priority funnels through these
+            put, delete = WriteAheadLog.encode_put, WriteAheadLog.encode_delete
+            self._insert = self._logged(Treap._insert, lambda node: [put(node.key, node.priority)])
+            self._insert_sorted = self._logged(Treap._insert_sorted,
+                                               lambda keys, priorities: list(map(put, keys, priorities)))
+            self._remove = self._logged(Treap._remove, lambda node: [delete(node.key)])
+            self._reprioritize = self._logged(Treap._reprioritize, lambda node, p: [put(node.key, p)])
 
-    def insert(self, key: str, priority: Union[int, None] = None) -> None:
+    def durable(self,
+                directory: Union[str, None],
+                fsync: str = "batch",
+                group_size: int = 256,
+                interval: float = 0.01,
+                compact_every: Union[int, None] = None) -> Union[WriteAheadLog, None]:
+        """ Log every mutation to a write-ahead log (or stop doing so).
+
+        The current keys are first written as the directory's snapshot, then every
+        insert, delete and priority change is appended to the log (see pytreap.wal);
+        Treap.recover rebuilds the treap from the directory. A directory already
+        holding a snapshot or log is only accepted by the treap recovered from it (or
+        last logged to it), since its state is replaced. Priorities must fit in
+        64 bits. Structural operations (split, merge, the set operations) and the
+        promotions of adaptive mode aren't logged; call compact after them.
+
+        Args:
+            directory: The directory of the snapshot and log; None closes the log.
+            fsync: 'always' syncs every record, 'batch' syncs groups of records and
+                'never' leaves flushing to the operating system.
+            group_size: The number of records committed together.
+            interval: The longest a record waits for its group, in seconds.
+            compact_every: If given, the log is compacted after this many records.
+
+        Returns:
+            The WriteAheadLog, also available as the wal attribute, or None if closed.
+
+        Raises:
+            AssertionError: If the directory holds the state of another treap.
+        """
+        if directory is not None and holds_state(directory) \
+                and self._directory != os.path.realpath(directory):
+            raise AssertionError("Directory {} already holds a durable treap; recover it first.".format(
+                directory))
+        if self.wal is not None:
+            self.wal.close()
+            self.wal = None
+        if directory is not None:
+            wal = WriteAheadLog(directory, fsync, group_size, interval, compact_every)
+            wal.compact(self)
+            self.wal = wal
+            self._directory = os.path.realpath(directory)
+        self._install()
+        return self.wal
+
+    def compact(self) -> None:
+        """ Write the treap as the snapshot of its write-ahead log and empty the log.
+        """
+        if self.wal is None:
+            raise AssertionError("Treap is not durable.")
+        self.wal.compact(self)
+
+    @classmethod
+    def recover(cls, directory: str, **kwargs) -> "Treap":
+        """ Rebuild a treap from the snapshot and write-ahead log in a directory.
+
+        The snapshot is loaded in linear time and the log tail is folded into its
+        net effect per key, which is then applied in bulk (see insert_many), for any
+        tree shape. Call durable on the result to resume logging to the directory.
+
+        Args:
+            directory: The directory given to durable.
+            kwargs: Passed on to the Treap constructor.
+
+        Returns:
+            The recovered Treap.
+        """
+        pairs, tail = load(directory)
+        treap = cls.from_sorted([k for k, _ in pairs], [p for _, p in pairs], **kwargs)
+        puts = [key for key, priority in tail.items() if priority is not None]
+        treap.insert_many(puts, [tail[key] for key in puts], on_duplicate="replace")
+        for key, priority in tail.items():
+            if priority is None:
+                treap.discard(key)
+        treap._directory = os.path.realpath(directory)
+        return treap
+
+    def _logged(self, operation, encode):
+        # Internal method wrapping an operation so that its effect is appended to the
+        #  write-ahead log, compacting the log when it has grown long enough. The
+        #  records are encoded first, so a value the log can't hold fails before the
+        #  treap changes, and appended once the operation has succeeded.
+        def _operation(*args):
+            records = encode(*args)
+            result = operation(self, *args)
+            self.wal.append(records)
+            if self.wal.compaction_due:
+                self.wal.compact(self)
+            return result
+        return _operation
+
+    def insert(self, key: str, priority: Union[int, None] = None) -> Node:
         """ Insert a new key (and optionally a priority).
 
         Args:
             key: The string key of the new node.
             priority: An optional integer value; if None this is randomly generated.
+
+        Returns:
+            The new Node, which stays valid until its key is removed.
+        """
+        # construct node object and insert; a duplicate key is detected on the way
+        #  down, before the tree is modified
+        node = self._node_type(key, self._priority(key, priority))
+        self._insert(node)
+
+        # the tree itself is the only registry of nodes
+        if self._size is not None:
+            self._size += 1
+        return node
+
+    def delete(self, key: str) -> None:
+        """ Remove the given key in O(log n) expected time.
+
+        Args:
+            key: The string key to remove.
+
+        Raises:
+            KeyError: If the key isn't in the treap.
+        """
+        node = self._find(key)
+        if node is None:
+            raise KeyError("Key {} not found.".format(key))
+        self._remove(node)
+
+    def discard(self, key: str) -> bool:
+        """ Remove the given key if present, in O(log n) expected time.
+
+        Args:
+            key: The string key to remove.
+
+        Returns:
+            Boolean indicating whether the key was found (and removed).
         """
-        # make sure this key hasn't been used previously
-        if self.search(key):
-            raise AssertionError("Key {} already in use.".format(key))
+        node = self._find(key)
+        if node is None:
+            return False
+        self._remove(node)
+        return True
+
+    def _remove(self, node):
+        # Internal method to unlink a node: rotate it down to a leaf (promoting its
+        #  higher priority child each step) and then cut it off its parent.
+        self._sift_down(node, to_leaf=True)
+        parent = node.parent
+        if parent is None:
+            self.root = None
+        elif parent.left is node:
+            parent.left = None
+        else:
+            parent.right = None
+        node.parent = None
 
-        # make sure the given priority is good or generate our own    
+        # every ancestor lost one descendant
+        if self._augmented:
+            while parent is not None:
+                parent.size -= 1
+                parent = parent.parent
+        if self._size is not None:
+            self._size -= 1
+        if self._hits is not None:
+            self._hits.pop(node.key, None)
+        self._generation += 1
+
+    def peek_max(self) -> Tuple[str, int]:
+        """ Return the key with the highest priority in O(1) time; heap order keeps it
+        at the root.
+
+        Returns:
+            The (key, priority) tuple of the root.
+
+        Raises:
+            IndexError: If the treap is empty.
+        """
+        if self.root is None:
+            raise IndexError("Treap is empty.")
+        return self.root.key, self.root.priority
+
+    def pop_max(self) -> Tuple[str, int]:
+        """ Remove and return the key with the highest priority, in O(log n) expected time.
+
+        Returns:
+            The (key, priority) tuple of the former root.
+
+        Raises:
+            IndexError: If the treap is empty.
+        """
+        node = self.root
+        if node is None:
+            raise IndexError("Treap is empty.")
+        self._remove(node)
+        return node.key, node.priority
+
+    def update_priority(self, key: str, priority: Union[int, None]) -> None:
+        """ Raise or lower the priority of a key, in O(log n) expected time.
+
+        The node is rotated up or down until heap order is restored.
+
+        Args:
+            key: The string key to update.
+            priority: The new integer value; if None a new one is randomly generated.
+
+        Raises:
+            KeyError: If the key isn't in the treap.
+        """
+        node = self._find(key)
+        if node is None:
+            raise KeyError("Key {} not found.".format(key))
+        self._reprioritize(node, self._priority(key, priority))
+
+    def nlargest(self, k: int) -> List[Tuple[str, int]]:
+        """ Find the k keys with the highest priorities in O(k log k) time.
+
+        Heap order means the next largest priority is always a child of a node
+        already taken, so only that frontier is kept in a heap.
+
+        Args:
+            k: The number of keys to return.
+
+        Returns:
+            Up to k (key, priority) tuples, by descending priority.
+        """
+        result = []
+        # unique keys break ties between priorities, so nodes are never compared
+        frontier = [] if self.root is None else [(-self.root.priority, self.root.key, self.root)]
+        while frontier and len(result) < k:
+            _, _, node = heapq.heappop(frontier)
+            result.append((node.key, node.priority))
+            for child in (node.left, node.right):
+                if child is not None:
+                    heapq.heappush(frontier, (-child.priority, child.key, child))
+        return result
+
+    @classmethod
+    def from_sorted(cls,
+                    keys: Iterable[str],
+                    priorities: Union[Iterable[int], None] = None,
+                    **kwargs) -> "Treap":
+        """ Construct a new Treap in linear time from strictly increasing keys.
+
+        Args:
+            keys: The string keys of the new nodes, in strictly increasing order.
+            priorities: Optional integer values matching the keys one-to-one; if None
+                these are randomly generated.
+            kwargs: Passed on to the Treap constructor.
+
+        Returns:
+            The new Treap.
+        """
+        treap = cls(**kwargs)
+        if priorities is not None:
+            priorities = iter(priorities)
+
+        # Cartesian tree construction: every new node is the largest key so far, so
+        #  it belongs somewhere on the right spine of the tree built so far. Nodes on
+        #  the spine with a lower priority become its left subtree.
+        spine = []
+        with _paused_gc():
+            for key in keys:
+                if spine and not spine[-1].key < key:
+                    raise AssertionError("Keys must be strictly increasing; {} follows {}.".format(
+                        key, spine[-1].key))
+                if priorities is None:
+                    priority = treap._strategy(key)
+                else:
+                    priority = next(priorities, None)
+                    if priority is None:
+                        raise AssertionError("Fewer priorities than keys given.")
+                    priority = treap._priority(key, priority)
+                node = treap._node_type(key, priority)
+
+                # pop all lower priority nodes off the spine; the last one popped heads them.
+                #  popped subtrees are complete, so their sizes can be settled right away
+                last = None
+                while spine and spine[-1].priority < priority:
+                    last = spine.pop()
+                    treap._update(last)
+                if last is not None:
+                    node.left = last
+                    last.parent = node
+                if spine:
+                    spine[-1].right = node
+                    node.parent = spine[-1]
+                spine.append(node)
+                treap._size += 1
+
+        if priorities is not None and next(priorities, None) is not None:
+            raise AssertionError("More priorities than keys given.")
+        for node in reversed(spine):
+            treap._update(node)
+
+        # the bottom of the spine is the highest priority node
+        treap.root = spine[0] if spine else None
+        return treap
+
+    @classmethod
+    def from_keys(cls,
+                  keys: Iterable[str],
+                  priorities: Union[Iterable[int], None] = None,
+                  **kwargs) -> "Treap":
+        """ Construct a new Treap from unique keys in any order.
+
+        The keys (and their priorities, if given) are sorted before delegating
+        to from_sorted, so this runs in O(n log n) time dominated by the sort.
+
+        Args:
+            keys: The unique string keys of the new nodes.
+            priorities: Optional integer values matching the keys one-to-one; if None
+                these are randomly generated.
+            kwargs: Passed on to the Treap constructor.
+
+        Returns:
+            The new Treap.
+        """
+        if priorities is None:
+            return cls.from_sorted(sorted(keys), **kwargs)
+        keys, priorities = list(keys), list(priorities)
+        if len(keys) != len(priorities):
+            raise AssertionError("Got {} keys but {} priorities.".format(len(keys), len(priorities)))
+        pairs = sorted(zip(keys, priorities), key=lambda pair: pair[0])
+        return cls.from_sorted([k for k, _ in pairs], [p for _, p in pairs], **kwargs)
+
+    def insert_many(self,
+                    keys: Iterable[str],
+                    priorities: Union[Iterable[int], None] = None,
+                    on_duplicate: str = "raise") -> int:
+        """ Insert a batch of keys (and optionally priorities) in one pass.
+
+        The batch is sorted and checked against the treap with finger searches in
+        key order (see Cursor), then the new keys are built into a treap in linear
+        time by from_sorted and united with this one. Both steps take O(m log(n/m + 1))
+        expected time for m keys instead of the O(m log n) of m separate inserts.
+
+        Args:
+            keys: The string keys of the new nodes, in any order.
+            priorities: Optional integer values matching the keys one-to-one; if None
+                these are randomly generated.
+            on_duplicate: How to handle keys already in the treap or repeated in the
+                batch: 'raise' an AssertionError before anything is inserted, 'skip'
+                them (the first occurrence wins) or 'replace' the priority of the
+                existing node (the last occurrence wins).
+
+        Returns:
+            The number of keys added to the treap.
+        """
+        if on_duplicate not in ("raise", "skip", "replace"):
+            raise AssertionError("Unknown duplicate policy {}.".format(on_duplicate))
+        keys = list(keys)
+        priorities = [None] * len(keys) if priorities is None else list(priorities)
+        if len(keys) != len(priorities):
+            raise AssertionError("Got {} keys but {} priorities.".format(len(keys), len(priorities)))
+
+        # collapse repeated keys of the batch itself
+        batch = {}
+        for key, priority in zip(keys, priorities):
+            if key in batch:
+                if on_duplicate == "raise":
+                    raise AssertionError("Key {} already in use.".format(key))
+                elif on_duplicate == "skip":
+                    continue
+            batch[key] = priority
+
+        # sort out the keys already present; all priorities are settled up front so
+        #  that nothing is modified if any of them is invalid. In key order each
+        #  search starts from the previous one, so it only climbs as far as needed
+        new_keys, new_priorities, replaced = [], [], []
+        cursor = self.cursor()
+        for key in sorted(batch):
+            node = cursor._node if cursor.search(key) else None
+            if node is None:
+                new_keys.append(key)
+                new_priorities.append(self._priority(key, batch[key]))
+            elif on_duplicate == "raise":
+                raise AssertionError("Key {} already in use.".format(key))
+            elif on_duplicate == "replace":
+                replaced.append((node, self._priority(key, batch[key])))
+
+        for node, priority in replaced:
+            self._reprioritize(node, priority)
+        if new_keys:
+            self._insert_sorted(new_keys, new_priorities)
+        return len(new_keys)
+
+    def _insert_sorted(self, keys, priorities):
+        # Internal method to add new, sorted keys with their priorities: build them into
+        #  a treap in linear time and unite it with this one
+        self.union(type(self).from_sorted(keys, priorities, augmented=self._augmented, strategy=self._strategy))
+
+    def _priority(self, key: str, priority: Union[int, None]) -> int:
+        # Internal method to validate a user supplied priority or generate our own
         if priority is not None and priority < 0:
             raise AssertionError("Priority must be greater than zero.")
         elif priority is None:
-            priority = random.randint(0, 1000)
-   
-        # construct node object and insert
-        node = Node(key, priority)
-        self._insert(node)
-
-        # save this node
-        if self.root is None:
-            self.root = node
-        self._nodes.append(node)
+            priority = self._strategy(key)
+        return priority
 
     def _insert(self, node):
         # Internal method to perform an insert function while maintaining treap properties
@@ -53,8 +554,12 @@ class Treap:
 
         # first, find an empty leaf and insert
         current = self.root
+        if current is None:
+            self.root = node
         while current is not None:
-            if node.key > current.key:
+            if current.key == node.key:
+                raise AssertionError("Key {} already in use.".format(node.key))
+            elif node.key > current.key:
                 if not current.right:
                     # insert as the right leaf here
                     current.right = node
@@ -71,59 +576,111 @@ class Treap:
                 else:
                     current = current.left
 
+        # when augmented every ancestor of the new leaf gains one descendant
+        if self._augmented:
+            current = node.parent
+            while current is not None:
+                current.size += 1
+                current = current.parent
+
         # next we need to re-prioritize the tree
         #  this entails walking back up the tree and rotating nodes that 
         #  have misplace priorities
+        self._sift_up(node)
 
-        # convenience function to rotate out nodes
-        #  assumes both x and x.right
-        def _left_rotate(x):
-            y = x.right
-            x.right = y.left
-            if y.left:
-                y.left.parent = x
-            y.parent = x.parent
-            if not x.parent:
-                # this is our new root
-                self.root = y
-            elif x == x.parent.left:
-                x.parent.left = y
-            else:
-                x.parent.right = y
-            y.left = x
-            x.parent = y
-            return y
-
-        def _right_rotate(y):
-            x = y.left
-            y.left = x.right
-            if x.right:
-                x.right.parent = y
-            x.parent = y.parent
-            if not y.parent:
-                # this is our new root
-                self.root = x
-            elif y == y.parent.right:
-                y.parent.right = x
-            else:
-                y.parent.left = x
-            x.right = y
-            y.parent = x
-            return x
-
-        # actually perform the re-prioritization
+    def _sift_up(self, node):
+        # Internal method to rotate a node up until its parent has a greater or equal priority
         current = node
         while current.parent is not None:
             # check if there's a priority mismatch
             if current.parent.priority < current.priority:
                 # check if this should be a left- or right- rotation
                 if current.parent.right == current:
-                    current = _left_rotate(current.parent)
+                    current = self._left_rotate(current.parent)
                 else:
-                    current = _right_rotate(current.parent)
+                    current = self._right_rotate(current.parent)
             else:
                 break
 
+    def _sift_down(self, node, to_leaf=False):
+        # Internal method to rotate a node down below any child with a greater priority
+        #  (or all the way down to a leaf, if requested)
+        while True:
+            left, right = node.left, node.right
+            if left is None and right is None:
+                break
+            # the higher priority child is the one that must move up
+            if right is None or (left is not None and left.priority > right.priority):
+                if not to_leaf and left.priority <= node.priority:
+                    break
+                self._right_rotate(node)
+            else:
+                if not to_leaf and right.priority <= node.priority:
+                    break
+                self._left_rotate(node)
+
+    def _reprioritize(self, node, priority):
+        # Internal method to change the priority of a node and restore heap order by
+        #  rotating it up (if its priority rose) or down (if it fell)
+        raised = priority > node.priority
+        node.priority = priority
+        if raised:
+            self._sift_up(node)
+        else:
+            self._sift_down(node)
+
+    def _left_rotate(self, x):
+        # convenience function to rotate out nodes
+        #  assumes both x and x.right
+        y = x.right
+        x.right = y.left
+        if y.left:
+            y.left.parent = x
+        y.parent = x.parent
+        if not x.parent:
+            # this is our new root
+            self.root = y
+        elif x == x.parent.left:
+            x.parent.left = y
+        else:
+            x.parent.right = y
+        y.left = x
+        x.parent = y
+        if self._augmented:
+            # y takes over the whole subtree; x lost y and y's right subtree
+            y.size = x.size
+            self._update(x)
+        return y
+
+    def _right_rotate(self, y):
+        # convenience function to rotate out nodes
+        #  assumes both y and y.left
+        x = y.left
+        y.left = x.right
+        if x.right:
+            x.right.parent = y
+        x.parent = y.parent
+        if not y.parent:
+            # this is our new root
+            self.root = x
+        elif y == y.parent.right:
+            y.parent.right = x
+        else:
+            y.parent.left = x
+        x.right = y
+        y.parent = x
+        if self._augmented:
+            # x takes over the whole subtree; y lost x and x's left subtree
+            x.size = y.size
+            self._update(y)
+        return x
+
+    def _update(self, node):
+        # Internal method to recompute a node's subtree size from its children (augmented only)
+        if self._augmented:
+            node.size = 1 + (node.left.size if node.left is not None else 0) \
+                          + (node.right.size if node.right is not None else 0)
+
     def search(self, key: str) -> bool:
         """ Search for the given key in the treap and return True if found.
 
@@ -149,6 +706,732 @@ class Treap:
         # return result
         return found
 
+    def _adaptive_search(self, period):
+        # Internal method building the search used in adaptive mode: identical, except
+        #  that every period-th hit is recorded. The countdown lives in the closure
+        #  rather than on the instance, so the overhead is a cheap decrement per hit
+        #  plus an O(depth) promotion per sample.
+        countdown = period
+
+        def _search(key: str) -> bool:
+            nonlocal countdown
+            current = self.root
+            while current is not None:
+                if current.key == key:
+                    countdown -= 1
+                    if not countdown:
+                        countdown = period
+                        self._record_hit(current)
+                    return True
+                elif key < current.key:
+                    current = current.left
+                else:
+                    current = current.right
+            return False
+        return _search
+
+    def _instrumented_search(self, key: str) -> bool:
+        # Internal method replacing search while instrumented: counts visited nodes
+        visited = 0
+        current = self.root
+        while current is not None:
+            visited += 1
+            if current.key == key:
+                break
+            elif key < current.key:
+                current = current.left
+            else:
+                current = current.right
+        self.counters.record_search(visited, current is not None)
+        if current is not None and self._adaptive:
+            self._countdown -= 1
+            if not self._countdown:
+                self._countdown = self._adaptive
+                self._record_hit(current)
+        return current is not None
+
+    def _instrumented_insert(self, key: str, priority: Union[int, None] = None) -> Node:
+        # Internal method replacing insert while instrumented: counts rotations and the
+        #  length of the descent (the final depth plus one level per rotation)
+        counters = self.counters
+        rotations = counters.rotations
+        node = Treap.insert(self, key, priority)
+        rotations = counters.rotations - rotations
+
+        depth = 0
+        current = node
+        while current is not None:
+            depth += 1
+            current = current.parent
+        counters.record_insert(depth + rotations, rotations)
+        return node
+
+    def _counted(self, rotate):
+        # Internal method wrapping a rotation so that it bumps the rotation counter
+        def _rotate(node):
+            self.counters.rotations += 1
+            return rotate(self, node)
+        return _rotate
+
+    def _record_hit(self, node):
+        # Internal method to count a sampled search hit. The node is then rotated above
+        #  every ancestor with fewer hits; each rotation lifts the node's priority to its
+        #  former parent's, which keeps the heap property intact.
+        hits = self._hits
+        count = hits.get(node.key, 0) + 1
+        hits[node.key] = count
+        parent = node.parent
+        while parent is not None and hits.get(parent.key, 0) < count:
+            if node.priority < parent.priority:
+                node.priority = parent.priority
+            if parent.right is node:
+                self._left_rotate(parent)
+            else:
+                self._right_rotate(parent)
+            parent = node.parent
+
+    def search_many(self, keys: Iterable[str]) -> Union[List[bool], "numpy.ndarray"]:
+        """ Search for many keys at once.
+
+        Large batches are answered in a single pass over the sorted keys of the treap
+        instead of one tree descent per probe; batches too small to pay for that pass
+        are searched individually. If numpy is installed the sorted keys are flattened
+        into an array and matched with numpy.searchsorted; otherwise duplicate probes
+        are collapsed first and the unique probes are merged with an in-order walk.
+
+        Args:
+            keys: The string keys to search for (any iterable, or a numpy array).
+
+        Returns:
+            Booleans indicating success or failure for each probe, in order; a numpy
+            boolean array if numpy is installed, otherwise a list.
+        """
+        if numpy is not None:
+            if isinstance(keys, numpy.ndarray):
+                shape, texts = keys.shape, keys.ravel().tolist()
+            else:
+                texts = list(keys)
+                shape = (len(texts),)
+            if self.root is None or not texts:
+                return numpy.zeros(shape, dtype=bool)
+            if len(texts) * math.log2(len(self) + 1) < len(self):
+                # few probes: individual descents beat flattening the whole tree
+                found = (self._find(key) is not None for key in texts)
+                return numpy.fromiter(found, dtype=bool, count=len(texts)).reshape(shape)
+            ordered = [node.key for node in self]
+            # unicode arrays drop trailing NULs, which would make "a\0" match "a"; object
+            #  arrays keep them but are slower, so they're only used when needed
+            dtype = object if any(key.endswith("\x00") for key in itertools.chain(ordered, texts)) else None
+            ordered = numpy.array(ordered, dtype=dtype)
+            probes = numpy.array(texts, dtype=dtype)
+            index = numpy.searchsorted(ordered, probes)
+            numpy.minimum(index, len(ordered) - 1, out=index)
+            return (ordered[index] == probes).reshape(shape)
+
+        probes = keys if isinstance(keys, list) else list(keys)
+        unique = sorted(set(probes))
+        found = {}
+        if unique and len(unique) * math.log2(len(self) + 1) < len(self):
+            # few distinct probes: individual descents beat walking the whole tree
+            for key in unique:
+                found[key] = self._find(key) is not None
+        else:
+            # merge the sorted probes with an in-order walk of the tree
+            nodes = iter(self)
+            node = next(nodes, None)
+            for key in unique:
+                while node is not None and node.key < key:
+                    node = next(nodes, None)
+                found[key] = node is not None and node.key == key
+        return [found[key] for key in probes]
+
+    def search_stream(self,
+                      fileobj,
+                      normalize: Union[bytes, None] = None,
+                      delete: bytes = b"",
+                      chunk_size: int = CHUNK_SIZE) -> StreamResult:
+        """ Search for every character of a (possibly huge) binary file, in bounded memory.
+
+        The file is read in chunks (memory mapped if possible) and each chunk is
+        filtered and normalized by chunk.translate(normalize, delete). Every byte
+        left is a probe for the one-character key chr(byte), i.e. the file is read
+        as Latin-1. Probes are tallied per key, so the treap is searched just once
+        per distinct key; pytreap.stream.UPPERCASE and NON_LETTERS reproduce the
+        ENPM809X evaluation.
+
+        Args:
+            fileobj: A file object opened in binary mode.
+            normalize: An optional 256-byte translation table (see bytes.maketrans).
+            delete: The byte values to drop before translating.
+            chunk_size: The number of bytes read at a time.
+
+        Returns:
+            A StreamResult with the hit and miss counts per key, the number of bytes
+            read, the elapsed time and the throughput in MB/s.
+        """
+        start = time.perf_counter()
+        values = alphabet(normalize, delete)
+        counts = [0] * 256
+        total = 0
+        for chunk in read_chunks(fileobj, chunk_size):
+            total += len(chunk)
+            tally(chunk.translate(normalize, delete), values, counts)
+
+        hits, misses = {}, {}
+        for value, count in enumerate(counts):
+            if count:
+                key = chr(value)
+                if self._find(key) is not None:
+                    hits[key] = count
+                else:
+                    misses[key] = count
+        return StreamResult(hits, misses, total, time.perf_counter() - start)
+
+    def _find(self, key: str):
+        # Internal method to find the node holding the given key (or None)
+        current = self.root
+        while current is not None:
+            if current.key == key:
+                return current
+            elif key < current.key:
+                current = current.left
+            else:
+                current = current.right
+        return None
+
+    def split(self, key: str) -> "Treap":
+        """ Split off all keys greater than or equal to the given key.
+
+        This treap keeps the keys less than the given key; no nodes are copied.
+
+        Args:
+            key: The string key to split around.
+
+        Returns:
+            A new Treap holding all keys greater than or equal to key.
+        """
+        lower, match, upper = self._split(self.root, key)
+        if match is not None:
+            upper = self._merge(match, upper)
+
+        # sizes of the halves are only known by counting; defer that until needed
+        other = self._empty_like()
+        other.root = upper
+        other._size = None if upper is not None else 0
+        self.root = lower
+        self._size = None if lower is not None else 0
+        self._generation += 1
+        return other
+
+    def merge(self, other: "Treap") -> None:
+        """ Absorb all nodes of another treap whose keys don't overlap with ours.
+
+        Every key of one treap must be less than every key of the other; the other
+        treap is left empty and its nodes are reused as-is.
+
+        Args:
+            other: The Treap to merge into this one.
+        """
+        self._check_compatible(other)
+        if other is self or other.root is None:
+            return
+        if self.root is not None:
+            if self._max_node().key < other._min_node().key:
+                self.root = self._merge(self.root, other.root)
+            elif other._max_node().key < self._min_node().key:
+                self.root = self._merge(other.root, self.root)
+            else:
+                raise AssertionError("Cannot merge treaps with overlapping key ranges.")
+        else:
+            self.root = other.root
+        self._size = None if None in (self._size, other._size) else self._size + other._size
+        other.root = None
+        other._size = 0
+        self._generation += 1
+        other._generation += 1
+
+    def union(self, other: "Treap") -> None:
+        """ Add all keys of another treap to this one, in O(m log(n/m + 1)) expected time.
+
+        Nodes are reused rather than copied, so the other treap is left empty. Where
+        both treaps hold a key, the node with the higher priority is kept.
+
+        Args:
+            other: The Treap to absorb.
+        """
+        self._check_compatible(other)
+        if other is self:
+            return
+        duplicates = 0
+
+        def _enter(a, b):
+            if a is None or b is None:
+                return (b if a is None else a,)
+            # the higher priority root stays on top
+            if a.priority < b.priority:
+                a, b = b, a
+            return (a,) + self._split(b, a.key)
+
+        def _leave(a, match, left, right):
+            nonlocal duplicates
+            if match is not None:
+                duplicates += 1
+            self._link(a, left, right)
+            return a
+
+        self.root = self._detach(self._combine(self.root, other.root, _enter, _leave))
+        self._size = None if None in (self._size, other._size) else self._size + other._size - duplicates
+        other.root = None
+        other._size = 0
+        self._generation += 1
+        other._generation += 1
+
+    def intersection(self, other: "Treap") -> None:
+        """ Keep only the keys also found in another treap, in O(m log(n/m + 1)) expected time.
+
+        Nodes are reused rather than copied, so the other treap is left empty. Of
+        each pair of matching nodes the one with the higher priority is kept.
+
+        Args:
+            other: The Treap to intersect with.
+        """
+        self._check_compatible(other)
+        if other is self:
+            return
+        matches = 0
+
+        def _enter(a, b):
+            if a is None or b is None:
+                # a subtree without counterpart is dropped whole
+                self._detach(a)
+                return (None,)
+            if a.priority < b.priority:
+                a, b = b, a
+            return (a,) + self._split(b, a.key)
+
+        def _leave(a, match, left, right):
+            nonlocal matches
+            if match is None:
+                a.parent = a.left = a.right = None
+                return self._merge(self._detach(left), self._detach(right))
+            matches += 1
+            self._link(a, left, right)
+            return a
+
+        self.root = self._detach(self._combine(self.root, other.root, _enter, _leave))
+        self._size = matches
+        other.root = None
+        other._size = 0
+        self._generation += 1
+        other._generation += 1
+
+    def difference(self, other: "Treap") -> None:
+        """ Remove all keys found in another treap, in O(m log(n/m + 1)) expected time.
+
+        The other treap is consumed (left empty) by this operation.
+
+        Args:
+            other: The Treap whose keys should be removed.
+        """
+        self._check_compatible(other)
+        if other is self:
+            self.root = None
+            self._size = 0
+            self._generation += 1
+            return
+        matches = 0
+
+        def _enter(a, b):
+            if a is None or b is None:
+                return (a,)
+            return (a,) + self._split(b, a.key)
+
+        def _leave(a, match, left, right):
+            nonlocal matches
+            if match is None:
+                self._link(a, left, right)
+                return a
+            matches += 1
+            a.parent = a.left = a.right = None
+            return self._merge(self._detach(left), self._detach(right))
+
+        self.root = self._detach(self._combine(self.root, other.root, _enter, _leave))
+        if self._size is not None:
+            self._size -= matches
+        other.root = None
+        other._size = 0
+        self._generation += 1
+        other._generation += 1
+
+    def _combine(self, a, b, enter, leave):
+        # Internal method to run a set operation over two subtrees with an explicit
+        #  stack, so that list shaped trees don't exhaust the recursion limit.
+        #  enter(a, b) either settles a pair of subtrees, returning (result,), or splits
+        #  b around the root of a (or the other way round), returning (node, lower,
+        #  match, upper); leave(node, match, left, right) then joins the results of the
+        #  pairs (node.left, lower) and (node.right, upper).
+        results = []
+        stack = [(False, a, b)]
+        while stack:
+            leaving, a, b = stack.pop()
+            if leaving:
+                right = results.pop()
+                left = results.pop()
+                results.append(leave(a, b, left, right))
+                continue
+            step = enter(a, b)
+            if len(step) == 1:
+                results.append(step[0])
+                continue
+            node, lower, match, upper = step
+            stack.append((True, node, match))
+            stack.append((False, node.right, upper))
+            stack.append((False, node.left, lower))
+        return results[0]
+
+    def _split(self, node, key):
+        # Internal method to split the subtree rooted at node into the subtrees of keys
+        #  less than and greater than key, plus the (detached) node matching key.
+        #  Walks a single path down, hanging nodes off the inner edge of either half.
+        lower = upper = match = None
+        lower_tail = upper_tail = None
+        path = [] if self._augmented else None
+        while node is not None:
+            if path is not None:
+                path.append(node)
+            if node.key < key:
+                # node and its left subtree belong in the lower half
+                following = node.right
+                if lower_tail is None:
+                    lower = node
+                    node.parent = None
+                else:
+                    lower_tail.right = node
+                    node.parent = lower_tail
+                lower_tail = node
+                node = following
+            elif key < node.key:
+                # node and its right subtree belong in the upper half
+                following = node.left
+                if upper_tail is None:
+                    upper = node
+                    node.parent = None
+                else:
+                    upper_tail.left = node
+                    node.parent = upper_tail
+                upper_tail = node
+                node = following
+            else:
+                match = node
+                left, right = node.left, node.right
+                node.parent = node.left = node.right = None
+                if path is not None:
+                    path.pop()
+                    match.size = 1
+                if lower_tail is None:
+                    lower = self._detach(left)
+                else:
+                    lower_tail.right = left
+                    if left is not None:
+                        left.parent = lower_tail
+                if upper_tail is None:
+                    upper = self._detach(right)
+                else:
+                    upper_tail.left = right
+                    if right is not None:
+                        right.parent = upper_tail
+                break
+        else:
+            # drop the stale links left over from the last step down
+            if lower_tail is not None:
+                lower_tail.right = None
+            if upper_tail is not None:
+                upper_tail.left = None
+
+        # every node on the path lost or gained descendants; recount bottom-up
+        if path is not None:
+            for node in reversed(path):
+                self._update(node)
+        return lower, match, upper
+
+    def _merge(self, lower, upper):
+        # Internal method to join two subtrees where every key in lower is less than
+        #  every key in upper. Zips the right spine of lower with the left spine of upper.
+        root = tail = None
+        right_side = True
+        path = [] if self._augmented else None
+        while lower is not None and upper is not None:
+            if lower.priority >= upper.priority:
+                node, lower = lower, lower.right
+                next_side = True
+            else:
+                node, upper = upper, upper.left
+                next_side = False
+            if tail is None:
+                root = node
+                node.parent = None
+            elif right_side:
+                tail.right = node
+                node.parent = tail
+            else:
+                tail.left = node
+                node.parent = tail
+            tail, right_side = node, next_side
+            if path is not None:
+                path.append(node)
+
+        # hang whatever remains of either spine
+        rest = lower if lower is not None else upper
+        if tail is None:
+            return self._detach(rest)
+        if right_side:
+            tail.right = rest
+        else:
+            tail.left = rest
+        if rest is not None:
+            rest.parent = tail
+
+        # the zipped spine nodes have new subtrees; recount bottom-up
+        if path is not None:
+            for node in reversed(path):
+                self._update(node)
+        return root
+
+    def _link(self, node, left, right):
+        # Internal method to set both children of a node (and their parent links)
+        node.left = left
+        node.right = right
+        if left is not None:
+            left.parent = node
+        if right is not None:
+            right.parent = node
+        self._update(node)
+
+    def _empty_like(self) -> "Treap":
+        # Internal method to construct an empty treap in the same mode as this one
+        return type(self)(augmented=self._augmented, adaptive=self._adaptive, strategy=self._strategy)
+
+    def _check_compatible(self, other: "Treap") -> None:
+        # Internal method to make sure the nodes of another treap can be adopted
+        if other._augmented != self._augmented:
+            raise AssertionError("Cannot combine augmented and non-augmented treaps.")
+
+    @staticmethod
+    def _detach(node):
+        # Internal method to make the given node (if any) the root of its own subtree
+        if node is not None:
+            node.parent = None
+        return node
+
+    def items(self, lo: Union[str, None] = None, hi: Union[str, None] = None):
+        """ Lazily iterate over (key, priority) pairs in key order.
+
+        Finding the first pair takes O(log n) and every further pair O(1) amortized,
+        so k pairs are streamed in O(log n + k) time without recursion or any
+        allocation proportional to the treap size.
+
+        Args:
+            lo: The optional inclusive lower bound.
+            hi: The optional exclusive upper bound.
+
+        Yields:
+            (key, priority) tuples for every key with lo <= key < hi.
+        """
+        node = self._min_node() if lo is None else self._lower_bound(lo)
+        while node is not None and (hi is None or node.key < hi):
+            yield node.key, node.priority
+            node = self._successor(node)
+
+    def cursor(self) -> Cursor:
+        """ Create a cursor for finger searches, starting at the root.
+
+        The cursor remembers the last node it reached, so a search for a key d
+        positions away costs O(log d) expected time instead of O(log n); it can
+        also step to the next or previous key.
+
+        Returns:
+            The new Cursor.
+        """
+        return Cursor(self)
+
+    def keys_from(self, key: str):
+        """ Lazily iterate over all keys greater than or equal to the given key, in order.
+
+        Args:
+            key: The inclusive lower bound; it need not be in the treap.
+
+        Yields:
+            The string keys, in ascending order.
+        """
+        node = self._lower_bound(key)
+        while node is not None:
+            yield node.key
+            node = self._successor(node)
+
+    def _lower_bound(self, key: str):
+        # Internal method to find the node with the smallest key >= key (or None)
+        candidate = None
+        current = self.root
+        while current is not None:
+            if current.key < key:
+                current = current.right
+            else:
+                candidate = current
+                if current.key == key:
+                    break
+                current = current.left
+        return candidate
+
+    @staticmethod
+    def _successor(node):
+        # Internal method to find the in-order successor of a node using parent links
+        if node.right is not None:
+            node = node.right
+            while node.left is not None:
+                node = node.left
+            return node
+        # climb until we arrive from a left subtree
+        while node.parent is not None and node.parent.right is node:
+            node = node.parent
+        return node.parent
+
+    @staticmethod
+    def _predecessor(node):
+        # Internal method to find the in-order predecessor of a node using parent links
+        if node.left is not None:
+            node = node.left
+            while node.right is not None:
+                node = node.right
+            return node
+        # climb until we arrive from a right subtree
+        while node.parent is not None and node.parent.left is node:
+            node = node.parent
+        return node.parent
+
+    def _min_node(self):
+        # Internal method to find the node with the smallest key (or None)
+        current = self.root
+        while current is not None and current.left is not None:
+            current = current.left
+        return current
+
+    def _max_node(self):
+        # Internal method to find the node with the largest key (or None)
+        current = self.root
+        while current is not None and current.right is not None:
+            current = current.right
+        return current
+
+    def rank(self, key: str) -> int:
+        """ Count the keys less than the given key in O(log n) (augmented treaps only).
+
+        Args:
+            key: The string key to rank; it need not be in the treap.
+
+        Returns:
+            The number of keys strictly less than key.
+        """
+        self._check_augmented()
+        rank = 0
+        current = self.root
+        while current is not None:
+            if key < current.key:
+                current = current.left
+            else:
+                # everything in the left subtree is smaller
+                rank += current.left.size if current.left is not None else 0
+                if current.key == key:
+                    break
+                rank += 1
+                current = current.right
+        return rank
+
+    def select(self, index: int) -> str:
+        """ Find the key at the given position in sorted order in O(log n) (augmented treaps only).
+
+        Args:
+            index: The zero-based position; negative values count from the end.
+
+        Returns:
+            The key with exactly index keys less than it.
+        """
+        self._check_augmented()
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("Treap index out of range.")
+
+        current = self.root
+        while True:
+            left = current.left.size if current.left is not None else 0
+            if index < left:
+                current = current.left
+            elif index == left:
+                return current.key
+            else:
+                index -= left + 1
+                current = current.right
+
+    def count_range(self, lo: str, hi: str) -> int:
+        """ Count the keys k with lo <= k < hi in O(log n) (augmented treaps only).
+
+        Args:
+            lo: The inclusive lower bound.
+            hi: The exclusive upper bound.
+
+        Returns:
+            The number of keys in the range.
+        """
+        if not lo < hi:
+            self._check_augmented()
+            return 0
+        return self.rank(hi) - self.rank(lo)
+
+    def _check_augmented(self) -> None:
+        # Internal method to guard operations that need subtree sizes
+        if not self._augmented:
+            raise AssertionError("Order statistics require a treap constructed with augmented=True.")
+
+    def save(self, path: str) -> None:
+        """ Save the treap to a compact binary file which can be memory mapped.
+
+        Args:
+            path: The file to (over)write.
+        """
+        dump(self, path)
+
+    def freeze(self) -> FrozenTreap:
+        """ Flatten the treap into an immutable FrozenTreap in linear time.
+
+        The frozen copy keeps the keys in a sorted list and searches it by bisection,
+        which is much faster than following Node links; thaw converts it back (to the
+        same shape, unless priorities tie).
+
+        Returns:
+            The FrozenTreap; this treap is left unchanged.
+        """
+        keys, priorities = [], []
+        for node in self:
+            keys.append(node.key)
+            priorities.append(node.priority)
+        return FrozenTreap(keys, priorities)
+
+    @staticmethod
+    def open_mmap(path: str) -> MappedTreap:
+        """ Open a file written by save as a read-only treap backed by mmap.
+
+        Searches and iteration read the file directly, so processes mapping the same
+        file share a single page-cached copy and start up without any parsing.
+
+        Args:
+            path: The file to map.
+
+        Returns:
+            The read-only MappedTreap; close it (or use it as a context manager) when done.
+        """
+        return MappedTreap(path)
+
     def display(self):
         """ Print out the current treap to stdout.
 
@@ -166,8 +1449,24 @@ class Treap:
         print("-"*80)
 
     def __len__(self) -> int:
-        # return the current size of the treap
-        return len(self._nodes)
+        # return the current size of the treap, counting nodes if it isn't known (e.g. after a split)
+        if self._augmented:
+            return self.root.size if self.root is not None else 0
+        if self._size is None:
+            self._size = sum(1 for _ in self)
+        return self._size
 
     def __iter__(self):
-        return iter(self._nodes)
+        # lazy in-order traversal following parent links; O(1) extra memory even
+        #  for degenerate (list shaped) trees
+        node = self._min_node()
+        while node is not None:
+            yield node
+            node = self._successor(node)
+
+    def __reversed__(self):
+        # lazy reverse-order traversal following parent links
+        node = self._max_node()
+        while node is not None:
+            yield node
+            node = self._predecessor(node)
@@ -0,0 +1,263 @@
+""" Write-ahead log for durable Treaps (see Treap.durable and Treap.recover).
+
+A durable treap keeps two files in its directory:
+
+    snapshot.bin  the treap as of the last compaction, in the format of Treap.save
+    wal.log       every mutation since, one record each:
+                  CRC-32 of the rest of the record, operation, priority,
+                  key length and the UTF-8 encoded key
+
+Records set a key to a priority (inserting it if needed) or delete a key.
+Both are idempotent, so replaying a log over a snapshot which already
+contains some of its records is harmless: a compaction writes the new
+snapshot (to a temporary file renamed into place) before truncating the
+log, and a crash in between loses nothing. Replay stops at the first torn
+or corrupt record, the tail of a write interrupted by a crash.
+
+Records are committed in groups (see FSYNC_POLICIES): a group is written
+and, unless fsync is 'never', synced once it's full or the oldest record
+waited for the interval (a timer commits it even if nothing else is
+appended); 'always' commits every record on its own.
+"""
+
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, List, Tuple, Union
+
+from .mapped import MappedTreap, dump
+
+FSYNC_POLICIES = ("always", "batch", "never")
+SNAPSHOT = "snapshot.bin"
+LOG = "wal.log"
+
+# operations
+PUT = 1
+DELETE = 2
+
+_RECORD = struct.Struct("<IBQI")
+_CRC_SIZE = 4
+
+def _encode(operation: int, key: str, priority: int) -> bytes:
+    # encode a log record, checksummed
+    if not 0 <= priority < 1 << 64:
+        raise AssertionError("Priority {} doesn't fit in 64 bits.".format(priority))
+    encoded = key.encode("utf-8")
+    body = _RECORD.pack(0, operation, priority, len(encoded))[_CRC_SIZE:] + encoded
+    return struct.pack("<I", zlib.crc32(body)) + body
+
+def read_log(path: str) -> Tuple[List[Tuple[int, str, int]], int]:
+    """ Read the intact records of a log file.
+
+    Args:
+        path: The log file; a missing file is an empty log.
+
+    Returns:
+        The (operation, key, priority) records and the length of the intact prefix
+        of the file.
+    """
+    try:
+        with open(path, "rb") as log:
+            data = log.read()
+    except FileNotFoundError:
+        return [], 0
+    records = []
+    offset = 0
+    while offset + _RECORD.size <= len(data):
+        crc, operation, priority, length = _RECORD.unpack_from(data, offset)
+        end = offset + _RECORD.size + length
+        if end > len(data) or zlib.crc32(data[offset + _CRC_SIZE:end]) != crc:
+            break
+        records.append((operation, data[offset + _RECORD.size:end].decode("utf-8"), priority))
+        offset = end
+    return records, offset
+
+def holds_state(directory: str) -> bool:
+    """ Check whether a directory holds a snapshot or a non-empty log.
+    """
+    log = os.path.join(directory, LOG)
+    return (os.path.exists(os.path.join(directory, SNAPSHOT))
+            or (os.path.exists(log) and os.path.getsize(log) > 0))
+
+def load(directory: str) -> Tuple[List[Tuple[str, int]], Dict[str, Union[int, None]]]:
+    """ Read the state saved in a durable treap's directory.
+
+    Args:
+        directory: The directory of the snapshot and log.
+
+    Returns:
+        The (key, priority) pairs of the snapshot in key order, and the net effect of
+        the log: the final priority of every key it touched, or None if deleted.
+    """
+    pairs = []
+    path = os.path.join(directory, SNAPSHOT)
+    if os.path.exists(path):
+        with MappedTreap(path) as snapshot:
+            pairs = list(snapshot.items())
+    tail = {}
+    for operation, key, priority in read_log(os.path.join(directory, LOG))[0]:
+        tail[key] = priority if operation == PUT else None
+    return pairs, tail
+
+class WriteAheadLog:
+    """ This class appends the mutations of a Treap to a log file, in groups, and
+    compacts the log into a snapshot.
+    """
+
+    def __init__(self,
+                 directory: str,
+                 fsync: str = "batch",
+                 group_size: int = 256,
+                 interval: float = 0.01,
+                 compact_every: Union[int, None] = None) -> None:
+        """ Open (or create) the log in the given directory, dropping any torn tail.
+
+        Args:
+            directory: The directory of the snapshot and log; created if missing.
+            fsync: One of FSYNC_POLICIES.
+            group_size: The number of records committed together (batch and never).
+            interval: The longest a record waits for its group, in seconds (batch and
+                never); a timer commits the group once it has waited that long.
+            compact_every: If given, the log is compacted after this many records.
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise AssertionError("Unknown fsync policy {}.".format(fsync))
+        if group_size <= 0:
+            raise AssertionError("Group size must be greater than zero.")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.fsync = fsync
+        self.group_size = 1 if fsync == "always" else group_size
+        self.interval = interval
+        self.compact_every = compact_every
+
+        # records past the last intact one would hide everything appended after them
+        path = os.path.join(directory, LOG)
+        records, intact = read_log(path)
+        self._file = open(path, "ab")
+        self._file.truncate(intact)
+        # records since the last compaction, and those still waiting for their group
+        self.records = len(records)
+        self._group = []
+        self._opened = time.monotonic()
+        # commits a group which outlives the interval; the lock guards it against appends
+        self._timer = None
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def encode_put(key: str, priority: int) -> bytes:
+        """ Encode the record that key now has the given priority, without logging it.
+
+        Raises:
+            AssertionError: If the priority doesn't fit in 64 bits.
+        """
+        return _encode(PUT, key, priority)
+
+    @staticmethod
+    def encode_delete(key: str) -> bytes:
+        """ Encode the record that key was removed, without logging it.
+        """
+        return _encode(DELETE, key, 0)
+
+    def put(self, key: str, priority: int) -> None:
+        """ Log that key now has the given priority (inserting it if needed).
+        """
+        self.append([_encode(PUT, key, priority)])
+
+    def put_many(self, keys: List[str], priorities: List[int]) -> None:
+        """ Log a batch of puts.
+        """
+        self.append([_encode(PUT, key, priority) for key, priority in zip(keys, priorities)])
+
+    def delete(self, key: str) -> None:
+        """ Log that key was removed.
+        """
+        self.append([_encode(DELETE, key, 0)])
+
+    def append(self, records: Iterable[bytes]) -> None:
+        """ Log records encoded by encode_put and encode_delete.
+        """
+        with self._lock:
+            for record in records:
+                self._append(record)
+
+    @property
+    def compaction_due(self) -> bool:
+        """ Whether the log has grown past compact_every records.
+        """
+        return self.compact_every is not None and self.records >= self.compact_every
+
+    def flush(self) -> None:
+        """ Commit the records waiting for their group.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._group:
+                self._file.write(b"".join(self._group))
+                self._group.clear()
+            self._file.flush()
+            if self.fsync != "never":
+                os.fsync(self._file.fileno())
+
+    def compact(self, treap) -> None:
+        """ Replace the snapshot by the given treap and empty the log.
+
+        Args:
+            treap: The Treap whose mutations are logged here.
+        """
+        with self._lock:
+            self.flush()
+            path = os.path.join(self.directory, SNAPSHOT)
+            dump(treap, path + ".tmp")
+            with open(path + ".tmp", "rb") as snapshot:
+                os.fsync(snapshot.fileno())
+            os.replace(path + ".tmp", path)
+            self._sync_directory()
+            self._file.truncate(0)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.records = 0
+
+    def close(self) -> None:
+        """ Commit any waiting records and close the log file.
+        """
+        with self._lock:
+            if not self._file.closed:
+                self.flush()
+                self._file.close()
+
+    def _append(self, record):
+        # Internal method to queue a record, committing its group when full or old;
+        #  opening a group arms the timer which commits it if no append does
+        if not self._group:
+            self._opened = time.monotonic()
+        self._group.append(record)
+        self.records += 1
+        if len(self._group) >= self.group_size or time.monotonic() - self._opened >= self.interval:
+            self.flush()
+        elif self._timer is None:
+            self._timer = threading.Timer(self.interval, self._expire)
+            self._timer.start()
+
+    def _expire(self):
+        # Internal method run by the timer to commit a group which waited too long
+        with self._lock:
+            if not self._file.closed and self._group:
+                self.flush()
+
+    def _sync_directory(self):
+        # Internal method to make a rename in the directory durable (where supported)
+        try:
+            descriptor = os.open(self.directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(descriptor)
+        except OSError:
+            pass
+        finally:
+            os.close(descriptor)
@@ -0,0 +1,8 @@
+#!/usr/bin/env python
+""" Run the pytreap benchmark suite.
+""" 
+
+from pytreap.bench import main
+
+if __name__ == "__main__":
+    main()
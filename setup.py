@@ -8,8 +8,10 @@ setup(name='pytreap',
       author='Daniel M. Sahu',
       author_email='danielmohansahu@gmail.com',
       url='https://github.com/danielmohansahu/treap',
-      scripts=['scripts/pytreap_run_tests.py', 'scripts/pytreap_enpm809x_results.py'],
+      scripts=['scripts/pytreap_run_tests.py',
+               'scripts/pytreap_enpm809x_results.py',
+               'scripts/pytreap_bench.py'],
       package_data={"pytreap.data": ["textbook.txt"]},
       requires=["typing", "unittest"],
-      packages=['pytreap', 'pytreap.tests', 'pytreap.data']
+      packages=['pytreap', 'pytreap.tests', 'pytreap.data', 'pytreap.bench']
      )
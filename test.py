@@ -6,6 +6,16 @@ import random
 import unittest
 
 from pytreap.tests.test_pytreap import TestTreap 
+from pytreap.tests.test_persistent import TestPersistentTreap
+from pytreap.tests.test_mapped import TestMappedTreap
+from pytreap.tests.test_frozen import TestFrozenTreap
+from pytreap.tests.test_cache import TestTreapCache
+from pytreap.tests.test_sharded import TestShardedTreap
+from pytreap.tests.test_server import TestTreapServer
+from pytreap.tests.test_wal import TestWriteAheadLog
+from pytreap.tests.test_concurrent import TestConcurrentTreap
+from pytreap.tests.test_bench import TestBench
+from pytreap.tests.test_priority import TestPriority
 import pytreap
 
 if __name__ == "__main__":